@@ -0,0 +1,187 @@
+"""
+Monthly partitions of the activity log (accounts_activitylog).
+
+MySQL: native RANGE partitioning on TO_DAYS(timestamp), one partition per
+UTC month (p202610, ...) plus a catch-all `pmax`. Queries with a timestamp
+range only touch the matching partitions, and an expired month is removed
+with ALTER TABLE ... DROP PARTITION, which discards the partition's
+tablespace instead of deleting rows. InnoDB requires every unique key of
+a partitioned table to contain the partition column and does not allow
+foreign keys on it: migration 0017 sets the primary key to (id, timestamp)
+and the user/factory foreign keys are db_constraint=False.
+
+Other backends (SQLite in development and tests): a table-per-month
+layout would need a UNION view with INSTEAD OF triggers, which Django's
+INSERT ... RETURNING cannot write through. A month is therefore a range
+of the single table, served by the timestamp index, and dropping it is a
+ranged DELETE.
+"""
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ActivityLog
+
+TABLE = ActivityLog._meta.db_table
+CATCH_ALL = 'pmax'
+
+
+def month_start(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def as_datetime(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+@dataclass
+class Partition:
+    start: date
+    rows: int = 0
+    # The first native partition also holds anything older than its month
+    open_start: bool = False
+
+    @property
+    def end(self):
+        return add_months(self.start, 1)
+
+    @property
+    def name(self):
+        return f'p{self.start:%Y%m}'
+
+    @property
+    def label(self):
+        return f'{self.start:%Y-%m}'
+
+    def queryset(self):
+        queryset = ActivityLog.objects.filter(timestamp__lt=as_datetime(self.end))
+        if not self.open_start:
+            queryset = queryset.filter(timestamp__gte=as_datetime(self.start))
+        return queryset
+
+
+class RangePartitions:
+    """Months as timestamp ranges of one table (any backend)."""
+
+    native = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def partitions(self):
+        bounds = ActivityLog.objects.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+        if bounds['first'] is None:
+            return []
+        result = []
+        month, last = month_start(bounds['first']), month_start(bounds['last'])
+        while month <= last:
+            partition = Partition(month)
+            partition.rows = partition.queryset().count()
+            if partition.rows:
+                result.append(partition)
+            month = add_months(month, 1)
+        return result
+
+    def ensure(self, months_ahead):
+        return []
+
+    def drop(self, partition):
+        # No relations or delete signals on ActivityLog: one fast DELETE
+        partition.queryset().using(self.connection.alias).delete()
+
+
+class MySQLPartitions(RangePartitions):
+    """Native RANGE partitions; the table is partitioned by migration 0017."""
+
+    native = True
+
+    def partition_names(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL '
+                'ORDER BY PARTITION_ORDINAL_POSITION',
+                [TABLE]
+            )
+            return cursor.fetchall()
+
+    def partitions(self):
+        result = []
+        for name, rows in self.partition_names():
+            if name == CATCH_ALL:
+                continue
+            # TABLE_ROWS is InnoDB's estimate; good enough for reporting
+            result.append(Partition(date(int(name[1:5]), int(name[5:7]), 1), rows or 0, open_start=not result))
+        return result
+
+    def ensure(self, months_ahead):
+        """Split `pmax` so every month up to now + months_ahead has its own partition."""
+        existing = self.partitions()
+        if not existing:
+            return []
+        month = existing[-1].end
+        last = add_months(month_start(timezone.now()), months_ahead)
+        created = []
+        while month <= last:
+            created.append(Partition(month))
+            month = add_months(month, 1)
+        if created:
+            definitions = ', '.join(partition_definition(p) for p in created)
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f'ALTER TABLE `{TABLE}` REORGANIZE PARTITION {CATCH_ALL} INTO '
+                    f'({definitions}, PARTITION {CATCH_ALL} VALUES LESS THAN MAXVALUE)'
+                )
+        return created
+
+    def drop(self, partition):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE `{TABLE}` DROP PARTITION {partition.name}')
+
+
+def partition_definition(partition):
+    return f"PARTITION {partition.name} VALUES LESS THAN (TO_DAYS('{partition.end:%Y-%m-%d}'))"
+
+
+def get_partitions(connection):
+    if connection.vendor == 'mysql':
+        return MySQLPartitions(connection)
+    return RangePartitions(connection)
+
+
+def expired(partitions, retention_months, now=None):
+    """Partitions wholly older than the current month minus `retention_months`."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now or timezone.now()), -retention_months)
+    return [p for p in partitions if p.end <= cutoff]
+
+
+def export(partition, directory):
+    """Write the partition's rows to <directory>/activity_log_YYYY-MM.jsonl.gz; returns (path, rows)."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'activity_log_{partition.label}.jsonl.gz')
+    partial = f'{path}.part'
+    rows = 0
+    with gzip.open(partial, 'wt', encoding='utf-8') as handle:
+        for row in partition.queryset().order_by('id').values().iterator(chunk_size=2000):
+            handle.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            handle.write('\n')
+            rows += 1
+    os.replace(partial, path)
+    return path, rows
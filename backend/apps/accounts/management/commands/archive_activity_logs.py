@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.accounts import log_partitions
+from apps.accounts.models import ActivityHourlyRollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Export activity log months older than the retention period to gzipped JSONL, '
+        'drop them, and create upcoming monthly partitions (run monthly from cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-months', type=int, default=None,
+            help='Months kept besides the current one (default: ACTIVITY_LOG_RETENTION_MONTHS)'
+        )
+        parser.add_argument('--output', default=None, help='Archive directory (default: ACTIVITY_LOG_ARCHIVE_DIR)')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Future partitions to keep ready (MySQL)')
+        parser.add_argument('--no-export', action='store_true', help='Drop expired months without exporting them')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be archived')
+
+    def handle(self, *args, **options):
+        retention = options['retention_months']
+        if retention is None:
+            retention = settings.ACTIVITY_LOG_RETENTION_MONTHS
+        if retention < 0:
+            raise CommandError('--retention-months must be >= 0')
+        output = options['output'] or settings.ACTIVITY_LOG_ARCHIVE_DIR
+        dry_run = options['dry_run']
+
+        backend = log_partitions.get_partitions(connection)
+        partitions = backend.partitions()
+        if backend.native and not partitions:
+            raise CommandError('accounts_activitylog is not partitioned; run migrations first')
+
+        to_archive = log_partitions.expired(partitions, retention)
+        self.stdout.write(
+            f"{len(partitions)} month(s) in the log, retention "
+            f"{'forever' if retention == 0 else f'{retention} month(s)'}, {len(to_archive)} expired"
+        )
+
+        for partition in to_archive:
+            if dry_run:
+                self.stdout.write(f'  would archive {partition.label} (~{partition.rows} rows)')
+                continue
+            if options['no_export']:
+                backend.drop(partition)
+                self.stdout.write(f'  dropped {partition.label}')
+                continue
+            path, rows = log_partitions.export(partition, output)
+            # Rows only go once the archive file is complete on disk
+            backend.drop(partition)
+            self.stdout.write(f'  archived {partition.label}: {rows} rows -> {path}')
+
+        if to_archive and not dry_run:
+            # Daily rollups keep stats for archived months; hourly detail goes with the log
+            cutoff = log_partitions.as_datetime(to_archive[-1].end)
+            ActivityHourlyRollup.objects.filter(bucket__lt=cutoff).delete()
+
+        if not dry_run:
+            for partition in backend.ensure(options['months_ahead']):
+                self.stdout.write(f'  created partition {partition.name}')
+
+        self.stdout.write(self.style.SUCCESS('Done' if not dry_run else 'Dry run, nothing changed'))
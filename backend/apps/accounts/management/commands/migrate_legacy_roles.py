@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from apps.accounts.models import Role, FactoryMember
+from apps.accounts.models import Role, FactoryMember, bump_visibility_version
 from django.db import transaction
 
 class Command(BaseCommand):
@@ -37,6 +37,8 @@ class Command(BaseCommand):
                 if count > 0:
                     self.stdout.write(f'Migrating {count} memberships from {old_code} to {new_code}...')
                     memberships.update(role=new_role)
+                    # update() sends no signals: retire the cached visibility scopes
+                    transaction.on_commit(bump_visibility_version)
                 else:
                     self.stdout.write(f'No memberships found for {old_code}.')
 
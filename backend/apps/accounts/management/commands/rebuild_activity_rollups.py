@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.accounts import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly/daily activity rollups from the activity log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild from this date on (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = rollups.parse_bound(options['since'])
+            if since is None or parse_date(options['since']) is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+        for name, count in rollups.rebuild(since).items():
+            self.stdout.write(f'{name}: {count} rows')
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_activitylog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='When the action occurred'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:13
+
+from datetime import date, datetime, timezone as dt_timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copy of the partitioning SQL (apps/accounts/log_partitions.py reads
+# the result at run time); raw SQL only, the historical model has no partitions.
+TABLE = 'accounts_activitylog'
+MONTHS_AHEAD = 3
+
+
+def month_start(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition(apps, schema_editor):
+    # MySQL only: monthly RANGE partitions plus a catch-all `pmax`
+    connection = schema_editor.connection
+    if connection.vendor != 'mysql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(`timestamp`) FROM `{TABLE}`')
+        first = cursor.fetchone()[0]
+    now = month_start(timezone.now())
+    month = month_start(first) if first else now
+    definitions = []
+    while month <= add_months(now, MONTHS_AHEAD):
+        end = add_months(month, 1)
+        definitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}'))")
+        month = end
+    schema_editor.execute(
+        f'ALTER TABLE `{TABLE}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `timestamp`)'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE `{TABLE}` PARTITION BY RANGE (TO_DAYS(`timestamp`)) '
+        f'({", ".join(definitions)}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+    )
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(f'ALTER TABLE `{TABLE}` REMOVE PARTITIONING')
+    schema_editor.execute(f'ALTER TABLE `{TABLE}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_activitylog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='factory',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Factory context if applicable', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_logs', to='accounts.factory'),
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, help_text='User who performed the action', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activities', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(partition, unpartition),
+    ]
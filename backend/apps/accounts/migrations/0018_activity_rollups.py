@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:15
+
+from datetime import timezone as dt_timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+
+# Frozen copy of apps/accounts/rollups.rebuild(): the stats endpoint reads
+# only the rollups, so existing installs need their history counted once.
+KEY_FIELDS = ('factory_id', 'user_id', 'username', 'action', 'model_name')
+
+
+def fill_rollups(apps, schema_editor):
+    ActivityLog = apps.get_model('accounts', 'ActivityLog')
+    for name, trunc in (('ActivityHourlyRollup', TruncHour), ('ActivityDailyRollup', TruncDay)):
+        model = apps.get_model('accounts', name)
+        rows = ActivityLog.objects.annotate(bucket=trunc('timestamp', tzinfo=dt_timezone.utc)).values(
+            'bucket', *KEY_FIELDS
+        ).annotate(count=Count('id')).order_by()
+        model.objects.bulk_create((model(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_activitylog_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour/day (UTC)')),
+                ('username', models.CharField(max_length=150)),
+                ('action', models.CharField(choices=[('CREATE', 'Created'), ('UPDATE', 'Updated'), ('DELETE', 'Deleted'), ('VIEW', 'Viewed'), ('LOGIN', 'Logged In'), ('LOGOUT', 'Logged Out'), ('DOWNLOAD', 'Downloaded'), ('UPLOAD', 'Uploaded'), ('EXPORT', 'Exported'), ('IMPORT', 'Imported')], max_length=20)),
+                ('model_name', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('factory', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.factory')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity Daily Rollup',
+                'verbose_name_plural': 'Activity Daily Rollups',
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket', 'factory'], name='accounts_ac_bucket_03bdb4_idx'), models.Index(fields=['user', 'bucket'], name='accounts_ac_user_id_081221_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour/day (UTC)')),
+                ('username', models.CharField(max_length=150)),
+                ('action', models.CharField(choices=[('CREATE', 'Created'), ('UPDATE', 'Updated'), ('DELETE', 'Deleted'), ('VIEW', 'Viewed'), ('LOGIN', 'Logged In'), ('LOGOUT', 'Logged Out'), ('DOWNLOAD', 'Downloaded'), ('UPLOAD', 'Uploaded'), ('EXPORT', 'Exported'), ('IMPORT', 'Imported')], max_length=20)),
+                ('model_name', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('factory', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.factory')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity Hourly Rollup',
+                'verbose_name_plural': 'Activity Hourly Rollups',
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket', 'factory'], name='accounts_ac_bucket_d7a6e7_idx'), models.Index(fields=['user', 'bucket'], name='accounts_ac_user_id_744495_idx')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
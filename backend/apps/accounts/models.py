@@ -1,13 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.text import slugify
 import unicodedata
 import uuid
 import os
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .utils.email_service import AdvancedEmailService
 
@@ -123,6 +126,172 @@ class Role(models.Model):
         verbose_name_plural = "Roles"
 
 
+# ================= PERMISSION SNAPSHOT =================
+class PermissionSnapshot:
+    """
+    In-memory copy of a user's active factory memberships and their roles.
+    Loaded with a single query and reused by every RBAC check on the same
+    User instance, so a request pays for its memberships exactly once.
+    """
+
+    def __init__(self, memberships):
+        # Keep the membership ordering (-joined_at) so "first" stays stable
+        self.memberships = list(memberships)
+        self.roles_by_factory = {m.factory_id: m.role for m in self.memberships}
+
+    @classmethod
+    def load(cls, user):
+        if user.pk is None:
+            return cls([])
+        return cls(user.get_active_memberships())
+
+    @staticmethod
+    def _factory_key(factory):
+        if isinstance(factory, models.Model):
+            return factory.pk
+        try:
+            return int(factory)
+        except (TypeError, ValueError):
+            return factory
+
+    @property
+    def factory_ids(self):
+        return [m.factory_id for m in self.memberships]
+
+    @property
+    def first_membership(self):
+        return self.memberships[0] if self.memberships else None
+
+    def role_in_factory(self, factory):
+        return self.roles_by_factory.get(self._factory_key(factory))
+
+    def has_any_role(self, role_codes, factory=None):
+        if factory:
+            role = self.role_in_factory(factory)
+            return role is not None and role.code in role_codes
+        return any(m.role.code in role_codes for m in self.memberships)
+
+    def has_permission(self, permission_name):
+        return any(getattr(m.role, permission_name, False) for m in self.memberships)
+
+    def factory_ids_with_any_permission(self, permission_names):
+        return [
+            m.factory_id for m in self.memberships
+            if any(getattr(m.role, perm, False) for perm in permission_names)
+        ]
+
+
+# ================= VISIBILITY SCOPE =================
+VISIBILITY_VERSION_KEY = 'visibility:version'
+VISIBILITY_KEY = 'visibility:user:{user_id}'
+VISIBILITY_TIMEOUT = 60 * 60
+
+
+class VisibilityScope:
+    """
+    Which illustrations a user may list: ALL of them, those of the
+    FACTORIES they belong to plus their own, their OWN only, or NONE.
+    Shared by the illustration, file and favorite querysets.
+
+    The membership part (a "view all" role? which factories?) is cached
+    per user in the default cache, so a request does not query the
+    memberships just to scope a list. FactoryMember writes evict the user's
+    entry; Role writes move VISIBILITY_VERSION_KEY, which retires every
+    entry at once.
+
+    Both go through signals: bulk writes (QuerySet.update(), bulk_create(),
+    raw SQL) on FactoryMember or Role must call bump_visibility_version()
+    themselves, or users keep their old scope for up to VISIBILITY_TIMEOUT.
+    """
+    ALL = 'all'
+    FACTORIES = 'factories'
+    OWN = 'own'
+    NONE = 'none'
+
+    VIEW_ALL_ROLES = [
+        Role.SUPER_ADMIN,
+        Role.FACTORY_MANAGER,
+        Role.ILLUSTRATION_ADMIN,
+        Role.ILLUSTRATION_EDITOR,
+        Role.ILLUSTRATION_VIEWER,
+    ]
+
+    def __init__(self, kind, user_id=None, factory_ids=()):
+        self.kind = kind
+        self.user_id = user_id
+        # Active memberships, also for ALL (own-factory sorting uses them)
+        self.factory_ids = list(factory_ids)
+
+    def __repr__(self):
+        return f"<VisibilityScope {self.kind} user={self.user_id} factories={self.factory_ids}>"
+
+    @classmethod
+    def for_user(cls, user):
+        if user.pk is None or not user.is_active:
+            return cls(cls.NONE)
+        memberships = cls.load_memberships(user)
+        factory_ids = memberships['factory_ids']
+        if user.is_superuser or (user.is_verified and memberships['view_all']):
+            return cls(cls.ALL, user.pk, factory_ids)
+        if factory_ids:
+            return cls(cls.FACTORIES, user.pk, factory_ids)
+        return cls(cls.OWN, user.pk)
+
+    @classmethod
+    def load_memberships(cls, user):
+        """{'view_all', 'factory_ids'} of the user, from the cache or the snapshot."""
+        key = VISIBILITY_KEY.format(user_id=user.pk)
+        found = cache.get_many([VISIBILITY_VERSION_KEY, key])
+        version = found.get(VISIBILITY_VERSION_KEY)
+        if version is None:
+            version = get_visibility_version()
+        entry = found.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry
+
+        snapshot = user.permission_snapshot
+        entry = {
+            'version': version,
+            'view_all': snapshot.has_any_role(cls.VIEW_ALL_ROLES),
+            'factory_ids': snapshot.factory_ids,
+        }
+        cache.set(key, entry, VISIBILITY_TIMEOUT)
+        return entry
+
+    def filter(self, queryset, prefix=''):
+        """Narrow `queryset` to visible illustrations; `prefix` reaches them (e.g. 'illustration__')."""
+        if self.kind == self.ALL:
+            return queryset
+        if self.kind == self.NONE:
+            return queryset.none()
+        own = Q(**{f'{prefix}user_id': self.user_id})
+        if self.kind == self.OWN:
+            return queryset.filter(own)
+        return queryset.filter(own | Q(**{f'{prefix}factory_id__in': self.factory_ids}))
+
+
+def get_visibility_version():
+    version = cache.get(VISIBILITY_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a flushed cache never revives old entries
+        version = int(timezone.now().timestamp() * 1000)
+        if not cache.add(VISIBILITY_VERSION_KEY, version, timeout=None):
+            version = cache.get(VISIBILITY_VERSION_KEY, version)
+    return version
+
+
+def bump_visibility_version():
+    try:
+        return cache.incr(VISIBILITY_VERSION_KEY)
+    except ValueError:
+        get_visibility_version()
+        return cache.incr(VISIBILITY_VERSION_KEY)
+
+
+def evict_visibility(user_id):
+    cache.delete(VISIBILITY_KEY.format(user_id=user_id))
+
+
 # ================= USER MODEL =================
 class User(AbstractUser):
     # ----- AUTH -----
@@ -185,6 +354,29 @@ class User(AbstractUser):
             return self.profile_image.url
         return f"https://ui-avatars.com/api/?name={self.username}&background=random&color=fff"
 
+    @property
+    def permission_snapshot(self):
+        """Active memberships + roles, loaded once per instance (i.e. per request)"""
+        snapshot = getattr(self, '_permission_snapshot', None)
+        if snapshot is None:
+            snapshot = PermissionSnapshot.load(self)
+            self._permission_snapshot = snapshot
+        return snapshot
+
+    def clear_permission_snapshot(self):
+        """Drop the cached snapshot after this user's memberships were changed"""
+        self._permission_snapshot = None
+        self._visibility_scope = None
+
+    @property
+    def visibility_scope(self):
+        """Illustration visibility (VisibilityScope), loaded once per instance"""
+        scope = getattr(self, '_visibility_scope', None)
+        if scope is None:
+            scope = VisibilityScope.for_user(self)
+            self._visibility_scope = scope
+        return scope
+
     def get_factories(self):
         """Get all factories this user belongs to"""
         return Factory.objects.filter(members__user=self, members__is_active=True)
@@ -197,18 +389,13 @@ class User(AbstractUser):
         """Get user's role in a specific factory"""
         if not factory:
             return None
-            
-        membership = self.factory_memberships.filter(
-            factory=factory, 
-            is_active=True
-        ).select_related('role').first()
-        return membership.role if membership else None
+        return self.permission_snapshot.role_in_factory(factory)
 
     def has_any_factory_permission(self, permission_name):
         """Check if user has a permission in ANY active factory membership"""
         if self.is_superuser:
             return True
-        return self.get_active_memberships().filter(**{f'role__{permission_name}': True}).exists()
+        return self.permission_snapshot.has_permission(permission_name)
 
     def get_factories_with_permission(self, permission_name):
         """
@@ -222,22 +409,11 @@ class User(AbstractUser):
         Return a queryset of Factory objects where the user has ANY of the specified permissions.
         Superusers get all factories.
         """
-        from .models import Factory
         if self.is_superuser:
             return Factory.objects.all()
-            
-        # Build Q object for any of the permissions on the Role
-        from django.db.models import Q
-        perm_q = Q()
-        for perm in permission_names:
-            perm_q |= Q(**{f'role__{perm}': True})
-            
-        # Filter memberships first to get accurate factory IDs for THIS user
-        factory_ids = self.factory_memberships.filter(
-            perm_q,
-            is_active=True
-        ).values_list('factory_id', flat=True)
-            
+
+        # Resolve factory IDs for THIS user from the cached memberships
+        factory_ids = self.permission_snapshot.factory_ids_with_any_permission(permission_names)
         return Factory.objects.filter(id__in=factory_ids)
 
     def has_role(self, role_code, factory=None):
@@ -257,15 +433,7 @@ class User(AbstractUser):
         if self.is_superuser:
             return True
             
-        if factory:
-            return self.get_active_memberships().filter(
-                factory=factory,
-                role__code=role_code
-            ).exists()
-            
-        return self.get_active_memberships().filter(
-            role__code=role_code
-        ).exists()
+        return self.permission_snapshot.has_any_role([role_code], factory=factory)
 
     def has_any_role(self, role_codes, factory=None):
         """Check if user has any of the specified role codes (requires active/verified)"""
@@ -280,15 +448,7 @@ class User(AbstractUser):
         if self.is_superuser:
             return True
             
-        if factory:
-            return self.get_active_memberships().filter(
-                factory=factory,
-                role__code__in=role_codes
-            ).exists()
-            
-        return self.get_active_memberships().filter(
-            role__code__in=role_codes
-        ).exists()
+        return self.permission_snapshot.has_any_role(role_codes, factory=factory)
 
     def has_permission_in_factory(self, factory, permission):
         """
@@ -399,34 +559,41 @@ class User(AbstractUser):
            - Role allows 'can_edit_illustration' 
            - OR User is the owner
         """
-        if not self.is_active: return False
-        if self.is_superuser: return True
-        if not self.is_verified and illustration.user_id != self.id: return False
-
-        if not illustration.factory:
-            return illustration.user_id == self.id
-
-        role = self.get_role_in_factory(illustration.factory)
-        if not role: return False
-            
-        return role.can_edit_illustration or illustration.user_id == self.id
+        return self._can_change_illustration(illustration, 'can_edit_illustration')
 
     def can_delete_illustration(self, illustration):
         """
         Check if user can delete a specific illustration.
         Similar to edit, but uses can_delete_illustration permission.
         """
+        return self._can_change_illustration(illustration, 'can_delete_illustration')
+
+    def _can_change_illustration(self, illustration, permission_name):
+        """Shared edit/delete rule, resolved against the permission snapshot"""
         if not self.is_active: return False
         if self.is_superuser: return True
         if not self.is_verified and illustration.user_id != self.id: return False
 
-        if not illustration.factory:
+        if not illustration.factory_id:
             return illustration.user_id == self.id
 
-        role = self.get_role_in_factory(illustration.factory)
+        role = self.get_role_in_factory(illustration.factory_id)
         if not role: return False
-            
-        return role.can_delete_illustration or illustration.user_id == self.id
+
+        return getattr(role, permission_name) or illustration.user_id == self.id
+
+    def get_illustration_permission_flags(self, illustrations):
+        """
+        Compute can_edit/can_delete for a whole page of illustrations at once.
+        Returns {illustration_id: {'can_edit': bool, 'can_delete': bool}}.
+        """
+        return {
+            illustration.pk: {
+                'can_edit': self._can_change_illustration(illustration, 'can_edit_illustration'),
+                'can_delete': self._can_change_illustration(illustration, 'can_delete_illustration'),
+            }
+            for illustration in illustrations
+        }
 
     def can_manage_catalog(self):
         """
@@ -542,10 +709,13 @@ class ActivityLog(models.Model):
     ]
     
     # Who & When
+    # No database-level constraints: InnoDB rejects foreign keys on
+    # partitioned tables (see apps/accounts/log_partitions.py)
     user = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
         null=True,
+        db_constraint=False,
         related_name='activities',
         help_text="User who performed the action"
     )
@@ -554,7 +724,9 @@ class ActivityLog(models.Model):
         help_text="Backup username in case user is deleted"
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        # Set when the entry is logged, not when the buffered writer inserts it
+        default=timezone.now,
+        editable=False,
         db_index=True,
         help_text="When the action occurred"
     )
@@ -628,6 +800,7 @@ class ActivityLog(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_constraint=False,
         related_name='activity_logs',
         help_text="Factory context if applicable"
     )
@@ -646,6 +819,49 @@ class ActivityLog(models.Model):
         return f"{self.username} {self.get_action_display()} {self.model_name} at {self.timestamp}"
 
 
+# ================= ACTIVITY ROLLUPS =================
+class ActivityRollup(models.Model):
+    """
+    Pre-aggregated activity counts per (bucket, factory, user, action, model).
+    Maintained by the activity log writer (apps/accounts/rollups.py) and
+    read by the stats endpoint instead of scanning ActivityLog.
+
+    There is no unique constraint: factory/user may be NULL, which no
+    backend here can de-duplicate on. Readers always SUM(count), so a
+    duplicate row from two concurrent writers is harmless.
+    """
+    bucket = models.DateTimeField(help_text="Start of the hour/day (UTC)")
+    factory = models.ForeignKey(
+        Factory, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, related_name='+'
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, related_name='+'
+    )
+    username = models.CharField(max_length=150)
+    action = models.CharField(max_length=20, choices=ActivityLog.ACTION_CHOICES)
+    model_name = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['bucket', 'factory']),
+            models.Index(fields=['user', 'bucket']),
+        ]
+
+
+class ActivityHourlyRollup(ActivityRollup):
+    class Meta(ActivityRollup.Meta):
+        verbose_name = "Activity Hourly Rollup"
+        verbose_name_plural = "Activity Hourly Rollups"
+
+
+class ActivityDailyRollup(ActivityRollup):
+    class Meta(ActivityRollup.Meta):
+        verbose_name = "Activity Daily Rollup"
+        verbose_name_plural = "Activity Daily Rollups"
+
+
 # ================= COMMENT MODEL =================
 class Comment(models.Model):
     """
@@ -712,4 +928,28 @@ def delete_old_profile_image(sender, instance, **kwargs):
 def delete_profile_image_on_delete(sender, instance, **kwargs):
     if instance.profile_image:
         if instance.profile_image.name and os.path.exists(instance.profile_image.path):
-            os.remove(instance.profile_image.path)
\ No newline at end of file
+            os.remove(instance.profile_image.path)
+
+
+@receiver(post_save, sender=User)
+def evict_new_user_visibility(sender, instance, created, **kwargs):
+    # A reused primary key must not inherit a deleted user's cached scope
+    if created:
+        evict_visibility(instance.pk)
+
+
+@receiver(post_save, sender=FactoryMember)
+@receiver(post_delete, sender=FactoryMember)
+def evict_member_visibility(sender, instance, **kwargs):
+    # Now for this transaction's own reads, again on commit for concurrent ones
+    user_id = instance.user_id
+    evict_visibility(user_id)
+    transaction.on_commit(lambda: evict_visibility(user_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def evict_role_visibility(sender, instance, **kwargs):
+    # Roles are shared by many users: retire every cached scope
+    bump_visibility_version()
+    transaction.on_commit(bump_visibility_version)
@@ -0,0 +1,169 @@
+"""
+Hourly/daily activity rollups behind /api/auth/activity-logs/stats/.
+
+record() is called by the activity log writer with every batch it
+inserts and adds the batch's counts to ActivityHourlyRollup and
+ActivityDailyRollup. stats() answers from those tables: whole days of
+the requested range come from the daily rollup, the partial days at its
+edges from the hourly one, so the cost depends on the length of the
+range, not on the size of the log. Ranges resolve to whole hours (UTC).
+
+`manage.py rebuild_activity_rollups` recomputes both from the raw log.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ActivityLog, ActivityHourlyRollup, ActivityDailyRollup
+
+ACTION_LABELS = dict(ActivityLog.ACTION_CHOICES)
+KEY_FIELDS = ('factory_id', 'user_id', 'username', 'action', 'model_name')
+
+
+def floor_hour(value):
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value):
+    return floor_hour(value).replace(hour=0)
+
+
+def ceil_hour(value):
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def ceil_day(value):
+    floored = floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+# --------------------------------------------------------------------------
+# Writing
+# --------------------------------------------------------------------------
+def record(entries):
+    """Add a batch of (saved) ActivityLog entries to both rollups."""
+    for model, floor in ((ActivityHourlyRollup, floor_hour), (ActivityDailyRollup, floor_day)):
+        counts = Counter(
+            (floor(entry.timestamp),) + tuple(getattr(entry, field) for field in KEY_FIELDS)
+            for entry in entries
+        )
+        with transaction.atomic():
+            for key, count in counts.items():
+                values = dict(zip(('bucket',) + KEY_FIELDS, key))
+                updated = model.objects.filter(**values).update(count=F('count') + count)
+                if not updated:
+                    model.objects.create(count=count, **values)
+
+
+def rebuild(since=None):
+    """Recompute both rollups from ActivityLog (from `since` on, or entirely)."""
+    logs = ActivityLog.objects.all()
+    if since is not None:
+        logs = logs.filter(timestamp__gte=floor_day(since))
+    results = {}
+    for model, trunc in ((ActivityHourlyRollup, TruncHour), (ActivityDailyRollup, TruncDay)):
+        rows = logs.annotate(bucket=trunc('timestamp', tzinfo=dt_timezone.utc)).values(
+            'bucket', *KEY_FIELDS
+        ).annotate(count=Count('id')).order_by()
+        with transaction.atomic():
+            stale = model.objects.all()
+            if since is not None:
+                stale = stale.filter(bucket__gte=floor_day(since))
+            stale.delete()
+            created = model.objects.bulk_create((model(**row) for row in rows.iterator()), batch_size=1000)
+        results[model._meta.verbose_name_plural] = len(created)
+    return results
+
+
+# --------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------
+def rollup_querysets(start, end):
+    """Rollup querysets that together cover [start, end) exactly once."""
+    start, end = floor_hour(start), ceil_hour(end)
+    if start >= end:
+        return []
+    day_start, day_end = ceil_day(start), floor_day(end)
+    if day_start >= day_end:
+        return [ActivityHourlyRollup.objects.filter(bucket__gte=start, bucket__lt=end)]
+    querysets = [ActivityDailyRollup.objects.filter(bucket__gte=day_start, bucket__lt=day_end)]
+    if start < day_start:
+        querysets.append(ActivityHourlyRollup.objects.filter(bucket__gte=start, bucket__lt=day_start))
+    if day_end < end:
+        querysets.append(ActivityHourlyRollup.objects.filter(bucket__gte=day_end, bucket__lt=end))
+    return querysets
+
+
+def earliest():
+    first = ActivityDailyRollup.objects.aggregate(first=Min('bucket'))['first']
+    return first or timezone.now()
+
+
+def _sum(querysets, scope, group_by):
+    totals = Counter()
+    for queryset in querysets:
+        rows = queryset.filter(scope).values(*group_by).annotate(total=Sum('count')).order_by()
+        for row in rows:
+            totals[tuple(row[field] for field in group_by)] += row['total']
+    return totals
+
+
+def stats(scope=Q(), start=None, end=None, top=10):
+    """
+    Activity statistics for rollup rows matching `scope` (a Q over the
+    rollup fields) in [start, end). Open ends default to the first rollup
+    and now.
+    """
+    now = timezone.now()
+    start = start or earliest()
+    end = end or now
+    querysets = rollup_querysets(start, end)
+
+    by_action = _sum(querysets, scope, ['action'])
+    by_user = _sum(querysets, scope, ['username'])
+    by_model = _sum(querysets, scope, ['model_name'])
+    recent_start = max(start, now - timedelta(days=30))
+    recent = _sum(rollup_querysets(recent_start, end), scope, ['action'])
+
+    return {
+        'total_activities': sum(by_action.values()),
+        'activities_last_30_days': sum(recent.values()),
+        'by_action': [
+            {'action': action, 'action_display': ACTION_LABELS.get(action, action), 'count': count}
+            for (action,), count in by_action.most_common()
+        ],
+        'top_users': [
+            {'username': username, 'count': count} for (username,), count in by_user.most_common(top)
+        ],
+        'by_model': [
+            {'model_name': model_name, 'count': count} for (model_name,), count in by_model.most_common()
+        ],
+        'start': floor_hour(start),
+        'end': ceil_hour(end),
+    }
+
+
+def parse_bound(value, end=False):
+    """start_date / end_date query parameter: ISO date or datetime, None if invalid."""
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        if day is not None:
+            # A bare end date includes that whole day
+            parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+        else:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return None
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
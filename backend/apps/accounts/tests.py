@@ -1,3 +1,222 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.illustrations.tests.utils import make_role, make_user
+from . import log_partitions, rollups
+from .log_partitions import Partition
+from .models import ActivityLog, ActivityDailyRollup, Factory, User, VisibilityScope
+from .utils.activity_logger import ActivityLogBuffer, log_activity
+
+
+class ActivityLogBufferTests(TestCase):
+    """Buffered entries are written in one bulk insert once the batch is full."""
+
+    def entry(self, n):
+        return ActivityLog(
+            username='system', action='UPDATE', model_name='Manufacturer',
+            object_id=str(n), object_repr=f'M{n}',
+            timestamp=timezone.now() - timedelta(minutes=n)
+        )
+
+    def test_flushes_when_full(self):
+        buffer = ActivityLogBuffer(max_size=3, interval=60, background=False)
+        buffer.add(self.entry(1))
+        buffer.add(self.entry(2))
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertFalse(buffer.due())
+
+        with CaptureQueriesContext(connection) as queries:
+            buffer.add(self.entry(3))
+        inserts = [q for q in queries.captured_queries if 'INSERT INTO "accounts_activitylog"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        self.assertEqual(buffer.entries, [])
+
+    def test_keeps_logged_timestamp(self):
+        buffer = ActivityLogBuffer(max_size=10, interval=60, background=False)
+        entry = self.entry(5)
+        buffer.add(entry)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(ActivityLog.objects.get().timestamp, entry.timestamp)
+
+    def test_due_after_interval(self):
+        buffer = ActivityLogBuffer(max_size=10, interval=0, background=False)
+        self.assertFalse(buffer.due())
+        buffer.add(self.entry(1))
+        self.assertTrue(buffer.due())
+
+    def test_bad_entry_is_dropped_alone(self):
+        buffer = ActivityLogBuffer(max_size=10, interval=60, background=False)
+        buffer.add(self.entry(1))
+        buffer.add(ActivityLog(username='x', action=None, model_name='M'))
+        with self.assertLogs('apps.accounts.utils.activity_logger', 'ERROR'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class LogActivityTests(TestCase):
+    """The factory comes from the user's cached memberships."""
+
+    def setUp(self):
+        self.factory = Factory.objects.create(name='Tokyo')
+        self.user = make_user('staff@example.com', factory=self.factory, role=make_role('staff'))
+
+    @override_settings(ACTIVITY_LOG_BUFFER_SIZE=0)
+    def test_factory_from_snapshot(self):
+        self.user.permission_snapshot
+        with CaptureQueriesContext(connection) as queries:
+            entry = log_activity(None, self.user, 'UPDATE', 'Illustration', object_id=1)
+        self.assertFalse([q for q in queries.captured_queries if 'factorymember' in q['sql']])
+        self.assertEqual(entry.factory, self.factory)
+        self.assertEqual(ActivityLog.objects.get().factory, self.factory)
+
+    @override_settings(ACTIVITY_LOG_BUFFER_SIZE=50)
+    def test_buffered_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            log_activity(None, None, 'UPDATE', 'Manufacturer', object_id=1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(ActivityLog.objects.exists())
+
+
+class ArchiveActivityLogsTests(TestCase):
+    """Expired months are exported to gzipped JSONL and removed."""
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        now = timezone.now()
+        for days in (0, 40, 100, 101, 400):
+            ActivityLog.objects.create(
+                username='system', action='UPDATE', model_name='Manufacturer',
+                object_repr=f'{days} days ago', timestamp=now - timedelta(days=days)
+            )
+
+    def test_expired(self):
+        partitions = [Partition(date(2026, month, 1)) for month in range(6, 11)]
+        expired = log_partitions.expired(partitions, 2, now=timezone.now().replace(year=2026, month=10, day=17))
+        self.assertEqual([p.label for p in expired], ['2026-06', '2026-07'])
+        self.assertEqual(log_partitions.expired(partitions, 0), [])
+
+    def test_archive(self):
+        kept = ActivityLog.objects.filter(
+            timestamp__gte=log_partitions.as_datetime(
+                log_partitions.add_months(log_partitions.month_start(timezone.now()), -2)
+            )
+        ).count()
+        out = io.StringIO()
+        call_command('archive_activity_logs', '--retention-months', '2', '--output', self.output, stdout=out)
+
+        self.assertEqual(ActivityLog.objects.count(), kept)
+        files = sorted(os.listdir(self.output))
+        archived = []
+        for name in files:
+            self.assertRegex(name, r'^activity_log_\d{4}-\d{2}\.jsonl\.gz$')
+            with gzip.open(os.path.join(self.output, name), 'rt', encoding='utf-8') as handle:
+                archived += [json.loads(line) for line in handle]
+        self.assertEqual(len(archived), 5 - kept)
+        self.assertIn('400 days ago', [row['object_repr'] for row in archived])
+
+    def test_dry_run(self):
+        out = io.StringIO()
+        call_command('archive_activity_logs', '--retention-months', '2', '--output', self.output, '--dry-run', stdout=out)
+        self.assertEqual(ActivityLog.objects.count(), 5)
+        self.assertEqual(os.listdir(self.output), [])
+        self.assertIn('would archive', out.getvalue())
+
+
+class ActivityRollupTests(APITestCase):
+    """stats is served from the hourly/daily rollups and matches the raw log."""
+
+    def setUp(self):
+        self.admin = make_user('admin@example.com', is_superuser=True)
+        self.staff = make_user('staff@example.com')
+        base = datetime(2026, 9, 1, tzinfo=dt_timezone.utc)
+        self.rows = [
+            (self.admin, 'UPDATE', 'Illustration', base + timedelta(hours=3)),
+            (self.admin, 'UPDATE', 'Illustration', base + timedelta(hours=3, minutes=20)),
+            (self.admin, 'CREATE', 'Manufacturer', base + timedelta(days=1, hours=23)),
+            (self.staff, 'DOWNLOAD', 'IllustrationFile', base + timedelta(days=2, hours=5)),
+            (self.staff, 'DOWNLOAD', 'IllustrationFile', base + timedelta(days=5)),
+        ]
+        for user, action, model_name, timestamp in self.rows:
+            ActivityLog.objects.create(
+                user=user, username=user.username, action=action,
+                model_name=model_name, object_repr='x', timestamp=timestamp
+            )
+        rollups.rebuild()
+
+    def get_stats(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/auth/activity-logs/stats/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_incremental_matches_rebuild(self):
+        log_activity(None, self.staff, 'DOWNLOAD', 'IllustrationFile', object_id=1)
+        log_activity(None, self.staff, 'DOWNLOAD', 'IllustrationFile', object_id=2)
+        incremental = sorted(ActivityDailyRollup.objects.values_list('bucket', 'username', 'action', 'count'))
+        rollups.rebuild()
+        rebuilt = sorted(ActivityDailyRollup.objects.values_list('bucket', 'username', 'action', 'count'))
+        self.assertEqual(incremental, rebuilt)
+        self.assertIn(2, [row[3] for row in rebuilt])
+
+    def test_all_time(self):
+        data = self.get_stats(self.admin)
+        self.assertEqual(data['total_activities'], 5)
+        self.assertIn({'action': 'UPDATE', 'action_display': 'Updated', 'count': 2}, data['by_action'])
+        self.assertEqual({u['username']: u['count'] for u in data['top_users']}, {'admin': 3, 'staff': 2})
+
+    def test_range_with_partial_days(self):
+        # Hourly rollup for the edges, daily rollup for 2026-09-02 in between
+        start, end = '2026-09-01T03:10:00Z', '2026-09-03T06:00:00Z'
+        data = self.get_stats(self.admin, start_date=start, end_date=end)
+        expected = ActivityLog.objects.filter(
+            timestamp__gte=datetime(2026, 9, 1, 3, tzinfo=dt_timezone.utc),
+            timestamp__lt=datetime(2026, 9, 3, 6, tzinfo=dt_timezone.utc)
+        ).count()
+        self.assertEqual(data['total_activities'], expected)
+        self.assertEqual(expected, 4)
+
+        data = self.get_stats(self.admin, start_date='2026-09-02', end_date='2026-09-02')
+        self.assertEqual(data['total_activities'], 1)
+
+    def test_scope_and_filters(self):
+        data = self.get_stats(self.staff)
+        self.assertEqual(data['total_activities'], 2)
+        self.assertEqual(data['by_model'], [{'model_name': 'IllustrationFile', 'count': 2}])
+
+        data = self.get_stats(self.admin, action='UPDATE', model='Illustration')
+        self.assertEqual(data['total_activities'], 2)
+
+    def test_invalid_date(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/auth/activity-logs/stats/', {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class LegacyRoleMigrationTests(TestCase):
+    """Bulk membership rewrites retire cached visibility scopes."""
+
+    def test_scope_follows_migrated_role(self):
+        cache.clear()
+        factory = Factory.objects.create(name='Tokyo', address='Ota-ku')
+        make_role('ILLUSTRATION_VIEWER')
+        user = make_user('viewer@example.com', factory, make_role('VIEWER'))
+        self.assertEqual(User.objects.get(pk=user.pk).visibility_scope.kind, VisibilityScope.FACTORIES)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('migrate_legacy_roles', stdout=io.StringIO())
+        self.assertEqual(User.objects.get(pk=user.pk).visibility_scope.kind, VisibilityScope.ALL)
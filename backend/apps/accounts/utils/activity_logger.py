@@ -1,5 +1,153 @@
+"""
+Activity log writer.
+
+log_activity() used to INSERT on the caller's thread. Entries are now
+collected in an in-process buffer and written with one bulk_create when
+ACTIVITY_LOG_BUFFER_SIZE entries are pending, when the oldest entry is
+ACTIVITY_LOG_FLUSH_INTERVAL seconds old, and at interpreter exit. A
+background thread does the writing, so requests never wait on it.
+
+Loss is bounded: a process that dies without running atexit (SIGKILL,
+OOM kill, segfault) loses at most what was buffered, i.e. fewer than
+ACTIVITY_LOG_BUFFER_SIZE entries from the last FLUSH_INTERVAL seconds.
+Entries logged inside a transaction are only buffered once it commits.
+ACTIVITY_LOG_BUFFER_SIZE = 0 restores synchronous writes. Each written
+batch is also added to the stats rollups (apps/accounts/rollups.py).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .. import rollups
 from ..models import ActivityLog
-from ..models import Factory
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogBuffer:
+    """Collects unsaved ActivityLog instances and bulk-inserts them."""
+
+    def __init__(self, max_size, interval, background=True):
+        self.max_size = max(max_size, 1)
+        self.interval = interval
+        self.background = background
+        self.entries = []
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.pid = None
+
+    def add(self, entry):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked worker: entries copied from the parent are the parent's to write
+                self.entries = []
+                self.oldest = None
+                self.thread = None
+                self.pid = os.getpid()
+            if not self.entries:
+                self.oldest = time.monotonic()
+            self.entries.append(entry)
+            full = len(self.entries) >= self.max_size
+            if self.background and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='activity-log-writer', daemon=True)
+                self.thread.start()
+        if full:
+            if self.background:
+                self.wake.set()
+            else:
+                self.flush()
+
+    def take(self):
+        with self.lock:
+            entries, self.entries, self.oldest = self.entries, [], None
+        return entries
+
+    def due(self):
+        with self.lock:
+            if not self.entries:
+                return False
+            return (len(self.entries) >= self.max_size
+                    or time.monotonic() - self.oldest >= self.interval)
+
+    def flush(self):
+        """Write everything pending; returns the number of entries written."""
+        entries = self.take()
+        if not entries:
+            return 0
+        try:
+            with transaction.atomic():
+                ActivityLog.objects.bulk_create(entries, batch_size=500)
+                rollups.record(entries)
+            return len(entries)
+        except Exception:
+            logger.exception('Bulk write of %d activity log entries failed, retrying one by one', len(entries))
+        written = 0
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    entry.save(force_insert=True)
+                    rollups.record([entry])
+                written += 1
+            except Exception:
+                # e.g. the user was deleted meanwhile; drop the entry rather than block the rest
+                logger.exception('Dropped activity log entry: %s %s %s', entry.action, entry.model_name, entry.object_id)
+        return written
+
+    def run(self):
+        while True:
+            self.wake.wait(timeout=min(self.interval, 1.0))
+            self.wake.clear()
+            if not self.due():
+                continue
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ActivityLogBuffer(
+                    settings.ACTIVITY_LOG_BUFFER_SIZE, settings.ACTIVITY_LOG_FLUSH_INTERVAL
+                )
+                atexit.register(flush_activity_log)
+    return _buffer
+
+
+def flush_activity_log():
+    """Write buffered entries now (shutdown, management commands, tests)."""
+    if _buffer is not None:
+        return _buffer.flush()
+    return 0
+
+
+def get_factory(user, request=None):
+    """The user's first active factory, from the memberships cached on the (request's) user."""
+    request_user = getattr(request, 'user', None)
+    if user is not None and request_user is not None and request_user.pk == user.pk:
+        # Reuse the snapshot the permission checks already loaded for this request
+        user = request_user
+    snapshot = getattr(user, 'permission_snapshot', None)
+    if snapshot is None:
+        return None
+    membership = snapshot.first_membership
+    return membership.factory if membership else None
+
 
 def log_activity(request, user, action, model_name, object_id=None, object_repr='', description='', changes=None, success=True, error_message=''):
     """
@@ -10,22 +158,14 @@ def log_activity(request, user, action, model_name, object_id=None, object_repr=
     user_agent = ''
     endpoint = ''
     method = ''
-    
+
     if request:
         ip_address = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         endpoint = request.path
         method = request.method
-    
-    # Try to find user's factory context
-    factory = None
-    if hasattr(user, 'get_active_memberships'):
-        memberships = user.get_active_memberships()
-        if memberships.exists():
-            factory = memberships.first().factory
-
-    # Create the log entry
-    return ActivityLog.objects.create(
+
+    entry = ActivityLog(
         user=user,
         username=user.username if user else 'Anonymous',
         action=action,
@@ -40,5 +180,14 @@ def log_activity(request, user, action, model_name, object_id=None, object_repr=
         method=method,
         success=success,
         error_message=error_message,
-        factory=factory
+        factory=get_factory(user, request)
     )
+
+    if settings.ACTIVITY_LOG_BUFFER_SIZE <= 0:
+        entry.save()
+        rollups.record([entry])
+        return entry
+
+    buffer = get_buffer()
+    transaction.on_commit(lambda: buffer.add(entry))
+    return entry
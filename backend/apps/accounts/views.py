@@ -27,6 +27,7 @@ from .serializers import (
 
 from .permissions import IsSuperAdmin, IsFactoryManager, CanManageUsers, CanManageFactory, CanManageRoles, CanManageFeedback
 from .utils.activity_logger import log_activity
+from . import rollups
 
 
 def user_permission_required(action_type=None):
@@ -900,31 +901,38 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get activity statistics"""
-        from django.db.models import Count
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Get base queryset (respects user permissions)
-        queryset = self.get_queryset()
-        
-        # Last 30 days
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        
-        stats_data = {
-            'total_activities': queryset.count(),
-            'activities_last_30_days': queryset.filter(
-                timestamp__gte=thirty_days_ago
-            ).count(),
-            'by_action': list(queryset.values('action', 'action_display').annotate(
-                count=Count('id')
-            ).order_by('-count')),
-            'top_users': list(queryset.values('username').annotate(
-                count=Count('id')
-            ).order_by('-count')[:10]),
-            'by_model': list(queryset.values('model_name').annotate(
-                count=Count('id')
-            ).order_by('-count')),
-        }
-        
-        return Response(stats_data)
+        """
+        Activity statistics, served from the hourly/daily rollups
+        (apps/accounts/rollups.py) rather than the raw log.
+
+        Honours the same permission scope and user_id / action / model /
+        start_date / end_date filters as the list; `search` only applies
+        to the list.
+        """
+        user = request.user
+        if not user.is_authenticated or not user.is_active or not user.is_verified:
+            scope = Q(pk__in=[])
+        elif user.is_superuser:
+            scope = Q()
+        elif user.can_manage_users():
+            scope = Q(factory_id__in=user.permission_snapshot.factory_ids) | Q(user=user)
+        else:
+            scope = Q(user=user)
+
+        params = request.query_params
+        if params.get('user_id'):
+            scope &= Q(user_id=params['user_id'])
+        if params.get('action'):
+            scope &= Q(action=params['action'])
+        if params.get('model'):
+            scope &= Q(model_name=params['model'])
+
+        start = rollups.parse_bound(params.get('start_date'))
+        end = rollups.parse_bound(params.get('end_date'), end=True)
+        if (params.get('start_date') and start is None) or (params.get('end_date') and end is None):
+            return Response(
+                {'error': 'Invalid date: use YYYY-MM-DD or ISO 8601'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(rollups.stats(scope, start, end))
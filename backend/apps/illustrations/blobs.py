@@ -0,0 +1,140 @@
+"""
+Content-addressed storage for IllustrationFile (settings.FILE_STORAGE_MODE = 'content').
+
+Uploads are stored once per distinct content, keyed by SHA-256:
+
+    blobs/<aa>/<bb>/<sha256>.<ext>
+
+Each FileBlob counts the IllustrationFile rows pointing at it. `acquire`
+adds a reference (storing the content only for a new blob), `release`
+drops one and deletes the blob - file and renditions - when nobody
+references it any more. Renditions of a blob-backed file are shared by
+every file with that content.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .metadata import file_checksum
+from .renditions import all_rendition_names
+
+logger = logging.getLogger(__name__)
+
+
+def content_addressed():
+    return getattr(settings, 'FILE_STORAGE_MODE', 'path') == 'content'
+
+
+def blob_name(sha256, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join('blobs', sha256[:2], sha256[2:4], f'{sha256}{ext}')
+
+
+def acquire(content, storage, sha256=None):
+    """
+    FileBlob for `content` (a File), with one more reference.
+    The content is written to storage only when no blob has it yet.
+    """
+    from .models import FileBlob
+
+    if sha256 is None:
+        content.seek(0)
+        sha256 = file_checksum(content)
+        content.seek(0)
+
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            blob.ref_count += 1
+            return blob
+
+        name = storage.save(blob_name(sha256, content.name), content)
+        try:
+            with transaction.atomic():
+                return FileBlob.objects.create(sha256=sha256, name=name, size=content.size, ref_count=1)
+        except IntegrityError:
+            # A concurrent upload of the same content won the insert
+            storage.delete(name)
+    return acquire(content, storage, sha256)
+
+
+def move_file(storage, source, target):
+    """Move a stored file to exactly `target` (a rename on local storage), replacing any file there."""
+    try:
+        source_path = storage.path(source)
+    except NotImplementedError:
+        if storage.exists(target):
+            storage.delete(target)
+        with storage.open(source, 'rb') as content:
+            storage.save(target, content)
+        storage.delete(source)
+        return
+
+    target_path = storage.path(target)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    os.replace(source_path, target_path)
+
+
+def adopt(name, sha256, size, storage):
+    """
+    Like `acquire` for content already in storage under `name` (e.g. an
+    assembled chunked upload). Once the transaction commits it is moved to
+    the blob, or deleted when a blob with the same content exists; a
+    rollback leaves `name` untouched.
+    """
+    from .models import FileBlob
+
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            blob.ref_count += 1
+            transaction.on_commit(lambda: delete_names([name]))
+            return blob
+
+        # Same content, same name: a file left there by an earlier attempt is replaced
+        final = blob_name(sha256, name)
+        try:
+            with transaction.atomic():
+                blob = FileBlob.objects.create(sha256=sha256, name=final, size=size, ref_count=1)
+        except IntegrityError:
+            # A concurrent upload of the same content won the insert
+            pass
+        else:
+            transaction.on_commit(lambda: move_file(storage, name, final))
+            return blob
+    return adopt(name, sha256, size, storage)
+
+
+def release(blob_id):
+    """Drop one reference; delete the blob after commit when it was the last one."""
+    from .models import FileBlob
+
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            FileBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+
+    names = [blob.name] + [
+        name for formats in all_rendition_names(blob.name).values() for name in formats.values()
+    ]
+    transaction.on_commit(lambda: delete_names(names))
+
+
+def delete_names(names):
+    from .models import IllustrationFile
+
+    storage = IllustrationFile._meta.get_field('file').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete %s', name)
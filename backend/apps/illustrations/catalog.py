@@ -0,0 +1,102 @@
+"""
+Catalog tree: manufacturer -> engines / car models, plus part categories ->
+subcategories, with their counters, in one payload.
+
+The built tree is cached under the current catalog version (versions.py).
+Catalog writes and illustration writes that change counts bump the version
+(signals.py, on commit), so a cached tree is never invalidated explicitly -
+it simply stops being looked up. The version doubles as the ETag of
+/api/catalog/tree/.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from . import versions
+from .models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, IllustrationCountMatrix
+)
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_TREE_KEY = 'catalog:tree:{version}'
+CATALOG_TREE_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_version():
+    return versions.get(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    return versions.bump(CATALOG_VERSION_KEY)
+
+
+def get_catalog_tree():
+    """Return (version, tree), building and caching the tree on a miss."""
+    version = get_catalog_version()
+    key = CATALOG_TREE_KEY.format(version=version)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_catalog_tree()
+        cache.set(key, tree, CATALOG_TREE_TIMEOUT)
+    return version, tree
+
+
+def build_catalog_tree():
+    """Build the tree from plain values() queries (7 queries, no joins on counts)."""
+    cars_by_engine = defaultdict(list)
+    engines_by_car = defaultdict(list)
+    for car_id, engine_id in CarModel.engines.through.objects.values_list('carmodel_id', 'enginemodel_id'):
+        cars_by_engine[engine_id].append(car_id)
+        engines_by_car[car_id].append(engine_id)
+
+    # Per-engine category counts (all illustrations of the engine)
+    category_counts = defaultdict(dict)
+    for row in IllustrationCountMatrix.objects.filter(car_model__isnull=True).values(
+        'engine_model_id', 'part_category_id'
+    ).annotate(n=Sum('count')).order_by():
+        category_counts[row['engine_model_id']][row['part_category_id']] = row['n']
+
+    engines = defaultdict(list)
+    for engine in EngineModel.objects.order_by('name').values(
+        'id', 'manufacturer_id', 'name', 'engine_code', 'fuel_type', 'slug',
+        'car_model_count', 'illustration_count'
+    ):
+        engine['car_models'] = sorted(cars_by_engine.get(engine['id'], []))
+        engine['category_counts'] = category_counts.get(engine['id'], {})
+        engines[engine.pop('manufacturer_id')].append(engine)
+
+    car_models = defaultdict(list)
+    for car in CarModel.objects.order_by('name').values(
+        'id', 'manufacturer_id', 'name', 'slug', 'vehicle_type', 'year_from', 'year_to',
+        'model_code', 'chassis_code', 'engine_count', 'illustration_count'
+    ):
+        car['engines'] = sorted(engines_by_car.get(car['id'], []))
+        car_models[car.pop('manufacturer_id')].append(car)
+
+    manufacturers = []
+    for manufacturer in Manufacturer.objects.order_by('name').values(
+        'id', 'name', 'slug', 'engine_count', 'car_model_count', 'illustration_count'
+    ):
+        manufacturer['engines'] = engines.get(manufacturer['id'], [])
+        manufacturer['car_models'] = car_models.get(manufacturer['id'], [])
+        manufacturers.append(manufacturer)
+
+    subcategories = defaultdict(list)
+    for subcategory in PartSubCategory.objects.order_by('order', 'name').values(
+        'id', 'part_category_id', 'name', 'slug', 'order', 'illustration_count'
+    ):
+        subcategories[subcategory.pop('part_category_id')].append(subcategory)
+
+    part_categories = []
+    for category in PartCategory.objects.order_by('order', 'name').values(
+        'id', 'name', 'slug', 'order', 'subcategory_count', 'illustration_count'
+    ):
+        category['subcategories'] = subcategories.get(category['id'], [])
+        part_categories.append(category)
+
+    return {
+        'manufacturers': manufacturers,
+        'part_categories': part_categories,
+    }
@@ -0,0 +1,396 @@
+"""
+Batched catalog import (`manage.py import_catalog`).
+
+Records (one JSON object per line, or one CSV row) carry a `type`:
+
+    manufacturer  name
+    engine        manufacturer, name, engine_code, fuel_type
+    car           manufacturer, name, vehicle_type, year_from, year_to,
+                  model_code, chassis_code, engines (list, or "A09C|E13C" in CSV)
+    category      name, description, order
+    subcategory   category, name, description, order
+    illustration  manufacturer, engine, category, subcategory, title,
+                  description, car_models (list / "|"-separated)
+
+A record describes the whole row: omitted optional fields are reset to
+their defaults. Rows are buffered and written per batch, parents first,
+with `bulk_create(update_conflicts=True)` on each model's natural key;
+car-engine and illustration-car links are bulk-inserted through rows.
+Referenced manufacturers and categories are created when missing.
+
+bulk_create sends no signals, so nothing is logged per row and the
+catalog counters are rebuilt once at the end (see import_catalog).
+"""
+import hashlib
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, Illustration
+)
+
+RECORD_TYPES = ('manufacturer', 'engine', 'car', 'category', 'subcategory', 'illustration')
+SLUG_LENGTH = 50
+
+
+class RecordError(Exception):
+    pass
+
+
+def split_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split('|') if item.strip()]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def make_slug(text):
+    slug = slugify(text)[:SLUG_LENGTH - 6].strip('-')
+    # Names without ASCII letters (e.g. Japanese) slugify to nothing
+    return slug or f"item-{hashlib.md5(text.encode('utf-8')).hexdigest()[:8]}"
+
+
+def unique_slugs(model, bases):
+    """Slugs for new rows of `model`, suffixed -2, -3... past existing and repeated ones."""
+    taken = set(model.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+    slugs = []
+    for base in bases:
+        slug, n = base, 2
+        while slug in taken or (slug != base and model.objects.filter(slug=slug).exists()):
+            slug = f'{base}-{n}'
+            n += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=1000, user=None):
+        self.batch_size = batch_size
+        self.user = user
+        self.factory = None
+        if user is not None:
+            membership = user.permission_snapshot.first_membership
+            self.factory = membership.factory if membership else None
+
+        self.pending = {record_type: [] for record_type in RECORD_TYPES}
+        self.buffered = 0
+        self.ids = {record_type: {} for record_type in RECORD_TYPES}
+        self.stats = {record_type: {'created': 0, 'updated': 0} for record_type in RECORD_TYPES}
+        self.links = 0
+        self.records = 0
+        self.illustration_ids = set()
+        self.errors = []
+
+    # ------------------------------
+    # Input
+    # ------------------------------
+    def add(self, record, line=None):
+        self.records += 1
+        record = {key: value for key, value in record.items() if value not in (None, '')}
+        record_type = record.get('type')
+        if record_type not in RECORD_TYPES:
+            self.errors.append((line, f'Unknown record type {record_type!r}'))
+            return
+        self.pending[record_type].append((line, record))
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for record_type in RECORD_TYPES:
+            batch, self.pending[record_type] = self.pending[record_type], []
+            if not batch:
+                continue
+            self.prefetch([record for _, record in batch])
+            rows = {}
+            for line, record in batch:
+                try:
+                    key, values, extra = getattr(self, f'row_{record_type}')(record)
+                except (RecordError, KeyError, ValueError) as e:
+                    message = f'missing field {e}' if isinstance(e, KeyError) else str(e)
+                    self.errors.append((line, message))
+                    continue
+                rows[key] = (values, extra, line)
+            if rows:
+                getattr(self, f'write_{record_type}')(rows)
+        self.buffered = 0
+
+    # ------------------------------
+    # Lookups
+    # ------------------------------
+    def lookup(self, model, key_fields, keys, extra=()):
+        """{key: (pk, *extra)} for the rows of `model` whose natural key is in `keys`."""
+        keys = set(keys)
+        filters = {}
+        for i, field in enumerate(key_fields):
+            values = {key[i] for key in keys}
+            # `IN (...)` never matches NULL; those keys are matched below
+            if None not in values:
+                filters[f'{field}__in'] = values
+        found = {}
+        for row in model.objects.filter(**filters).values_list('pk', *key_fields, *extra):
+            key = tuple(row[1:len(key_fields) + 1])
+            if key in keys:
+                found[key] = (row[0], *row[len(key_fields) + 1:])
+        return found
+
+    def resolve(self, record_type, model, key_fields, keys, create=None):
+        """pk per key, from the cache or the database; `create(missing)` adds absent parents."""
+        cache = self.ids[record_type]
+        missing = {key for key in keys if key not in cache}
+        if missing:
+            cache.update((key, found[0]) for key, found in self.lookup(model, key_fields, missing).items())
+            missing = {key for key in missing if key not in cache}
+            if missing and create:
+                create(missing)
+        return cache
+
+    def upsert(self, record_type, model, key_fields, rows, update_fields, slug=None, unique_slug=True):
+        """
+        bulk_create(update_conflicts) on the natural key. `rows` is
+        {key: (field values, extra, line)}; existing rows keep their slug.
+        """
+        existing = self.lookup(model, key_fields, rows, extra=['slug'] if slug else [])
+        new_keys = [key for key in rows if key not in existing]
+        new_slugs = {}
+        if slug:
+            bases = [make_slug(slug(key, rows[key][0])) for key in new_keys]
+            new_slugs = dict(zip(new_keys, unique_slugs(model, bases) if unique_slug else bases))
+
+        objs = []
+        for key, (values, _, _) in rows.items():
+            obj = model(**values)
+            if slug:
+                obj.slug = existing[key][1] if key in existing else new_slugs[key]
+            objs.append(obj)
+
+        if update_fields:
+            model.objects.bulk_create(
+                objs, update_conflicts=True,
+                unique_fields=key_fields, update_fields=update_fields
+            )
+        else:
+            model.objects.bulk_create(objs, ignore_conflicts=True)
+
+        cache = self.ids[record_type]
+        cache.update((key, found[0]) for key, found in existing.items())
+        if new_keys:
+            cache.update((key, found[0]) for key, found in self.lookup(model, key_fields, new_keys).items())
+        self.stats[record_type]['created'] += len(new_keys)
+        self.stats[record_type]['updated'] += len(existing)
+
+    def link(self, through, left, right, pairs):
+        """Bulk-insert M2M through rows that do not exist yet."""
+        pairs = set(pairs)
+        if not pairs:
+            return
+        existing = set(
+            through.objects.filter(**{f'{left}__in': {a for a, _ in pairs}})
+            .values_list(left, right)
+        )
+        new = [through(**{left: a, right: b}) for a, b in pairs - existing]
+        through.objects.bulk_create(new, ignore_conflicts=True)
+        self.links += len(new)
+
+    # ------------------------------
+    # Parents
+    # ------------------------------
+    def manufacturer_ids(self, names):
+        def create(missing):
+            self.upsert('manufacturer', Manufacturer, ['name'], {
+                key: ({'name': key[0]}, None, None) for key in missing
+            }, [], slug=lambda key, values: key[0])
+        cache = self.resolve('manufacturer', Manufacturer, ['name'], {(name,) for name in names}, create)
+        return {name: cache[(name,)] for name in names}
+
+    def category_ids(self, names):
+        def create(missing):
+            self.upsert('category', PartCategory, ['name'], {
+                key: ({'name': key[0]}, None, None) for key in missing
+            }, ['description', 'order'], slug=lambda key, values: key[0])
+        cache = self.resolve('category', PartCategory, ['name'], {(name,) for name in names}, create)
+        return {name: cache[(name,)] for name in names}
+
+    def prefetch(self, records):
+        """Resolve the references of a batch in a few queries, so the row_* lookups hit the cache."""
+        manufacturers = self.manufacturer_ids({r['manufacturer'] for r in records if 'manufacturer' in r})
+        categories = self.category_ids({r['category'] for r in records if 'category' in r})
+        engines = {
+            (manufacturers[r['manufacturer']], r['engine'])
+            for r in records if 'manufacturer' in r and 'engine' in r
+        }
+        if engines:
+            self.resolve('engine', EngineModel, ['manufacturer_id', 'name'], engines)
+        subcategories = {
+            (categories[r['category']], r['subcategory'])
+            for r in records if 'category' in r and 'subcategory' in r and r.get('type') == 'illustration'
+        }
+        if subcategories:
+            self.resolve('subcategory', PartSubCategory, ['part_category_id', 'name'], subcategories)
+
+    # ------------------------------
+    # Rows: (natural key, field values, extra)
+    # ------------------------------
+    def row_manufacturer(self, record):
+        name = record['name']
+        return (name,), {'name': name}, None
+
+    def row_engine(self, record):
+        manufacturer_id = self.manufacturer_ids([record['manufacturer']])[record['manufacturer']]
+        values = {
+            'manufacturer_id': manufacturer_id,
+            'name': record['name'],
+            'engine_code': record.get('engine_code', ''),
+            'fuel_type': record.get('fuel_type', 'diesel'),
+        }
+        if values['fuel_type'] not in dict(EngineModel.FUEL_TYPES):
+            raise RecordError(f"Unknown fuel_type {values['fuel_type']!r}")
+        return (manufacturer_id, values['name']), values, record['manufacturer']
+
+    def row_car(self, record):
+        manufacturer_id = self.manufacturer_ids([record['manufacturer']])[record['manufacturer']]
+        values = {
+            'manufacturer_id': manufacturer_id,
+            'name': record['name'],
+            'vehicle_type': record.get('vehicle_type', ''),
+            'year_from': int(record['year_from']) if 'year_from' in record else None,
+            'year_to': int(record['year_to']) if 'year_to' in record else None,
+            'model_code': record.get('model_code', ''),
+            'chassis_code': record.get('chassis_code', ''),
+        }
+        if values['vehicle_type'] and values['vehicle_type'] not in dict(CarModel.VEHICLE_TYPES):
+            raise RecordError(f"Unknown vehicle_type {values['vehicle_type']!r}")
+        extra = (record['manufacturer'], split_list(record.get('engines')))
+        return (manufacturer_id, values['name']), values, extra
+
+    def row_category(self, record):
+        values = {
+            'name': record['name'],
+            'description': record.get('description', ''),
+            'order': int(record.get('order', 0)),
+        }
+        return (values['name'],), values, None
+
+    def row_subcategory(self, record):
+        category_id = self.category_ids([record['category']])[record['category']]
+        values = {
+            'part_category_id': category_id,
+            'name': record['name'],
+            'description': record.get('description', ''),
+            'order': int(record.get('order', 0)),
+        }
+        return (category_id, values['name']), values, None
+
+    def row_illustration(self, record):
+        if self.user is None:
+            raise RecordError('illustration records need --user')
+        manufacturer_id = self.manufacturer_ids([record['manufacturer']])[record['manufacturer']]
+        engines = self.resolve('engine', EngineModel, ['manufacturer_id', 'name'], {(manufacturer_id, record['engine'])})
+        engine_id = engines.get((manufacturer_id, record['engine']))
+        if engine_id is None:
+            raise RecordError(f"Unknown engine {record['engine']!r}")
+        category_id = self.category_ids([record['category']])[record['category']]
+        subcategory_id = None
+        if 'subcategory' in record:
+            subcategories = self.resolve(
+                'subcategory', PartSubCategory, ['part_category_id', 'name'], {(category_id, record['subcategory'])}
+            )
+            subcategory_id = subcategories.get((category_id, record['subcategory']))
+            if subcategory_id is None:
+                raise RecordError(f"Unknown subcategory {record['subcategory']!r}")
+        values = {
+            'engine_model_id': engine_id,
+            'part_category_id': category_id,
+            'part_subcategory_id': subcategory_id,
+            'title': record['title'],
+            'description': record.get('description', ''),
+        }
+        key = (engine_id, category_id, subcategory_id, values['title'])
+        return key, values, (manufacturer_id, split_list(record.get('car_models')))
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def write_manufacturer(self, rows):
+        self.upsert('manufacturer', Manufacturer, ['name'], rows, [], slug=lambda key, values: key[0])
+
+    def write_engine(self, rows):
+        self.upsert(
+            'engine', EngineModel, ['manufacturer_id', 'name'], rows, ['engine_code', 'fuel_type'],
+            slug=lambda key, values: f"{rows[key][1]}-{values['name']}"
+        )
+
+    def write_car(self, rows):
+        self.upsert(
+            'car', CarModel, ['manufacturer_id', 'name'], rows,
+            ['vehicle_type', 'year_from', 'year_to', 'model_code', 'chassis_code'],
+            slug=lambda key, values: f"{rows[key][1][0]}-{values['name']}"
+        )
+        cars = self.ids['car']
+        wanted = {(key[0], engine) for key, (_, (_, engines), _) in rows.items() for engine in engines}
+        engine_ids = self.resolve('engine', EngineModel, ['manufacturer_id', 'name'], wanted)
+        pairs = []
+        for key, (_, (_, engines), line) in rows.items():
+            for engine in engines:
+                engine_id = engine_ids.get((key[0], engine))
+                if engine_id is None:
+                    self.errors.append((line, f'Unknown engine {engine!r} for car {key[1]!r}'))
+                    continue
+                pairs.append((cars[key], engine_id))
+        self.link(CarModel.engines.through, 'carmodel_id', 'enginemodel_id', pairs)
+
+    def write_category(self, rows):
+        self.upsert(
+            'category', PartCategory, ['name'], rows, ['description', 'order'],
+            slug=lambda key, values: key[0]
+        )
+
+    def write_subcategory(self, rows):
+        self.upsert(
+            'subcategory', PartSubCategory, ['part_category_id', 'name'], rows, ['description', 'order'],
+            slug=lambda key, values: values['name'], unique_slug=False
+        )
+
+    def write_illustration(self, rows):
+        # A NULL subcategory never conflicts in the unique index, so existing
+        # rows are matched here and updated instead of upserted
+        existing = self.lookup(
+            Illustration, ['engine_model_id', 'part_category_id', 'part_subcategory_id', 'title'], rows
+        )
+        now = timezone.now()
+        updated = []
+        for key, (pk,) in existing.items():
+            obj = Illustration(pk=pk, description=rows[key][0]['description'], updated_at=now)
+            updated.append(obj)
+        Illustration.objects.bulk_update(updated, ['description', 'updated_at'])
+
+        new_keys = [key for key in rows if key not in existing]
+        Illustration.objects.bulk_create([
+            Illustration(user=self.user, factory=self.factory, **rows[key][0]) for key in new_keys
+        ])
+        ids = {key: found[0] for key, found in existing.items()}
+        if new_keys:
+            ids.update(
+                (key, found[0]) for key, found in self.lookup(
+                    Illustration, ['engine_model_id', 'part_category_id', 'part_subcategory_id', 'title'], new_keys
+                ).items()
+            )
+        self.illustration_ids.update(ids.values())
+        self.stats['illustration']['created'] += len(new_keys)
+        self.stats['illustration']['updated'] += len(existing)
+
+        wanted = {(manufacturer_id, car) for _, (manufacturer_id, cars), _ in rows.values() for car in cars}
+        car_ids = self.resolve('car', CarModel, ['manufacturer_id', 'name'], wanted)
+        pairs = []
+        for key, (_, (manufacturer_id, cars), line) in rows.items():
+            for car in cars:
+                car_id = car_ids.get((manufacturer_id, car))
+                if car_id is None:
+                    self.errors.append((line, f'Unknown car model {car!r}'))
+                    continue
+                pairs.append((ids[key], car_id))
+        self.link(Illustration.applicable_car_models.through, 'illustration_id', 'carmodel_id', pairs)
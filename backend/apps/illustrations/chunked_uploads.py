@@ -0,0 +1,185 @@
+"""
+Resumable chunked uploads for large files (UploadSession).
+
+    POST   /api/uploads/                {illustration, filename, size, title} -> session
+    PUT    /api/uploads/{id}/           raw bytes + `Content-Range: bytes <start>-<end>/<size>`
+    GET    /api/uploads/{id}/           current offset, to resume after a failure
+    POST   /api/uploads/{id}/complete/  -> the new IllustrationFile
+    DELETE /api/uploads/{id}/           abort
+
+Chunk bodies are read from the request stream straight into the partial
+file (uploads/<session>.part) - no multipart parsing, nothing spooled by
+Django's upload handlers - and must arrive in order. The SHA-256 is updated
+as the bytes arrive while consecutive chunks land on the same worker
+process, and recomputed from the file on completion otherwise. On
+completion the file is moved (renamed) to its final place: the blob for
+FILE_STORAGE_MODE=content, the illustration's directory for 'path'.
+
+Needs a storage with local paths (FileSystemStorage).
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import blobs
+from .metadata import file_checksum
+from .models import IllustrationFile, UploadSession, file_type_from_name, illustration_file_path
+
+PART_DIR = 'uploads'
+READ_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# session id -> (offset, running sha256) for sessions whose last chunk this process wrote
+MAX_HASHERS = 64
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the upload currently ends."""
+    def __init__(self, offset):
+        super().__init__(f'Expected offset {offset}')
+        self.offset = offset
+
+
+def get_storage():
+    return IllustrationFile._meta.get_field('file').storage
+
+
+def part_name(session_id):
+    return os.path.join(PART_DIR, f'{session_id}.part')
+
+
+def parse_content_range(header):
+    """(start, end, total) from `bytes <start>-<end>/<total>`, else None."""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    start, end, total = (int(value) for value in match.groups())
+    if end < start or end >= total:
+        return None
+    return start, end, total
+
+
+def _take_hasher(session_id, offset):
+    with _hashers_lock:
+        entry = _hashers.pop(session_id, None)
+    if entry and entry[0] == offset:
+        return entry[1]
+    return None
+
+
+def _keep_hasher(session_id, offset, hasher):
+    with _hashers_lock:
+        _hashers[session_id] = (offset, hasher)
+        while len(_hashers) > MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def write_chunk(session, stream, start, length):
+    """
+    Append `length` bytes from `stream` at `start`. A short read (client gone)
+    keeps what arrived; the client resumes from the returned offset.
+
+    The session row stays locked while the part file is written, so two
+    requests for the same offset cannot both write it: the second one waits,
+    then sees the moved offset and gets OffsetMismatch.
+    """
+    if start + length > session.size:
+        raise UploadError('Chunk goes past the announced size')
+    if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError('Chunk is too large')
+
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if locked.status != UploadSession.UPLOADING:
+            raise UploadError('Upload is not in progress')
+        if start != locked.offset:
+            session.offset = locked.offset
+            raise OffsetMismatch(locked.offset)
+
+        path = get_storage().path(session.part_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        hasher = hashlib.sha256() if start == 0 else _take_hasher(session.pk, start)
+
+        written = 0
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as out:
+            # Drop anything an interrupted earlier attempt left past the offset
+            out.seek(start)
+            out.truncate()
+            while written < length:
+                block = stream.read(min(READ_SIZE, length - written))
+                if not block:
+                    break
+                out.write(block)
+                written += len(block)
+                if hasher is not None:
+                    hasher.update(block)
+
+        offset = start + written
+        UploadSession.objects.filter(pk=session.pk).update(offset=offset, updated_at=timezone.now())
+
+    if hasher is not None:
+        _keep_hasher(session.pk, offset, hasher)
+    session.offset = offset
+    return written
+
+
+def complete(session):
+    """Turn a fully received upload into an IllustrationFile."""
+    storage = get_storage()
+    with transaction.atomic():
+        # Locked before the part file is read: no chunk can rewrite it meanwhile
+        session = UploadSession.objects.select_for_update().select_related('illustration').get(pk=session.pk)
+        if session.status != UploadSession.UPLOADING:
+            raise UploadError('Upload is not in progress')
+        if session.offset != session.size:
+            raise UploadError(f'Upload incomplete ({session.offset}/{session.size} bytes)')
+
+        # The running hash only counts if it covers exactly the whole file
+        hasher = _take_hasher(session.pk, session.size)
+        if hasher is not None:
+            sha256 = hasher.hexdigest()
+        else:
+            with storage.open(session.part_name, 'rb') as handle:
+                sha256 = file_checksum(handle)
+
+        file_obj = IllustrationFile(
+            illustration=session.illustration,
+            title=session.title,
+            file_type=file_type_from_name(session.filename),
+            file_size=session.size,
+            checksum=sha256
+        )
+        # The part file only moves once this commits (before the post-upload
+        # job, which is queued on save), so a rollback leaves it retryable
+        if blobs.content_addressed():
+            file_obj.blob = blobs.adopt(session.part_name, sha256, session.size, storage)
+            file_obj.file = file_obj.blob.name
+        else:
+            name = storage.get_available_name(illustration_file_path(file_obj, session.filename))
+            part_name = session.part_name
+            transaction.on_commit(lambda: blobs.move_file(storage, part_name, name))
+            file_obj.file = name
+        file_obj.save()
+
+        session.status = UploadSession.COMPLETE
+        session.illustration_file = file_obj
+        session.save(update_fields=['status', 'illustration_file', 'updated_at'])
+    return file_obj
+
+
+def abort(session):
+    _take_hasher(session.pk, None)
+    UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.ABORTED, updated_at=timezone.now())
+    get_storage().delete(session.part_name)
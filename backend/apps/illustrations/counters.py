@@ -0,0 +1,212 @@
+"""
+Denormalized catalog counters.
+
+Manufacturer / EngineModel / CarModel / PartCategory / PartSubCategory carry
+their list counts as columns so list endpoints never aggregate over joins.
+Every refresh is a recount (UPDATE ... SET col = (SELECT COUNT ...)), so it is
+idempotent and runs inside the caller's transaction; signals in signals.py
+call it for the rows touched by a write. Migration 0011 fills the counters
+once; `manage.py recount_catalog` recounts all rows to repair drift.
+
+Context-aware navigation counts (engine / car model drill-down) are read from
+IllustrationCountMatrix, rebuilt per (engine, category, subcategory) key.
+"""
+from django.db.models import Case, Count, Exists, F, Func, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
+
+from .filters import IllustrationCarModel, has_no_car_models
+from .models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, Illustration,
+    IllustrationCountMatrix
+)
+
+
+class CountDistinct(Func):
+    function = 'COUNT'
+    template = '%(function)s(DISTINCT %(expressions)s)'
+    output_field = IntegerField()
+
+
+class SumOf(Func):
+    function = 'SUM'
+    output_field = IntegerField()
+
+
+def count_subquery(queryset):
+    """Correlated COUNT(DISTINCT pk) over `queryset` (no GROUP BY needed)."""
+    return Subquery(queryset.order_by().annotate(_n=CountDistinct('pk')).values('_n'))
+
+
+def car_model_illustrations(car_ref=OuterRef('pk')):
+    """
+    Illustrations shown for a car: any illustration of one of its engines that
+    is either generic (no car models) or explicitly linked to the car.
+    """
+    return Illustration.objects.filter(engine_model__car_models=car_ref).filter(
+        Q(~Exists(IllustrationCarModel.objects.filter(illustration_id=OuterRef('pk')))) |
+        Q(Exists(IllustrationCarModel.objects.filter(
+            illustration_id=OuterRef('pk'),
+            carmodel_id=OuterRef(car_ref)
+        )))
+    )
+
+
+COUNTERS = {
+    Manufacturer: {
+        'engine_count': lambda: EngineModel.objects.filter(manufacturer=OuterRef('pk')),
+        'car_model_count': lambda: CarModel.objects.filter(manufacturer=OuterRef('pk')),
+        'illustration_count': lambda: Illustration.objects.filter(engine_model__manufacturer=OuterRef('pk')),
+    },
+    EngineModel: {
+        'car_model_count': lambda: CarModel.objects.filter(engines=OuterRef('pk')),
+        'illustration_count': lambda: Illustration.objects.filter(engine_model=OuterRef('pk')),
+    },
+    CarModel: {
+        'engine_count': lambda: EngineModel.objects.filter(car_models=OuterRef('pk')),
+        'illustration_count': lambda: car_model_illustrations(),
+    },
+    PartCategory: {
+        'subcategory_count': lambda: PartSubCategory.objects.filter(part_category=OuterRef('pk')),
+        'illustration_count': lambda: Illustration.objects.filter(part_category=OuterRef('pk')),
+    },
+    PartSubCategory: {
+        'illustration_count': lambda: Illustration.objects.filter(part_subcategory=OuterRef('pk')),
+    },
+}
+
+
+def refresh(model, ids=None, fields=None):
+    """
+    Recount `fields` (default: all counters of `model`) for rows in `ids`
+    (default: every row). Returns the number of rows updated.
+    """
+    if ids is not None:
+        # Materialize ids: MySQL rejects UPDATE t ... WHERE id IN (SELECT .. FROM t)
+        ids = {pk for pk in ids if pk is not None}
+        if not ids:
+            return 0
+    counters = COUNTERS[model]
+    fields = fields or list(counters)
+    qs = model.objects.all() if ids is None else model.objects.filter(pk__in=ids)
+    return qs.update(**{field: count_subquery(counters[field]()) for field in fields})
+
+
+def refresh_for_illustrations(engine_ids=(), category_ids=(), subcategory_ids=()):
+    """Refresh every counter that depends on illustrations of these engines/categories."""
+    engine_ids = {pk for pk in engine_ids if pk}
+    if engine_ids:
+        manufacturer_ids = list(
+            EngineModel.objects.filter(pk__in=engine_ids).values_list('manufacturer_id', flat=True)
+        )
+        car_ids = list(
+            CarModel.objects.filter(engines__in=engine_ids).values_list('pk', flat=True)
+        )
+        refresh(EngineModel, engine_ids, ['illustration_count'])
+        refresh(Manufacturer, manufacturer_ids, ['illustration_count'])
+        refresh(CarModel, car_ids, ['illustration_count'])
+    if category_ids:
+        refresh(PartCategory, category_ids, ['illustration_count'])
+    if subcategory_ids:
+        refresh(PartSubCategory, subcategory_ids, ['illustration_count'])
+
+
+def refresh_for_car_engine_links(car_ids=(), engine_ids=()):
+    """Refresh counters that depend on the CarModel <-> EngineModel M2M."""
+    if car_ids:
+        refresh(CarModel, car_ids)
+    if engine_ids:
+        refresh(EngineModel, engine_ids, ['car_model_count'])
+
+
+def refresh_all():
+    """Recount every counter of every catalog row. Returns {model name: rows changed}."""
+    drift = {}
+    for model, counters in COUNTERS.items():
+        fields = list(counters)
+        before = {row[0]: row[1:] for row in model.objects.values_list('pk', *fields)}
+        refresh(model)
+        after = model.objects.values_list('pk', *fields)
+        drift[model.__name__] = sum(1 for row in after if before.get(row[0]) != tuple(row[1:]))
+    drift[IllustrationCountMatrix.__name__] = rebuild_matrix()
+    return drift
+
+
+# ------------------------------
+# Illustration count matrix
+# ------------------------------
+MATRIX_KEY = ('engine_model_id', 'part_category_id', 'part_subcategory_id')
+MATRIX_FIELDS = MATRIX_KEY + ('car_model_id', 'count', 'generic_count')
+
+
+def illustration_matrix_key(illustration):
+    return tuple(getattr(illustration, field) for field in MATRIX_KEY)
+
+
+def counter_keys_changed(illustration, created=False):
+    """True if a save can change counters: a new row or a new engine/category/subcategory."""
+    # _counter_origin is set by the pre_save signal (None for new rows)
+    origin = getattr(illustration, '_counter_origin', None)
+    return created or origin != illustration_matrix_key(illustration)
+
+
+def _matrix_rows(illustrations):
+    """Matrix rows for `illustrations`, grouped by key (and car model for specific rows)."""
+    rows = [
+        IllustrationCountMatrix(car_model_id=None, **row)
+        for row in illustrations.order_by().values(*MATRIX_KEY).annotate(
+            count=Count('pk'),
+            generic_count=Count('pk', filter=Q(has_no_car_models())),
+        )
+    ]
+    links = IllustrationCarModel.objects.filter(illustration__in=illustrations).order_by().values(
+        *(f'illustration__{field}' for field in MATRIX_KEY), 'carmodel_id'
+    ).annotate(n=Count('illustration_id'))
+    rows.extend(
+        IllustrationCountMatrix(
+            car_model_id=link['carmodel_id'],
+            count=link['n'],
+            **{field: link[f'illustration__{field}'] for field in MATRIX_KEY}
+        )
+        for link in links
+    )
+    return rows
+
+
+def refresh_matrix(keys):
+    """Rebuild the matrix rows of these (engine, category, subcategory) keys."""
+    keys = {key for key in keys if key and key[0] and key[1]}
+    for key in keys:
+        key_filter = dict(zip(MATRIX_KEY, key))
+        IllustrationCountMatrix.objects.filter(**key_filter).delete()
+        IllustrationCountMatrix.objects.bulk_create(
+            _matrix_rows(Illustration.objects.filter(**key_filter))
+        )
+
+
+def rebuild_matrix():
+    """Rebuild the whole matrix. Returns the number of rows that changed."""
+    before = set(IllustrationCountMatrix.objects.values_list(*MATRIX_FIELDS))
+    IllustrationCountMatrix.objects.all().delete()
+    IllustrationCountMatrix.objects.bulk_create(_matrix_rows(Illustration.objects.all()), batch_size=1000)
+    after = set(IllustrationCountMatrix.objects.values_list(*MATRIX_FIELDS))
+    return len(before ^ after)
+
+
+def matrix_count_subquery(outer_field, engine_id=None, car_id=None):
+    """
+    Navigation count for the row referenced by `outer_field` (e.g. 'part_category')
+    in an engine and/or car model context, summed from the matrix.
+    Same semantics as filtering illustrations by engine and
+    "applies to car" (linked to the car, or generic).
+    """
+    rows = IllustrationCountMatrix.objects.filter(**{outer_field: OuterRef('pk')})
+    if engine_id:
+        rows = rows.filter(engine_model_id=engine_id)
+    if car_id:
+        rows = rows.filter(Q(car_model__isnull=True) | Q(car_model_id=car_id))
+        value = Case(When(car_model__isnull=True, then=F('generic_count')), default=F('count'))
+    else:
+        rows = rows.filter(car_model__isnull=True)
+        value = F('count')
+    return Coalesce(Subquery(rows.order_by().annotate(_n=SumOf(value)).values('_n')), 0)
@@ -0,0 +1,98 @@
+"""
+Streaming ZIP export of illustration files (/api/illustrations/export.zip).
+
+The archive is produced on the fly: zipfile writes into a small sink that
+is drained after every block read from disk, so memory use is constant
+whatever the export size. Entries are STORED (PDFs and images are already
+compressed) and written with data descriptors, so nothing needs seeking.
+
+    <manufacturer>/<engine>/<category>/<id>_<title>/<file title>.pdf
+"""
+import logging
+import os
+import time
+import zipfile
+
+from .file_delivery import attachment_filename, safe_filename
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+class ZipSink:
+    """Write-only, unseekable file object collecting what zipfile writes."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def export_entries(files):
+    """(path, name in the archive) for each IllustrationFile, with unique names."""
+    entries = []
+    used = set()
+    for file_obj in files:
+        if not file_obj.file:
+            continue
+        try:
+            path = file_obj.file.path
+        except NotImplementedError:
+            logger.warning('Export skips %s: storage has no local paths', file_obj.file.name)
+            continue
+
+        illustration = file_obj.illustration
+        folder = '/'.join([
+            illustration.engine_model.manufacturer.slug,
+            illustration.engine_model.slug,
+            illustration.part_category.slug,
+            safe_filename(f'{illustration.pk}_{illustration.title}'),
+        ])
+        base, ext = os.path.splitext(
+            attachment_filename(file_obj.title or illustration.title, file_obj.file.name)
+        )
+        name = f'{folder}/{base}{ext}'
+        counter = 2
+        while name in used:
+            name = f'{folder}/{base}_{counter}{ext}'
+            counter += 1
+        used.add(name)
+        entries.append((path, name))
+    return entries
+
+
+def iter_zip(entries, read_size=READ_SIZE):
+    """Yield the bytes of a ZIP archive of `entries` ((path, name) pairs)."""
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for path, name in entries:
+            try:
+                handle = open(path, 'rb')
+            except OSError as e:
+                # Headers are already sent; leave the file out rather than break the archive
+                logger.warning('Export skips %s: %s', path, e)
+                continue
+            with handle:
+                stat = os.fstat(handle.fileno())
+                info = zipfile.ZipInfo(name, date_time=time.localtime(max(stat.st_mtime, 315532800))[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = stat.st_size
+                with archive.open(info, mode='w', force_zip64=stat.st_size > zipfile.ZIP64_LIMIT) as dest:
+                    for block in iter(lambda: handle.read(read_size), b''):
+                        dest.write(block)
+                        yield sink.drain()
+            # Data descriptor
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
@@ -0,0 +1,55 @@
+"""
+Facet counts for the illustration list (`?facets=manufacturer,part_category,...`).
+
+All requested facets come from one GROUP BY over the already filtered and
+visibility-scoped queryset: the query groups on every requested facet at
+once and each facet is then summed up from those combinations in Python,
+so the cost is one query whatever the number of facets.
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+
+# facet -> (id field, label field)
+FACETS = {
+    'manufacturer': ('engine_model__manufacturer_id', 'engine_model__manufacturer__name'),
+    'engine_model': ('engine_model_id', 'engine_model__name'),
+    'part_category': ('part_category_id', 'part_category__name'),
+    'part_subcategory': ('part_subcategory_id', 'part_subcategory__name'),
+    'factory': ('factory_id', 'factory__name'),
+}
+
+
+def parse_facets(value):
+    """Requested facet names (in FACETS order); raises ValueError on unknown ones."""
+    names = {name.strip() for name in (value or '').split(',') if name.strip()}
+    unknown = names - set(FACETS)
+    if unknown:
+        raise ValueError(', '.join(sorted(unknown)))
+    return [name for name in FACETS if name in names]
+
+
+def facet_counts(queryset, names):
+    """{facet: [{'id', 'name', 'count'}, ...]} ordered by count, then name."""
+    if not names:
+        return {}
+    fields = [field for name in names for field in FACETS[name]]
+    # Fresh values(): drop the list's ordering and annotations from the grouping
+    rows = queryset.order_by().values(*fields).annotate(facet_count=Count('pk'))
+
+    totals = {name: defaultdict(int) for name in names}
+    labels = {}
+    for row in rows:
+        for name in names:
+            id_field, label_field = FACETS[name]
+            key = row[id_field]
+            totals[name][key] += row['facet_count']
+            labels[(name, key)] = row[label_field]
+
+    return {
+        name: sorted(
+            ({'id': key, 'name': labels[(name, key)], 'count': count} for key, count in counts.items()),
+            key=lambda item: (-item['count'], item['name'] or '')
+        )
+        for name, counts in totals.items()
+    }
@@ -0,0 +1,190 @@
+"""
+File responses for IllustrationFile preview/download.
+
+- Strong validators: ETag from size + mtime (ns), Last-Modified from mtime
+- Conditional GET: If-None-Match / If-Modified-Since -> 304,
+  If-Match / If-Unmodified-Since -> 412 (django.utils.cache)
+- Single byte ranges: 206 + Content-Range, 416 when unsatisfiable,
+  If-Range falls back to the full file when the validator changed
+
+settings.FILE_DELIVERY_MODE hands the byte transfer to the front server
+instead ("x-accel-redirect" for nginx, "x-sendfile" for Apache/lighttpd):
+Django only does the permission check and returns headers, the proxy
+serves the file (with its own Range / conditional handling).
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def safe_filename(title):
+    safe_title = "".join(
+        c for c in title
+        if c.isalnum() or c in (' ', '-', '_', '.')
+    ).strip()
+    return safe_title.replace(' ', '_')[:50]
+
+
+def attachment_filename(title, storage_name):
+    """Download name from the illustration title, keeping the stored extension."""
+    _, ext = os.path.splitext(storage_name)
+    return f"{safe_filename(title)}{ext or '.pdf'}"
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to ignore the
+    header (absent, malformed or multi-range), or False when unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Weak validators never match If-Range
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def iter_file_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+DELIVERY_DJANGO = 'django'
+DELIVERY_X_ACCEL = 'x-accel-redirect'
+DELIVERY_X_SENDFILE = 'x-sendfile'
+DELIVERY_MODES = (DELIVERY_DJANGO, DELIVERY_X_ACCEL, DELIVERY_X_SENDFILE)
+
+
+def get_delivery_mode():
+    mode = getattr(settings, 'FILE_DELIVERY_MODE', DELIVERY_DJANGO) or DELIVERY_DJANGO
+    if mode not in DELIVERY_MODES:
+        raise ImproperlyConfigured(
+            f'FILE_DELIVERY_MODE must be one of {", ".join(DELIVERY_MODES)} (got {mode!r})'
+        )
+    return mode
+
+
+def offload_response(mode, path, content_type, disposition, cache_control):
+    """
+    Empty response telling the front server which file to send, or None when
+    the file lives outside MEDIA_ROOT (nginx can only map the internal location).
+    """
+    if mode == DELIVERY_X_ACCEL:
+        relative = os.path.relpath(os.path.realpath(path), os.path.realpath(settings.MEDIA_ROOT))
+        if relative.startswith('..'):
+            return None
+        header = ('X-Accel-Redirect', settings.FILE_DELIVERY_ACCEL_PREFIX + quote(relative.replace(os.sep, '/')))
+    else:
+        header = ('X-Sendfile', os.path.realpath(path))
+
+    response = HttpResponse(content_type=content_type)
+    response[header[0]] = header[1]
+    response['Content-Disposition'] = disposition
+    response['Cache-Control'] = cache_control
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def serve_file(request, path, content_type, disposition, cache_control='private, no-cache'):
+    """
+    Return a 200/206/304/412/416 response for the file at `path` (or an
+    offload response, see FILE_DELIVERY_MODE).
+    `disposition` is the full Content-Disposition value.
+    Raises PermissionError / FileNotFoundError like open().
+    """
+    mode = get_delivery_mode()
+    if mode != DELIVERY_DJANGO:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        response = offload_response(mode, path, content_type, disposition, cache_control)
+        if response is not None:
+            return response
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+
+    def finalize(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = cache_control
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified), response=None
+    )
+    if not_modified is not None:
+        return finalize(not_modified)
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finalize(response)
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_file_range(path, start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+
+    response['Content-Disposition'] = disposition
+    return finalize(response)
@@ -0,0 +1,89 @@
+# illustrations/filters.py
+import django_filters
+from django.db.models import Exists, OuterRef, Q
+from rest_framework import filters
+
+from . import search
+from .models import CarModel, Illustration
+
+
+IllustrationCarModel = Illustration.applicable_car_models.through
+
+
+def applies_to_car_models(car_model_ids, outer_ref='pk'):
+    """
+    EXISTS test for "illustration is linked to one of these car models".
+    Uses a correlated subquery so the outer query is never multiplied by the M2M join.
+    """
+    return Exists(
+        IllustrationCarModel.objects.filter(
+            illustration_id=OuterRef(outer_ref),
+            carmodel_id__in=car_model_ids
+        )
+    )
+
+
+def has_no_car_models(outer_ref='pk'):
+    """EXISTS test for "illustration is generic (no specific car models)"."""
+    return ~Exists(
+        IllustrationCarModel.objects.filter(illustration_id=OuterRef(outer_ref))
+    )
+
+
+def applicable_to_car_model_q(car_model_id, outer_ref='pk'):
+    """
+    Illustration applies to a car if it lists that car OR lists no cars at all.
+    """
+    return Q(applies_to_car_models([car_model_id], outer_ref)) | Q(has_no_car_models(outer_ref))
+
+
+class IllustrationFilter(django_filters.FilterSet):
+    """
+    Same fields as the former `filterset_fields`, but the M2M filter is an
+    EXISTS subquery instead of a join + DISTINCT.
+    """
+    applicable_car_models = django_filters.ModelMultipleChoiceFilter(
+        queryset=CarModel.objects.all(),
+        method='filter_applicable_car_models'
+    )
+
+    class Meta:
+        model = Illustration
+        fields = [
+            'user',
+            'factory',
+            'engine_model',
+            'engine_model__manufacturer',
+            'part_category',
+            'part_subcategory',
+            'applicable_car_models'
+        ]
+
+    def filter_applicable_car_models(self, queryset, name, value):
+        # An absent parameter cleans to an empty queryset, not to None
+        if not value:
+            return queryset
+        return queryset.filter(applies_to_car_models([car.pk for car in value]))
+
+
+class IllustrationSearchFilter(filters.SearchFilter):
+    """
+    `?search=` through the full-text index (see search.py) instead of
+    LIKE '%term%' over title/description. Only narrows the queryset, so
+    visibility and the other filters still apply.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search.search_queryset(queryset, query)
+
+
+class IllustrationOrderingFilter(filters.OrderingFilter):
+    """Search results are ordered by relevance unless `ordering` is given."""
+
+    def get_ordering(self, request, queryset, view):
+        if self.ordering_param not in request.query_params and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', *(self.get_default_ordering(view) or [])]
+        return super().get_ordering(request, queryset, view)
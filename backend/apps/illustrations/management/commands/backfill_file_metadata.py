@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.illustrations.metadata import METADATA_FIELDS, extract_metadata
+from apps.illustrations.models import IllustrationFile
+
+
+class Command(BaseCommand):
+    help = 'Record size, checksum, page count and dimensions for illustration files that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-read every file, not only the missing ones')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        files = IllustrationFile.objects.exclude(file='').order_by('pk')
+        if not options['all']:
+            files = files.filter(checksum='')
+
+        done = missing = 0
+        for file_obj in files.only('pk', 'file', 'file_type').iterator(chunk_size=options['chunk_size']):
+            try:
+                extract_metadata(file_obj)
+            except OSError as e:
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'IllustrationFile {file_obj.pk}: {e}'))
+                continue
+            file_obj.save(update_fields=METADATA_FIELDS)
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {done} files ({missing} unreadable)'))
@@ -0,0 +1,170 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import Factory
+from apps.illustrations import catalog, counters, response_cache
+from apps.illustrations.models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, Illustration
+)
+from apps.illustrations.views import IllustrationViewSet
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark /api/illustrations/ list queries: the legacy JOIN + DISTINCT shape '
+        'against the current EXISTS-based queryset'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create synthetic "bench-*" illustrations until this many exist (e.g. 100000)'
+        )
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per scenario (default: 20)')
+        parser.add_argument('--page-size', type=int, default=50, help='Rows fetched per run (default: 50)')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+
+        user = User.objects.filter(is_superuser=True, is_active=True).first()
+        if not user:
+            raise CommandError('A superuser is required to run the benchmark')
+
+        car = CarModel.objects.filter(illustrations__isnull=False).first() or CarModel.objects.first()
+        engine = car.engines.first() if car else None
+        scenarios = [('list', {})]
+        if car:
+            scenarios.append(('car_model', {'car_model': car.pk}))
+        if car and engine:
+            scenarios.append(('car_model+engine', {'car_model': car.pk, 'engine_model': engine.pk}))
+
+        self.stdout.write(f"Illustrations: {Illustration.objects.count()}  runs={options['runs']}  page_size={options['page_size']}")
+        self.stdout.write(f"{'scenario':<20}{'legacy p50':>12}{'legacy p95':>12}{'exists p50':>12}{'exists p95':>12}")
+        for name, params in scenarios:
+            legacy = self.time_runs(lambda: self.legacy_queryset(params), options)
+            current = self.time_runs(lambda: self.current_queryset(user, params), options)
+            self.stdout.write(
+                f"{name:<20}{legacy[0]:>10.1f}ms{legacy[1]:>10.1f}ms{current[0]:>10.1f}ms{current[1]:>10.1f}ms"
+            )
+
+    # ------------------------------------------------------------------
+    # Query shapes
+    # ------------------------------------------------------------------
+    def current_queryset(self, user, params):
+        request = Request(APIRequestFactory().get('/api/illustrations/', params))
+        request.user = user
+        view = IllustrationViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+        return view.filter_queryset(view.get_queryset())
+
+    def legacy_queryset(self, params):
+        """The pre-EXISTS queryset: M2M join, Count over a JOIN and a final DISTINCT."""
+        qs = Illustration.objects.select_related(
+            'user', 'factory', 'engine_model', 'engine_model__manufacturer',
+            'part_category', 'part_subcategory'
+        ).annotate(file_count=Count('files', distinct=True))
+        if params.get('engine_model'):
+            qs = qs.filter(engine_model_id=params['engine_model'])
+        if params.get('car_model'):
+            qs = qs.filter(
+                Q(applicable_car_models__id=params['car_model']) |
+                Q(applicable_car_models__isnull=True)
+            )
+        return qs.order_by('-created_at').distinct()
+
+    def time_runs(self, build_queryset, options):
+        timings = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            qs = build_queryset()
+            qs.count()
+            list(qs[:options['page_size']])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95
+
+    # ------------------------------------------------------------------
+    # Synthetic data
+    # ------------------------------------------------------------------
+    @transaction.atomic
+    def seed(self, target):
+        existing = Illustration.objects.filter(title__startswith=f'{BENCH_PREFIX}-').count()
+        if existing >= target:
+            self.stdout.write(f'Seed skipped: {existing} benchmark illustrations already exist')
+            return
+
+        user = User.objects.filter(is_superuser=True).first()
+        if not user:
+            raise CommandError('A superuser is required to own the benchmark illustrations')
+        factory, _ = Factory.objects.get_or_create(name=f'{BENCH_PREFIX}-factory', defaults={'address': '-'})
+        manufacturer, _ = Manufacturer.objects.get_or_create(slug=f'{BENCH_PREFIX}-mfr', defaults={'name': 'Bench Motors'})
+
+        engines = [
+            EngineModel.objects.get_or_create(
+                manufacturer=manufacturer, name=f'BENCH-E{i}', defaults={'slug': f'{BENCH_PREFIX}-e{i}'}
+            )[0]
+            for i in range(20)
+        ]
+        cars = []
+        for i in range(40):
+            car, _ = CarModel.objects.get_or_create(
+                manufacturer=manufacturer, name=f'Bench Car {i}', defaults={'slug': f'{BENCH_PREFIX}-car-{i}'}
+            )
+            car.engines.add(engines[i % len(engines)], engines[(i + 1) % len(engines)])
+            cars.append(car)
+        category, _ = PartCategory.objects.get_or_create(slug=f'{BENCH_PREFIX}-cat', defaults={'name': 'Bench Category'})
+        subcategories = [
+            PartSubCategory.objects.get_or_create(
+                part_category=category, name=f'Bench Sub {i}', defaults={'slug': f'{BENCH_PREFIX}-sub-{i}'}
+            )[0]
+            for i in range(10)
+        ]
+
+        through = Illustration.applicable_car_models.through
+        batch_size = 5000
+        started = time.perf_counter()
+        for offset in range(existing, target, batch_size):
+            batch = [
+                Illustration(
+                    user=user,
+                    factory=factory,
+                    engine_model=engines[i % len(engines)],
+                    part_category=category,
+                    part_subcategory=subcategories[i % len(subcategories)],
+                    title=f'{BENCH_PREFIX}-{i}',
+                )
+                for i in range(offset, min(offset + batch_size, target))
+            ]
+            created = Illustration.objects.bulk_create(batch, batch_size=1000)
+            if not created or created[0].pk is None:
+                titles = [obj.title for obj in batch]
+                created = list(Illustration.objects.filter(title__in=titles).only('id', 'title'))
+            # Two thirds of the illustrations are car-specific, the rest are generic
+            links = [
+                through(illustration_id=obj.pk, carmodel_id=cars[(obj.pk + k) % len(cars)].pk)
+                for obj in created if obj.pk % 3
+                for k in range(2)
+            ]
+            through.objects.bulk_create(links, batch_size=2000, ignore_conflicts=True)
+        # bulk_create skips the signals that maintain the catalog counters
+        counters.refresh_all()
+        transaction.on_commit(catalog.bump_catalog_version)
+        transaction.on_commit(response_cache.invalidate)
+        self.stdout.write(
+            f'Seeded {target - existing} illustrations in {time.perf_counter() - started:.1f}s'
+        )
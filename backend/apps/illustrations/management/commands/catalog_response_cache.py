@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.illustrations import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counts of the catalog API response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+        parser.add_argument('--clear', action='store_true', help='Evict every cached catalog response')
+
+    def handle(self, *args, **options):
+        for resource, counts in response_cache.stats().items():
+            rate = '-' if counts['hit_rate'] is None else f"{counts['hit_rate']:.1%}"
+            self.stdout.write(f"{resource:<20} hits {counts['hits']:>8}  misses {counts['misses']:>8}  hit rate {rate}")
+
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write('Counters reset')
+        if options['clear']:
+            response_cache.invalidate()
+            self.stdout.write('Cached responses evicted')
+        self.stdout.write(self.style.SUCCESS('Done'))
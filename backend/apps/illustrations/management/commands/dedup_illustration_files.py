@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from apps.illustrations import blobs
+from apps.illustrations.metadata import file_checksum
+from apps.illustrations.models import FileBlob, IllustrationFile
+from apps.illustrations.renditions import delete_renditions
+from apps.jobs.queue import enqueue
+
+
+def human_size(num):
+    for unit in ('B', 'KB', 'MB'):
+        if num < 1024:
+            return f'{num:.1f} {unit}'
+        num /= 1024
+    return f'{num:.1f} GB'
+
+
+class Command(BaseCommand):
+    help = 'Move illustration files into content-addressed storage (blobs/), keeping one copy per distinct content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be saved')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = IllustrationFile._meta.get_field('file').storage
+        files = IllustrationFile.objects.filter(blob__isnull=True).exclude(file='').order_by('pk')
+
+        seen = set(FileBlob.objects.values_list('sha256', flat=True))
+        moved = duplicates = unreadable = saved = 0
+        for file_obj in files.only('pk', 'file', 'renditions').iterator(chunk_size=200):
+            old_name = file_obj.file.name
+            try:
+                with storage.open(old_name, 'rb') as handle:
+                    sha256 = file_checksum(handle)
+                    size = handle.tell()
+            except OSError as e:
+                unreadable += 1
+                self.stdout.write(self.style.WARNING(f'IllustrationFile {file_obj.pk}: {e}'))
+                continue
+
+            if sha256 in seen:
+                duplicates += 1
+                saved += size
+            seen.add(sha256)
+            moved += 1
+            if dry_run:
+                continue
+
+            with transaction.atomic(), storage.open(old_name, 'rb') as content:
+                content.name = old_name
+                blob = blobs.acquire(content, storage, sha256)
+                IllustrationFile.objects.filter(pk=file_obj.pk).update(
+                    file=blob.name,
+                    blob=blob,
+                    checksum=sha256,
+                    renditions={},
+                    processing_status=IllustrationFile.PROCESSING_PENDING
+                )
+                # Renditions are rebuilt (or shared) at the blob's location
+                enqueue('illustrations.process_file', file_id=file_obj.pk)
+
+            delete_renditions(file_obj)
+            storage.delete(old_name)
+
+        repaired = 0 if dry_run else self.recount()
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(
+            f'{prefix}{moved} files moved to blobs, {duplicates} duplicates removed, '
+            f'{unreadable} unreadable'
+        )
+        if repaired:
+            self.stdout.write(self.style.WARNING(f'Repaired {repaired} blob reference counts'))
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Space saved: {human_size(saved)}'))
+
+    def recount(self):
+        """Reset every FileBlob.ref_count to the number of files referencing it."""
+        stale = FileBlob.objects.annotate(refs=Count('files')).exclude(ref_count=F('refs'))
+        repaired = 0
+        for blob in stale:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=blob.refs)
+            repaired += 1
+        return repaired
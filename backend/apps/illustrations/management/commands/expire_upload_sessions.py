@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.illustrations import chunked_uploads
+from apps.illustrations.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Abort chunked uploads that received nothing for CHUNKED_UPLOAD_EXPIRE_HOURS and delete their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.CHUNKED_UPLOAD_EXPIRE_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(status=UploadSession.UPLOADING, updated_at__lt=cutoff)
+
+        expired = 0
+        for session in stale.iterator():
+            chunked_uploads.abort(session)
+            expired += 1
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} upload sessions'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.illustrations.models import IllustrationFile
+from apps.jobs.models import Job
+from apps.jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Queue thumbnail renditions for illustration files (illustrations.process_file)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only files without renditions and no processing job pending (cheap, for startup)'
+        )
+
+    def handle(self, *args, **options):
+        files = IllustrationFile.objects.exclude(file='').filter(file_type__in=['image', 'pdf']).order_by('pk')
+        ids = files.values_list('pk', flat=True)
+        pending = set()
+        if options['missing']:
+            ids = ids.filter(renditions={})
+            pending = {
+                payload.get('file_id') for payload in Job.objects.filter(
+                    task='illustrations.process_file', status__in=[Job.QUEUED, Job.RUNNING]
+                ).values_list('payload', flat=True)
+            }
+
+        queued = 0
+        for file_id in list(ids):
+            if file_id in pending:
+                continue
+            enqueue('illustrations.process_file', file_id=file_id)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {queued} files for renditions'))
@@ -0,0 +1,117 @@
+import csv
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.accounts.utils.activity_logger import log_activity
+from apps.illustrations import catalog, counters, response_cache, search, suggest
+from apps.illustrations.catalog_import import RECORD_TYPES, CatalogImporter
+
+User = get_user_model()
+
+
+def read_jsonl(handle):
+    for line_no, line in enumerate(handle, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+
+
+def read_csv(handle):
+    # Line 1 is the header
+    for line_no, row in enumerate(csv.DictReader(handle), start=2):
+        yield line_no, row, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Import manufacturers, engines, car models (with engine links), part categories, '
+        'subcategories and illustration records from CSV or JSONL, in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV / JSONL file, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension')
+        parser.add_argument('--type', choices=RECORD_TYPES, help='Record type for rows without a "type" field')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', help='Email of the owner of imported illustrations')
+        parser.add_argument('--dry-run', action='store_true', help='Run everything, then roll back')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"User not found: {options['user']}")
+
+        importer = CatalogImporter(batch_size=options['batch_size'], user=user)
+        started = time.monotonic()
+        handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            with transaction.atomic():
+                reader = read_csv(handle) if fmt == 'csv' else read_jsonl(handle)
+                for line_no, record, error in reader:
+                    if error:
+                        importer.records += 1
+                        importer.errors.append((line_no, error))
+                        continue
+                    if options['type'] and not record.get('type'):
+                        record['type'] = options['type']
+                    importer.add(record, line_no)
+                importer.flush()
+
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                else:
+                    # bulk writes skip the signals: rebuild counters and search documents once,
+                    # then invalidate the tree cache
+                    counters.refresh_all()
+                    ids = sorted(importer.illustration_ids)
+                    for start in range(0, len(ids), options['batch_size']):
+                        search.index_illustrations(ids[start:start + options['batch_size']])
+                    transaction.on_commit(catalog.bump_catalog_version)
+                    transaction.on_commit(suggest.invalidate)
+                    transaction.on_commit(response_cache.invalidate)
+                    log_activity(
+                        None, user, 'IMPORT', 'Catalog',
+                        object_repr=os.path.basename(path),
+                        description=f'Imported {importer.records} records',
+                        changes={'stats': importer.stats, 'links': importer.links, 'errors': len(importer.errors)}
+                    )
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        self.report(importer, time.monotonic() - started, options['dry_run'])
+
+    def report(self, importer, elapsed, dry_run):
+        prefix = '[dry run] ' if dry_run else ''
+        for record_type, counts in importer.stats.items():
+            if counts['created'] or counts['updated']:
+                self.stdout.write(f"{record_type:<14}{counts['created']:>8} created{counts['updated']:>8} updated")
+        self.stdout.write(f'{"links":<14}{importer.links:>8} created')
+
+        for line_no, message in importer.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'line {line_no}: {message}'))
+        if len(importer.errors) > 20:
+            self.stdout.write(self.style.WARNING(f'... {len(importer.errors) - 20} more errors'))
+
+        rate = importer.records / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{importer.records} records in {elapsed:.1f}s ({rate:,.0f} records/s), '
+            f'{len(importer.errors)} skipped'
+        ))
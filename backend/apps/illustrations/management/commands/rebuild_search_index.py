@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.illustrations import search
+from apps.illustrations.models import Illustration
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the illustration full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only index illustrations that have no search document yet (cheap, for startup)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Illustration.objects.order_by('pk')
+        if options['missing']:
+            queryset = queryset.filter(search_document__isnull=True)
+        ids = list(queryset.values_list('pk', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, len(ids), batch_size):
+            search.index_illustrations(ids[start:start + batch_size])
+            self.stdout.write(f'  {min(start + batch_size, len(ids))}/{len(ids)}')
+        backend = 'MySQL FULLTEXT (ngram)' if search.uses_fulltext() else 'inverted index'
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(ids)} illustrations ({backend})'))
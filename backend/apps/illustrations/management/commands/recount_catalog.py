@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.illustrations import catalog, counters, response_cache
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized catalog counters (illustration/engine/car model counts) from scratch'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = counters.refresh_all()
+            transaction.on_commit(catalog.bump_catalog_version)
+            transaction.on_commit(response_cache.invalidate)
+
+        for model_name, changed in drift.items():
+            if changed:
+                self.stdout.write(self.style.WARNING(f'{model_name}: repaired {changed} rows'))
+            else:
+                self.stdout.write(f'{model_name}: OK')
+        self.stdout.write(self.style.SUCCESS('Catalog counters are up to date'))
@@ -0,0 +1,67 @@
+"""
+File metadata stored on IllustrationFile (size, checksum, PDF page count,
+image dimensions), so read paths never have to open or stat the file.
+
+`extract_metadata` is called by the post-upload job (tasks.py) and by
+`manage.py backfill_file_metadata` for rows uploaded before these fields.
+"""
+import hashlib
+import logging
+
+from PIL import Image, UnidentifiedImageError
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+except ImportError:  # optional: page_count stays empty without it
+    PdfReader = None
+    PdfReadError = Exception
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+METADATA_FIELDS = ['file_size', 'checksum', 'page_count', 'width', 'height']
+
+
+def file_checksum(handle):
+    """SHA-256 hex digest of an open file, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: handle.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_page_count(handle):
+    if PdfReader is None:
+        logger.warning('pypdf is not installed; skipping PDF page count')
+        return None
+    try:
+        return len(PdfReader(handle).pages)
+    except (PdfReadError, ValueError, OSError) as e:
+        logger.warning('Could not read PDF page count: %s', e)
+        return None
+
+
+def image_dimensions(handle):
+    try:
+        with Image.open(handle) as image:
+            return image.size
+    except (UnidentifiedImageError, OSError):
+        return None, None
+
+
+def extract_metadata(file_obj):
+    """Read `file_obj.file` once and set the metadata fields on the instance (not saved)."""
+    with file_obj.file.open('rb') as handle:
+        file_obj.checksum = file_checksum(handle)
+        file_obj.file_size = handle.tell()
+
+        handle.seek(0)
+        file_obj.page_count = pdf_page_count(handle) if file_obj.file_type == 'pdf' else None
+
+        handle.seek(0)
+        if file_obj.file_type == 'image':
+            file_obj.width, file_obj.height = image_dimensions(handle)
+        else:
+            file_obj.width = file_obj.height = None
+    return {field: getattr(file_obj, field) for field in METADATA_FIELDS}
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0008_delete_submittedillustration'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='illustration',
+            index=models.Index(fields=['created_at', 'id'], name='illustration_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='illustration',
+            index=models.Index(fields=['updated_at', 'id'], name='illustration_updated_id_idx'),
+        ),
+    ]
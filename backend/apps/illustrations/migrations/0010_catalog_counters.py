@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0009_illustration_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carmodel',
+            name='engine_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='carmodel',
+            name='illustration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enginemodel',
+            name='car_model_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enginemodel',
+            name='illustration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='manufacturer',
+            name='car_model_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='manufacturer',
+            name='engine_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='manufacturer',
+            name='illustration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='partcategory',
+            name='illustration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='partcategory',
+            name='subcategory_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='partsubcategory',
+            name='illustration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Exists, Func, IntegerField, OuterRef, Q, Subquery
+
+# Frozen copy of counters.refresh_all(): fills the counter columns of 0010
+# and the matrix once, so deploys do not have to recount the catalog.
+MATRIX_KEY = ('engine_model_id', 'part_category_id', 'part_subcategory_id')
+
+
+class CountDistinct(Func):
+    function = 'COUNT'
+    template = '%(function)s(DISTINCT %(expressions)s)'
+    output_field = IntegerField()
+
+
+def count_subquery(queryset):
+    return Subquery(queryset.order_by().annotate(_n=CountDistinct('pk')).values('_n'))
+
+
+def fill_counters(apps, schema_editor):
+    Manufacturer = apps.get_model('illustrations', 'Manufacturer')
+    EngineModel = apps.get_model('illustrations', 'EngineModel')
+    CarModel = apps.get_model('illustrations', 'CarModel')
+    PartCategory = apps.get_model('illustrations', 'PartCategory')
+    PartSubCategory = apps.get_model('illustrations', 'PartSubCategory')
+    Illustration = apps.get_model('illustrations', 'Illustration')
+    IllustrationCountMatrix = apps.get_model('illustrations', 'IllustrationCountMatrix')
+    IllustrationCarModel = Illustration.applicable_car_models.through
+
+    is_generic = ~Exists(IllustrationCarModel.objects.filter(illustration_id=OuterRef('pk')))
+    car_illustrations = Illustration.objects.filter(engine_model__car_models=OuterRef('pk')).filter(
+        Q(is_generic) | Q(Exists(IllustrationCarModel.objects.filter(
+            illustration_id=OuterRef('pk'), carmodel_id=OuterRef(OuterRef('pk'))
+        )))
+    )
+    Manufacturer.objects.update(
+        engine_count=count_subquery(EngineModel.objects.filter(manufacturer=OuterRef('pk'))),
+        car_model_count=count_subquery(CarModel.objects.filter(manufacturer=OuterRef('pk'))),
+        illustration_count=count_subquery(Illustration.objects.filter(engine_model__manufacturer=OuterRef('pk'))),
+    )
+    EngineModel.objects.update(
+        car_model_count=count_subquery(CarModel.objects.filter(engines=OuterRef('pk'))),
+        illustration_count=count_subquery(Illustration.objects.filter(engine_model=OuterRef('pk'))),
+    )
+    CarModel.objects.update(
+        engine_count=count_subquery(EngineModel.objects.filter(car_models=OuterRef('pk'))),
+        illustration_count=count_subquery(car_illustrations),
+    )
+    PartCategory.objects.update(
+        subcategory_count=count_subquery(PartSubCategory.objects.filter(part_category=OuterRef('pk'))),
+        illustration_count=count_subquery(Illustration.objects.filter(part_category=OuterRef('pk'))),
+    )
+    PartSubCategory.objects.update(
+        illustration_count=count_subquery(Illustration.objects.filter(part_subcategory=OuterRef('pk'))),
+    )
+
+    rows = [
+        IllustrationCountMatrix(car_model_id=None, **row)
+        for row in Illustration.objects.order_by().values(*MATRIX_KEY).annotate(
+            count=Count('pk'), generic_count=Count('pk', filter=Q(is_generic))
+        )
+    ]
+    links = IllustrationCarModel.objects.order_by().values(
+        *(f'illustration__{field}' for field in MATRIX_KEY), 'carmodel_id'
+    ).annotate(n=Count('illustration_id'))
+    rows.extend(
+        IllustrationCountMatrix(
+            car_model_id=link['carmodel_id'],
+            count=link['n'],
+            **{field: link[f'illustration__{field}'] for field in MATRIX_KEY}
+        )
+        for link in links
+    )
+    IllustrationCountMatrix.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0010_catalog_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IllustrationCountMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('generic_count', models.PositiveIntegerField(default=0)),
+                ('car_model', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='illustrations.carmodel')),
+                ('engine_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='illustrations.enginemodel')),
+                ('part_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='count_matrix', to='illustrations.partcategory')),
+                ('part_subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='count_matrix', to='illustrations.partsubcategory')),
+            ],
+            options={
+                'verbose_name': 'Illustration Count',
+                'verbose_name_plural': 'Illustration Count Matrix',
+                'indexes': [models.Index(fields=['engine_model', 'part_category', 'part_subcategory'], name='illustratio_engine__0ab430_idx'), models.Index(fields=['car_model', 'part_category'], name='illustratio_car_mod_6ede9e_idx')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
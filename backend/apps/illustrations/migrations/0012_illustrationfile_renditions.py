@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0011_illustration_count_matrix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
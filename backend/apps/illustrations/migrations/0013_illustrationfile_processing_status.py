@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Files uploaded before background processing were handled in the
+    # request; only new uploads go through illustrations.process_file
+    IllustrationFile = apps.get_model('illustrations', 'IllustrationFile')
+    IllustrationFile.objects.update(processing_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0012_illustrationfile_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
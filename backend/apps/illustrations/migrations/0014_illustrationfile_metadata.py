@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0013_illustrationfile_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='checksum',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the file', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='illustrationfile',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
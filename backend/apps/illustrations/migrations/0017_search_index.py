@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    # MySQL only; other backends use the IllustrationSearchTerm inverted index
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = 'illustrations_illustrationsearchdocument'
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD FULLTEXT INDEX search_document_ft (title_text, body_text) WITH PARSER ngram'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD FULLTEXT INDEX search_title_ft (title_text) WITH PARSER ngram'
+    )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = 'illustrations_illustrationsearchdocument'
+    schema_editor.execute(f'ALTER TABLE {table} DROP INDEX search_document_ft, DROP INDEX search_title_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0016_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IllustrationSearchDocument',
+            fields=[
+                ('illustration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='illustrations.illustration')),
+                ('title_text', models.TextField(blank=True)),
+                ('body_text', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Illustration Search Document',
+                'verbose_name_plural': 'Illustration Search Documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='IllustrationSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('illustration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='illustrations.illustration')),
+            ],
+            options={
+                'verbose_name': 'Illustration Search Term',
+                'verbose_name_plural': 'Illustration Search Terms',
+                'indexes': [models.Index(fields=['term', 'illustration'], name='illustratio_term_1e9242_idx')],
+            },
+        ),
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+    ]
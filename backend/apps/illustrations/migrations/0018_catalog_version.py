@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('illustrations', '0017_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Catalog Version',
+                'verbose_name_plural': 'Catalog Versions',
+            },
+        ),
+    ]
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 import os
 from django.utils.text import slugify
@@ -18,6 +18,11 @@ class Manufacturer(models.Model):
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(unique=True)
 
+    # Denormalized counters (maintained by counters.py, repaired by `recount_catalog`)
+    engine_count = models.PositiveIntegerField(default=0, editable=False)
+    car_model_count = models.PositiveIntegerField(default=0, editable=False)
+    illustration_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "Manufacturer"
         verbose_name_plural = "Manufacturers"
@@ -58,6 +63,10 @@ class EngineModel(models.Model):
     
     slug = models.SlugField(unique=True, blank=True)
 
+    # Denormalized counters (maintained by counters.py, repaired by `recount_catalog`)
+    car_model_count = models.PositiveIntegerField(default=0, editable=False)
+    illustration_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "Engine Model"
         verbose_name_plural = "Engine Models"
@@ -157,6 +166,10 @@ class CarModel(models.Model):
     
     slug = models.SlugField(unique=True)
 
+    # Denormalized counters (maintained by counters.py, repaired by `recount_catalog`)
+    engine_count = models.PositiveIntegerField(default=0, editable=False)
+    illustration_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "Car Model"
         verbose_name_plural = "Car Models"
@@ -200,6 +213,10 @@ class PartCategory(models.Model):
     description = models.TextField(blank=True)
     slug = models.SlugField(unique=True)
     order = models.IntegerField(default=0, help_text="Display order (lower = first)")
+
+    # Denormalized counters (maintained by counters.py, repaired by `recount_catalog`)
+    subcategory_count = models.PositiveIntegerField(default=0, editable=False)
+    illustration_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name = "Part Category"
@@ -226,6 +243,9 @@ class PartSubCategory(models.Model):
     description = models.TextField(blank=True)
     slug = models.SlugField()
     order = models.IntegerField(default=0, help_text="Display order (lower = first)")
+
+    # Denormalized counter (maintained by counters.py, repaired by `recount_catalog`)
+    illustration_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name = "Part Subcategory"
@@ -315,6 +335,9 @@ class Illustration(models.Model):
             models.Index(fields=['engine_model', 'part_category']),
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['factory']),
+            # Keyset pagination: (ordering field, id) range scans
+            models.Index(fields=['created_at', 'id'], name='illustration_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='illustration_updated_id_idx'),
         ]
         # Ensure no duplicate illustrations for same engine+category+subcategory+title
         unique_together = ['engine_model', 'part_category', 'part_subcategory', 'title']
@@ -326,7 +349,7 @@ class Illustration(models.Model):
         # Auto-populate factory from user if not already set
         if not self.factory and self.user:
             # Try to get the user's first active factory
-            active_membership = self.user.get_active_memberships().first()
+            active_membership = self.user.permission_snapshot.first_membership
             if active_membership:
                 self.factory = active_membership.factory
             
@@ -370,6 +393,38 @@ def submitted_illustration_path(instance, filename):
 
 
 
+def file_type_from_name(name):
+    ext = name.split('.')[-1].lower()
+    if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp']:
+        return 'image'
+    if ext == 'pdf':
+        return 'pdf'
+    return 'other'
+
+
+# ------------------------------
+# File Blob (content-addressed storage)
+# ------------------------------
+class FileBlob(models.Model):
+    """
+    One stored file content, shared by every IllustrationFile with the same
+    SHA-256 (FILE_STORAGE_MODE = 'content', see blobs.py).
+    ref_count is the number of IllustrationFile rows pointing at it.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, help_text="Storage name of the content")
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "File Blob"
+        verbose_name_plural = "File Blobs"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
 # ------------------------------
 # Illustration File (Multi-file)
 # ------------------------------
@@ -398,6 +453,42 @@ class IllustrationFile(models.Model):
         help_text="User-friendly title for the file"
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Set when the file is stored content-addressed; `file` then names the blob
+    blob = models.ForeignKey(
+        FileBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='files'
+    )
+    # {"<size>": {"webp": name, "jpeg": name}} - see renditions.py
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Metadata recorded at upload time (see metadata.py); null until processed
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    checksum = models.CharField(max_length=64, blank=True, editable=False, help_text="SHA-256 of the file")
+    page_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    # Post-upload processing (type sniffing, metadata, thumbnails) runs as a background job
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING_PENDING, 'Pending'),
+        (PROCESSING_RUNNING, 'Processing'),
+        (PROCESSING_READY, 'Ready'),
+        (PROCESSING_FAILED, 'Failed'),
+    ]
+    processing_status = models.CharField(
+        max_length=10,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PROCESSING_PENDING,
+        editable=False
+    )
 
     class Meta:
         verbose_name = "Illustration File"
@@ -405,21 +496,79 @@ class IllustrationFile(models.Model):
         ordering = ['uploaded_at']
 
     def save(self, *args, **kwargs):
-        # Auto-detect file type
-        if self.file:
-            ext = self.file.name.split('.')[-1].lower()
-            if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp']:
-                self.file_type = 'image'
-            elif ext == 'pdf':
-                self.file_type = 'pdf'
-            else:
-                self.file_type = 'other'
-        super().save(*args, **kwargs)
+        from . import blobs
+
+        replaced_blob = None
+        with transaction.atomic():
+            # Quick guess from the extension of a new upload; the processing job
+            # confirms it from the content
+            if self.file and not self.file._committed:
+                # Size of the upload itself, before it reaches storage
+                self.file_size = self.file.size
+                self.file_type = file_type_from_name(self.file.name)
+
+                if blobs.content_addressed():
+                    if self.blob_id:
+                        replaced_blob = self.blob_id
+                    self.blob = blobs.acquire(self.file.file, self.file.storage)
+                    self.checksum = self.blob.sha256
+                    self.file = self.blob.name
+                    self.renditions = {}
+            super().save(*args, **kwargs)
+            if replaced_blob:
+                blobs.release(replaced_blob)
 
     def __str__(self):
         return f"{self.illustration.title} - {self.file.name}"
 
 
+# ------------------------------
+# Upload Session (chunked uploads)
+# ------------------------------
+class UploadSession(models.Model):
+    """
+    A resumable upload of one large file (see chunked_uploads.py).
+
+    Chunks are appended at `offset` to a partial file in storage; on
+    completion the file becomes an IllustrationFile of `illustration`.
+    """
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+    ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (UPLOADING, 'Uploading'),
+        (COMPLETE, 'Complete'),
+        (ABORTED, 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    illustration = models.ForeignKey(Illustration, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField(help_text="Total size in bytes announced by the client")
+    offset = models.PositiveBigIntegerField(default=0, help_text="Bytes received so far")
+    part_name = models.CharField(max_length=255, help_text="Storage name of the partial file")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    illustration_file = models.ForeignKey(
+        IllustrationFile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
 # ------------------------------
 # Favorite Illustration
 # ------------------------------
@@ -452,4 +601,129 @@ class FavoriteIllustration(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.illustration.title}"
\ No newline at end of file
+        return f"{self.user.username} - {self.illustration.title}"
+
+# ------------------------------
+# Illustration Count Matrix
+# ------------------------------
+class IllustrationCountMatrix(models.Model):
+    """
+    Materialized illustration counts per (engine, car model, category, subcategory)
+    for the category navigation drill-down.
+
+    - car_model NULL: `count` is every illustration of the key, `generic_count`
+      the ones without specific car models (they apply to every car).
+    - car_model set: `count` is the illustrations explicitly linked to that car.
+
+    Rows are rebuilt per key by counters.refresh_matrix() from illustration signals.
+    """
+    engine_model = models.ForeignKey(
+        EngineModel,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    car_model = models.ForeignKey(
+        CarModel,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    part_category = models.ForeignKey(
+        PartCategory,
+        on_delete=models.CASCADE,
+        related_name='count_matrix'
+    )
+    part_subcategory = models.ForeignKey(
+        PartSubCategory,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='count_matrix'
+    )
+    count = models.PositiveIntegerField(default=0)
+    generic_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Illustration Count"
+        verbose_name_plural = "Illustration Count Matrix"
+        indexes = [
+            models.Index(fields=['engine_model', 'part_category', 'part_subcategory']),
+            models.Index(fields=['car_model', 'part_category']),
+        ]
+
+    def __str__(self):
+        return f"{self.engine_model_id}/{self.car_model_id}/{self.part_category_id}/{self.part_subcategory_id}: {self.count}"
+
+
+# ------------------------------
+# Illustration Search Index
+# ------------------------------
+class IllustrationSearchDocument(models.Model):
+    """
+    Normalized (NFKC, case-folded) search text of one illustration: its
+    title, plus description and engine / category / subcategory / car
+    model names. MySQL searches these columns through FULLTEXT ngram
+    indexes (migration 0017); see search.py.
+    """
+    illustration = models.OneToOneField(
+        Illustration,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title_text = models.TextField(blank=True)
+    body_text = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Illustration Search Document"
+        verbose_name_plural = "Illustration Search Documents"
+
+    def __str__(self):
+        return f"{self.illustration_id}: {self.title_text[:50]}"
+
+
+class IllustrationSearchTerm(models.Model):
+    """
+    Inverted index (term -> illustration, weight) used where the database
+    has no FULLTEXT support (SQLite). Terms come from search.tokenize().
+    """
+    term = models.CharField(max_length=64)
+    illustration = models.ForeignKey(
+        Illustration,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Illustration Search Term"
+        verbose_name_plural = "Illustration Search Terms"
+        indexes = [
+            models.Index(fields=['term', 'illustration']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.illustration_id} ({self.weight})"
+
+
+# ------------------------------
+# Catalog Versions
+# ------------------------------
+class CatalogVersion(models.Model):
+    """
+    Version counters of the catalog caches (tree, typeahead).
+    Bumped with an UPDATE ... + 1 so concurrent writers never share a
+    number, which cache.incr on the file based cache cannot promise; see
+    versions.py.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Catalog Version"
+        verbose_name_plural = "Catalog Versions"
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
@@ -1,6 +1,144 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
 
 class DefaultPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
-    max_page_size = 50
\ No newline at end of file
+    max_page_size = 50
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination, enabled by sending `?cursor=`.
+
+    Pages are keyed on (<ordering field>, id), so each fetch is an index
+    range scan: no OFFSET and no COUNT(*), whatever the depth.
+    Only orderings backed by a (<field>, id) composite index are accepted.
+    """
+    cursor_query_param = 'cursor'
+    page_size = DefaultPagination.page_size
+    page_size_query_param = DefaultPagination.page_size_query_param
+    max_page_size = DefaultPagination.max_page_size
+    ordering_param = api_settings.ORDERING_PARAM
+    indexed_orderings = ('created_at', 'updated_at')
+    default_ordering = '-created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+        position, reverse = self.decode_cursor(request)
+
+        # Walking backwards flips the comparison and the sort direction
+        descending = self.descending != reverse
+        if position is not None:
+            value, pk = position
+            if descending:
+                queryset = queryset.filter(Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'pk__lt': pk}))
+            else:
+                queryset = queryset.filter(Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'pk__gt': pk}))
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param) or self.default_ordering
+        term = ordering.split(',')[0].strip()
+        field = term.lstrip('-')
+        if field not in self.indexed_orderings:
+            raise ValidationError({
+                self.ordering_param: f'Cursor pagination supports ordering by {", ".join(self.indexed_orderings)} only'
+            })
+        return field, term.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            value = parse_datetime(payload['v'])
+            pk = int(payload['id'])
+            if value is None or payload.get('f') != self.field:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        return (value, pk), bool(payload.get('r'))
+
+    def encode_cursor(self, obj, reverse):
+        payload = {
+            'f': self.field,
+            'v': getattr(obj, self.field).isoformat(),
+            'id': obj.pk,
+        }
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -0,0 +1,159 @@
+"""
+Thumbnails ("renditions") for IllustrationFile images and PDFs.
+
+Every file gets WebP + JPEG renditions at RENDITION_SIZES (longest edge, px),
+stored next to the original:
+
+    illustrations/<mfr>/<engine>/<cat>/<sub>/<id>/renditions/<stem>_<size>.<ext>
+
+and recorded in IllustrationFile.renditions as {"<size>": {"webp": name, "jpeg": name}}.
+PDFs are rasterized from their first page with poppler's `pdftoppm`
+(skipped, with a warning, when it is not installed).
+
+Generation runs in the post-upload job (tasks.py), off the request path;
+`manage.py generate_renditions [--missing]` queues it for existing files.
+Files stored content-addressed (blobs.py) share one set of renditions per blob.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = (160, 320, 640)
+THUMBNAIL_SIZE = 320
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+class RenditionError(Exception):
+    pass
+
+
+def rendition_name(file_name, size, ext):
+    directory, base = os.path.split(file_name)
+    stem, _ = os.path.splitext(base)
+    return os.path.join(directory, 'renditions', f'{stem}_{size}.{ext}')
+
+
+def rendition_url(renditions, size=THUMBNAIL_SIZE, fmt='webp', storage=None):
+    """Storage URL of one rendition, or None when it does not exist (yet)."""
+    name = ((renditions or {}).get(str(size)) or {}).get(fmt)
+    if not name:
+        return None
+    if storage is None:
+        from .models import IllustrationFile
+        storage = IllustrationFile._meta.get_field('file').storage
+    return storage.url(name)
+
+
+def rasterize_pdf(path):
+    """First page of a PDF as a PIL image, via `pdftoppm`."""
+    binary = shutil.which('pdftoppm')
+    if not binary:
+        raise RenditionError('pdftoppm (poppler-utils) is not installed')
+    largest = max(RENDITION_SIZES)
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, 'page')
+        try:
+            subprocess.run(
+                [binary, '-f', '1', '-l', '1', '-singlefile', '-png',
+                 '-scale-to', str(largest), path, prefix],
+                check=True, capture_output=True, timeout=60
+            )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            raise RenditionError(f'pdftoppm failed: {e}')
+        with Image.open(f'{prefix}.png') as page:
+            page.load()
+            return page.copy()
+
+
+def open_source_image(file_obj):
+    if file_obj.file_type == 'pdf':
+        try:
+            return rasterize_pdf(file_obj.file.path)
+        except NotImplementedError:
+            raise RenditionError('PDF renditions need a local file storage')
+    try:
+        with file_obj.file.open('rb') as handle:
+            image = Image.open(handle)
+            image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise RenditionError(f'Not a readable image: {e}')
+    # Respect camera orientation before resizing
+    return ImageOps.exif_transpose(image)
+
+
+def encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def all_rendition_names(file_name):
+    return {
+        str(size): {fmt: rendition_name(file_name, size, fmt) for fmt in FORMATS}
+        for size in RENDITION_SIZES
+    }
+
+
+def shared_renditions(file_obj):
+    """Renditions another file with the same blob already generated, else None."""
+    if not file_obj.blob_id:
+        return None
+    names = all_rendition_names(file_obj.file.name)
+    storage = file_obj.file.storage
+    if all(storage.exists(name) for formats in names.values() for name in formats.values()):
+        return names
+    return None
+
+
+def generate_renditions(file_obj):
+    """Create all renditions of `file_obj` and save the `renditions` field."""
+    if not file_obj.file or file_obj.file_type not in ('image', 'pdf'):
+        return {}
+    storage = file_obj.file.storage
+    source = open_source_image(file_obj)
+
+    # Blob renditions live at fixed names shared by all files of the blob
+    shared = bool(file_obj.blob_id)
+    if not shared:
+        delete_renditions(file_obj)
+    renditions = {}
+    for size in RENDITION_SIZES:
+        resized = source.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        renditions[str(size)] = {}
+        for fmt in FORMATS:
+            name = rendition_name(file_obj.file.name, size, fmt)
+            if shared and storage.exists(name):
+                storage.delete(name)
+            renditions[str(size)][fmt] = storage.save(name, ContentFile(encode(resized, fmt)))
+
+    file_obj.renditions = renditions
+    file_obj.save(update_fields=['renditions'])
+    return renditions
+
+
+def delete_renditions(file_obj):
+    storage = file_obj.file.storage
+    for formats in (file_obj.renditions or {}).values():
+        for name in formats.values():
+            try:
+                storage.delete(name)
+            except OSError:
+                logger.warning('Could not delete rendition %s', name)
@@ -0,0 +1,187 @@
+"""
+Server-side response cache for the read-only side of the catalog viewsets
+(manufacturers, engine models, car models, part categories/subcategories).
+
+Their list/retrieve data is the same for every user allowed to read it, so
+CachedResponseMixin stores `response.data` in the `catalog` cache alias
+(CACHES in settings: locmem, file, or Redis via CATALOG_CACHE_BACKEND),
+keyed on the resource, the action, the URL kwargs and the normalized query
+parameters. Permissions still run on every request; only the queryset and
+serializer work is skipped.
+
+Each resource has a generation number that is part of its keys. Catalog
+signals bump the generation of exactly the resources a model feeds
+(DEPENDENCIES): a car model rename evicts car models, engines and
+manufacturers, not the part categories. The bump happens right away and
+again on commit, so no reader can cache pre-commit data under the new
+generation. Bulk writes that skip signals call invalidate().
+
+Hits and misses are counted per resource in the same cache (see stats()
+and `manage.py catalog_response_cache`); responses carry `X-Cache`.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Manufacturer, EngineModel, CarModel, PartCategory, PartSubCategory, Illustration
+
+CACHE_ALIAS = 'catalog'
+GENERATION_KEY = 'catalog:response:{resource}:generation'
+RESPONSE_KEY = 'catalog:response:{resource}:{generation}:{action}:{digest}'
+STATS_KEY = 'catalog:response:{resource}:{outcome}'
+
+RESOURCES = ['manufacturers', 'engine_models', 'car_models', 'part_categories', 'part_subcategories']
+
+# Written model -> resources whose responses show its data (names, nested rows or counters)
+DEPENDENCIES = {
+    Manufacturer: ['manufacturers', 'engine_models', 'car_models'],
+    EngineModel: ['engine_models', 'manufacturers', 'car_models'],
+    CarModel: ['car_models', 'manufacturers', 'engine_models'],
+    CarModel.engines.through: ['car_models', 'engine_models'],
+    PartCategory: ['part_categories', 'part_subcategories'],
+    PartSubCategory: ['part_subcategories', 'part_categories'],
+    # illustration_count counters and the context counts of the navigation; only
+    # creates, deletes and moves evict (signals.evict_catalog_responses)
+    Illustration: RESOURCES,
+    Illustration.applicable_car_models.through: ['car_models', 'part_categories', 'part_subcategories'],
+}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+# --------------------------------------------------------------------------
+# Generations
+# --------------------------------------------------------------------------
+def get_generation(resource):
+    cache = get_cache()
+    key = GENERATION_KEY.format(resource=resource)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so a flushed cache never reuses an old generation
+        generation = int(time.time() * 1000)
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump(resources):
+    cache = get_cache()
+    for resource in resources:
+        key = GENERATION_KEY.format(resource=resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            get_generation(resource)
+            cache.incr(key)
+
+
+def evict(model):
+    """Evict the resources fed by `model`, now and once the transaction commits."""
+    resources = DEPENDENCIES.get(model, ())
+    bump(resources)
+    transaction.on_commit(lambda: bump(resources))
+
+
+def invalidate():
+    """Evict every resource (after writes that skip signals)."""
+    bump(RESOURCES)
+
+
+# --------------------------------------------------------------------------
+# Keys and metrics
+# --------------------------------------------------------------------------
+def normalize_params(query_params):
+    """Sorted, blank-free query string: ?b=2&a=1&c= and ?a=1&b=2 share a key."""
+    items = []
+    for name in sorted(query_params):
+        values = sorted(value for value in query_params.getlist(name) if value != '')
+        items.extend((name, value) for value in values)
+    return urlencode(items)
+
+
+def response_key(resource, action, request, kwargs):
+    # The host is part of the key: paginated responses hold absolute next/previous links
+    raw = '|'.join([
+        request.get_host(),
+        urlencode(sorted((name, str(value)) for name, value in kwargs.items())),
+        normalize_params(request.query_params),
+    ])
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        resource=resource, generation=get_generation(resource), action=action, digest=digest
+    )
+
+
+def count(resource, outcome):
+    cache = get_cache()
+    key = STATS_KEY.format(resource=resource, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def stats():
+    """{resource: {'hits', 'misses', 'hit_rate'}} since the last reset_stats()."""
+    cache = get_cache()
+    keys = {
+        (resource, outcome): STATS_KEY.format(resource=resource, outcome=outcome)
+        for resource in RESOURCES for outcome in ('hits', 'misses')
+    }
+    values = cache.get_many(keys.values())
+    result = {}
+    for resource in RESOURCES:
+        hits = values.get(keys[(resource, 'hits')], 0)
+        misses = values.get(keys[(resource, 'misses')], 0)
+        total = hits + misses
+        result[resource] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else None,
+        }
+    return result
+
+
+def reset_stats():
+    get_cache().delete_many([
+        STATS_KEY.format(resource=resource, outcome=outcome)
+        for resource in RESOURCES for outcome in ('hits', 'misses')
+    ])
+
+
+# --------------------------------------------------------------------------
+# Viewset mixin
+# --------------------------------------------------------------------------
+class CachedResponseMixin:
+    """Serve list/retrieve from the catalog response cache; set `cache_resource`."""
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_key(self.cache_resource, self.action, request, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            count(self.cache_resource, 'hits')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = handler(request, *args, **kwargs)
+        count(self.cache_resource, 'misses')
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.CATALOG_RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
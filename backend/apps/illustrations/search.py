@@ -0,0 +1,207 @@
+"""
+Full-text search over illustrations (`?search=` on /api/illustrations/).
+
+Each illustration has an IllustrationSearchDocument holding its title and
+the rest of its searchable text (description, manufacturer, engine name
+and code, category, subcategory, car model names), NFKC-normalized and
+case-folded so full-width / half-width and kana variants match.
+
+- MySQL: FULLTEXT indexes WITH PARSER ngram on the document (migration
+  0017). Japanese has no spaces, so the ngram parser indexes every
+  2-character sequence; a query word is matched as a phrase of its ngrams.
+- Other backends (SQLite): tokenize() builds the same kind of terms in
+  Python (bigrams for CJK runs, whole words otherwise) into
+  IllustrationSearchTerm, an inverted index queried with EXISTS per term.
+
+Either way search_queryset() only narrows and annotates the queryset it
+is given, so visibility rules and filters apply as before; results are
+ranked by `search_rank` (title matches weigh more).
+"""
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Exists, FloatField, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import Illustration, IllustrationSearchDocument, IllustrationSearchTerm
+
+TITLE_WEIGHT = 3
+BODY_WEIGHT = 1
+MAX_TERM_LENGTH = IllustrationSearchTerm._meta.get_field('term').max_length
+
+WORD_RE = re.compile(r'\w+')
+# Hiragana, katakana (incl. half-width, normalized away by NFKC), CJK ideographs
+CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+
+def uses_fulltext():
+    return connection.vendor == 'mysql'
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text or '').casefold()
+
+
+def split_runs(word):
+    """Split a word into (is_cjk, text) runs."""
+    position = 0
+    for match in CJK_RE.finditer(word):
+        if match.start() > position:
+            yield False, word[position:match.start()]
+        yield True, match.group()
+        position = match.end()
+    if position < len(word):
+        yield False, word[position:]
+
+
+def tokenize(text):
+    """Index terms of `text`: CJK runs as overlapping bigrams, other runs as words."""
+    terms = []
+    for word in WORD_RE.findall(normalize(text)):
+        for is_cjk, run in split_runs(word):
+            if is_cjk and len(run) > 1:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                terms.append(run[:MAX_TERM_LENGTH])
+    return terms
+
+
+def document_text(illustration):
+    """(title text, body text) of an illustration with its catalog loaded."""
+    engine = illustration.engine_model
+    body = [
+        illustration.description,
+        engine.manufacturer.name,
+        engine.name,
+        engine.engine_code,
+        illustration.part_category.name,
+        illustration.part_subcategory.name if illustration.part_subcategory else '',
+    ]
+    for car in illustration.applicable_car_models.all():
+        body.extend([car.name, car.model_code, car.chassis_code])
+    return normalize(illustration.title), normalize(' '.join(part for part in body if part))
+
+
+# --------------------------------------------------------------------------
+# Indexing
+# --------------------------------------------------------------------------
+def index_illustrations(illustration_ids):
+    """(Re)build the search documents (and terms) of these illustrations."""
+    illustration_ids = list(illustration_ids)
+    if not illustration_ids:
+        return 0
+    illustrations = Illustration.objects.filter(pk__in=illustration_ids).select_related(
+        'engine_model__manufacturer', 'part_category', 'part_subcategory'
+    ).prefetch_related('applicable_car_models')
+
+    documents, terms = [], []
+    for illustration in illustrations:
+        title_text, body_text = document_text(illustration)
+        documents.append(IllustrationSearchDocument(
+            illustration=illustration, title_text=title_text, body_text=body_text
+        ))
+        if not uses_fulltext():
+            weights = {}
+            for weight, text in ((TITLE_WEIGHT, title_text), (BODY_WEIGHT, body_text)):
+                for term in tokenize(text):
+                    weights[term] = weights.get(term, 0) + weight
+            terms.extend(
+                IllustrationSearchTerm(term=term, illustration=illustration, weight=weight)
+                for term, weight in weights.items()
+            )
+
+    with transaction.atomic():
+        IllustrationSearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['illustration'],
+            update_fields=['title_text', 'body_text', 'updated_at'],
+        )
+        if not uses_fulltext():
+            IllustrationSearchTerm.objects.filter(illustration_id__in=illustration_ids).delete()
+            IllustrationSearchTerm.objects.bulk_create(terms, batch_size=1000)
+    return len(documents)
+
+
+def index_for_catalog(**filters):
+    """Reindex every illustration under a renamed catalog entry (e.g. engine_model=3)."""
+    queryset = Illustration.objects.filter(**filters).values_list('pk', flat=True)
+    ids = list(queryset)
+    for start in range(0, len(ids), 500):
+        index_illustrations(ids[start:start + 500])
+    return len(ids)
+
+
+# --------------------------------------------------------------------------
+# Querying
+# --------------------------------------------------------------------------
+def boolean_query(query):
+    """MySQL boolean-mode query: every word required, matched as an ngram phrase."""
+    parts = []
+    for word in WORD_RE.findall(normalize(query)):
+        # Single characters are shorter than the ngram size: match them as a prefix
+        parts.append(f'+{word}*' if len(word) < 2 else f'+"{word}"')
+    return ' '.join(parts)
+
+
+def search_queryset(queryset, query):
+    """Narrow `queryset` to illustrations matching `query`, annotated with `search_rank`."""
+    if uses_fulltext():
+        return fulltext_search(queryset, query)
+    return term_search(queryset, query)
+
+
+def fulltext_search(queryset, query):
+    against = boolean_query(query)
+    if not against:
+        return queryset
+    table = IllustrationSearchDocument._meta.db_table
+    outer = Illustration._meta.db_table
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT illustration_id FROM {table} '
+            f'WHERE MATCH(title_text, body_text) AGAINST (%s IN BOOLEAN MODE)',
+            [against]
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f'(SELECT {TITLE_WEIGHT} * MATCH(d.title_text) AGAINST (%s IN BOOLEAN MODE) '
+            f'+ MATCH(d.title_text, d.body_text) AGAINST (%s IN BOOLEAN MODE) '
+            f'FROM {table} d WHERE d.illustration_id = {outer}.id)',
+            [against, against],
+            output_field=FloatField()
+        )
+    )
+
+
+def term_query(token):
+    if not CJK_RE.fullmatch(token):
+        # Words also match as prefixes ("pist" finds "piston")
+        return Q(term__startswith=token)
+    if len(token) == 1:
+        # A single kana/kanji is the first or last character of some bigram
+        return Q(term__startswith=token) | Q(term__endswith=token)
+    return Q(term=token)
+
+
+def term_search(queryset, query):
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return queryset
+    matched = Q()
+    for token in tokens:
+        condition = term_query(token)
+        queryset = queryset.filter(Exists(
+            IllustrationSearchTerm.objects.filter(condition, illustration_id=OuterRef('pk'))
+        ))
+        matched |= condition
+    rank = (
+        IllustrationSearchTerm.objects.filter(matched, illustration_id=OuterRef('pk'))
+        .order_by()
+        .values('illustration_id')
+        .annotate(total=Sum('weight'))
+        .values('total')
+    )
+    return queryset.annotate(search_rank=Coalesce(Subquery(rank, output_field=IntegerField()), 0))
@@ -1,11 +1,30 @@
 # serializers.py - CORRECTED RELATIONS (Fixed Circular Issue)
 
+from django.conf import settings
+from django.db import models, transaction
 from rest_framework import serializers
 from .models import (
     Manufacturer, CarModel, EngineModel, 
     PartCategory, PartSubCategory, 
-    Illustration, IllustrationFile, FavoriteIllustration
+    Illustration, IllustrationFile, FavoriteIllustration, UploadSession
 )
+from .file_delivery import attachment_filename
+from .signed_urls import DISPOSITION_ATTACHMENT, signed_file_url
+from .renditions import rendition_url
+
+
+# ------------------------------
+# Counter helpers
+# ------------------------------
+class ContextIllustrationCountMixin:
+    """
+    `illustration_count` from the stored counter column, or from the
+    `context_illustration_count` annotation when the list is filtered by an
+    engine/car context (see views.annotate_navigation_count).
+    """
+
+    def get_illustration_count(self, obj):
+        return getattr(obj, 'context_illustration_count', obj.illustration_count)
 
 
 # ------------------------------
@@ -48,12 +67,12 @@ class EngineModelSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Car Model Serializer
 # ------------------------------
-class CarModelSerializer(serializers.ModelSerializer):
+class CarModelSerializer(ContextIllustrationCountMixin, serializers.ModelSerializer):
     manufacturer_name = serializers.CharField(source='manufacturer.name', read_only=True)
     manufacturer_slug = serializers.CharField(source='manufacturer.slug', read_only=True)
     vehicle_type_display = serializers.CharField(source='get_vehicle_type_display', read_only=True)
     engine_count = serializers.IntegerField(read_only=True, required=False)
-    illustration_count = serializers.IntegerField(read_only=True, required=False)
+    illustration_count = serializers.SerializerMethodField(read_only=True)
     engines_detail = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
@@ -92,9 +111,9 @@ class CarModelSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Part Category Serializer
 # ------------------------------
-class PartCategorySerializer(serializers.ModelSerializer):
+class PartCategorySerializer(ContextIllustrationCountMixin, serializers.ModelSerializer):
     subcategory_count = serializers.IntegerField(read_only=True, required=False)
-    illustration_count = serializers.IntegerField(read_only=True, required=False)
+    illustration_count = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = PartCategory
@@ -108,10 +127,10 @@ class PartCategorySerializer(serializers.ModelSerializer):
 # ------------------------------
 # Part Subcategory Serializer
 # ------------------------------
-class PartSubCategorySerializer(serializers.ModelSerializer):
+class PartSubCategorySerializer(ContextIllustrationCountMixin, serializers.ModelSerializer):
     part_category_name = serializers.CharField(source='part_category.name', read_only=True)
     part_category_slug = serializers.CharField(source='part_category.slug', read_only=True)
-    illustration_count = serializers.IntegerField(read_only=True, required=False)
+    illustration_count = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = PartSubCategory
@@ -127,23 +146,34 @@ class PartSubCategorySerializer(serializers.ModelSerializer):
 # ------------------------------
 # Illustration File Serializer
 # ------------------------------
+def build_thumbnail_url(request, renditions, size=None, fmt='webp'):
+    url = rendition_url(renditions, size, fmt) if size else rendition_url(renditions, fmt=fmt)
+    if url and request:
+        return request.build_absolute_uri(url)
+    return url
+
+
 class IllustrationFileSerializer(serializers.ModelSerializer):
     file_type_display = serializers.CharField(source='get_file_type_display', read_only=True)
     file_name = serializers.SerializerMethodField(read_only=True)
     download_url = serializers.SerializerMethodField(read_only=True)
     preview_url = serializers.SerializerMethodField(read_only=True)
-    file_size = serializers.SerializerMethodField(read_only=True)
+    thumbnail_url = serializers.SerializerMethodField(read_only=True)
+    thumbnails = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = IllustrationFile
         fields = [
             'id', 'illustration', 'file', 'file_name', 'title', 'file_type', 
             'file_type_display', 'uploaded_at', 'download_url', 'preview_url',
-            'file_size'
+            'file_size', 'checksum', 'page_count', 'width', 'height',
+            'thumbnail_url', 'thumbnails', 'processing_status'
         ]
         read_only_fields = [
             'id', 'file_type', 'file_type_display', 'uploaded_at', 
-            'file_name', 'download_url', 'preview_url', 'file_size'
+            'file_name', 'download_url', 'preview_url', 'file_size',
+            'checksum', 'page_count', 'width', 'height',
+            'thumbnail_url', 'thumbnails', 'processing_status'
         ]
     
     def get_file_name(self, obj):
@@ -152,28 +182,46 @@ class IllustrationFileSerializer(serializers.ModelSerializer):
             return obj.file.name.split('/')[-1]
         return 'file'
 
-    def get_file_size(self, obj):
-        """Return file size in bytes"""
-        try:
-            if obj.file:
-                return obj.file.size
-        except Exception:
-            pass
-        return 0
-    
+    def get_thumbnail_url(self, obj):
+        """Default list thumbnail (None until the renditions are generated)"""
+        return build_thumbnail_url(self.context.get('request'), obj.renditions)
+
+    def get_thumbnails(self, obj):
+        """All renditions: {size: {format: url}}"""
+        request = self.context.get('request')
+        return {
+            size: {
+                fmt: build_thumbnail_url(request, obj.renditions, size, fmt)
+                for fmt in formats
+            }
+            for size, formats in (obj.renditions or {}).items()
+        }
+
+    def _signing_user(self):
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        return user if user is not None and user.is_authenticated else None
+
     def get_download_url(self, obj):
-        """Build download URL"""
+        """Build a signed, expiring download URL"""
         request = self.context.get('request')
-        if request:
+        user = self._signing_user()
+        if not request or not obj.file:
+            return None
+        if user is None:
             return request.build_absolute_uri(f'/api/illustration-files/{obj.id}/download/')
-        return None
+        filename = attachment_filename(obj.illustration.title, obj.file.name)
+        return signed_file_url(request, obj, user, DISPOSITION_ATTACHMENT, filename)
     
     def get_preview_url(self, obj):
-        """Build preview URL"""
+        """Build a signed, expiring preview URL (usable in <img>/<iframe> without auth headers)"""
         request = self.context.get('request')
-        if request:
+        user = self._signing_user()
+        if not request or not obj.file:
+            return None
+        if user is None:
             return request.build_absolute_uri(f'/api/illustration-files/{obj.id}/preview/')
-        return None
+        return signed_file_url(request, obj, user)
 
 
 # ------------------------------
@@ -181,19 +229,40 @@ class IllustrationFileSerializer(serializers.ModelSerializer):
 # ------------------------------
 class IllustrationPermissionMixin:
     """Mixin to add permission flags to illustrations"""
-    def get_can_edit(self, obj):
-        """Return True if the current user can edit this illustration"""
+    def _get_permission_flags(self, obj):
+        """Use the page-wide flags computed by IllustrationListSerializer when available"""
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
-            return False
-        return request.user.can_edit_illustration(obj)
+            return None
+        page_flags = self.context.get('illustration_permission_flags') or {}
+        if obj.pk in page_flags:
+            return page_flags[obj.pk]
+        return request.user.get_illustration_permission_flags([obj])[obj.pk]
+
+    def get_can_edit(self, obj):
+        """Return True if the current user can edit this illustration"""
+        flags = self._get_permission_flags(obj)
+        return flags['can_edit'] if flags else False
 
     def get_can_delete(self, obj):
         """Return True if the current user can delete this illustration"""
+        flags = self._get_permission_flags(obj)
+        return flags['can_delete'] if flags else False
+
+
+class IllustrationListSerializer(serializers.ListSerializer):
+    """Computes can_edit/can_delete for the whole page before rendering rows"""
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        data = list(data)
+
         request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.can_delete_illustration(obj)
+        if request and request.user.is_authenticated:
+            self.context['illustration_permission_flags'] = (
+                request.user.get_illustration_permission_flags(data)
+            )
+        return super().to_representation(data)
 
 
 # ------------------------------
@@ -230,6 +299,9 @@ class IllustrationSerializer(IllustrationPermissionMixin, serializers.ModelSeria
     # First file (conditional)
     first_file = serializers.SerializerMethodField(read_only=True)
     
+    # List thumbnail of the first file (always, small rendition instead of the raw file)
+    thumbnail_url = serializers.SerializerMethodField(read_only=True)
+    
     # Files (conditional)
     files = serializers.SerializerMethodField(read_only=True)
     
@@ -248,16 +320,17 @@ class IllustrationSerializer(IllustrationPermissionMixin, serializers.ModelSeria
             'title', 'description',
             'applicable_car_models',
             'created_at', 'updated_at',
-            'uploaded_files', 'files', 'file_count', 'first_file',
+            'uploaded_files', 'files', 'file_count', 'first_file', 'thumbnail_url',
             'can_edit', 'can_delete'
         ]
+        list_serializer_class = IllustrationListSerializer
         read_only_fields = [
             'id', 'user', 'user_name', 'factory', 'factory_name',
             'engine_model_name', 'engine_model_slug',
             'manufacturer_id', 'manufacturer_name', 'manufacturer_slug',
             'part_category_name', 'part_category_slug',
             'part_subcategory_name', 'part_subcategory_slug',
-            'created_at', 'updated_at', 'file_count',
+            'created_at', 'updated_at', 'file_count', 'thumbnail_url',
             'can_edit', 'can_delete'
         ]
     
@@ -269,7 +342,9 @@ class IllustrationSerializer(IllustrationPermissionMixin, serializers.ModelSeria
         # Fallback to count
         return obj.files.count()
     
+    @transaction.atomic
     def create(self, validated_data):
+        # Atomic so the catalog counter refreshes (signals) commit with the row
         uploaded_files = validated_data.pop('uploaded_files', [])
         applicable_car_models = validated_data.pop('applicable_car_models', [])
         
@@ -283,6 +358,7 @@ class IllustrationSerializer(IllustrationPermissionMixin, serializers.ModelSeria
         
         return illustration
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         uploaded_files = validated_data.pop('uploaded_files', [])
         applicable_car_models = validated_data.pop('applicable_car_models', None)
@@ -299,6 +375,16 @@ class IllustrationSerializer(IllustrationPermissionMixin, serializers.ModelSeria
         
         return instance
     
+    def get_thumbnail_url(self, obj):
+        """First file's thumbnail rendition"""
+        # Annotated by IllustrationViewSet; otherwise one query
+        if hasattr(obj, 'first_file_renditions'):
+            renditions = obj.first_file_renditions
+        else:
+            first_file = obj.files.first()
+            renditions = first_file.renditions if first_file else None
+        return build_thumbnail_url(self.context.get('request'), renditions)
+    
     def get_first_file(self, obj):
         """Return the first file's data for thumbnails"""
         include_files = self.context.get('include_files', False)
@@ -546,4 +632,38 @@ class FavoriteIllustrationSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             validated_data['user'] = request.user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+# ------------------------------
+# Upload Session Serializer (chunked uploads)
+# ------------------------------
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'illustration', 'filename', 'title', 'size', 'offset',
+            'status', 'chunk_size', 'illustration_file', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'offset', 'status', 'chunk_size', 'illustration_file',
+            'created_at', 'updated_at'
+        ]
+
+    def get_chunk_size(self, obj):
+        """Largest chunk the server accepts per PUT"""
+        return settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+
+    def validate_filename(self, value):
+        if not value.lower().endswith('.pdf'):
+            raise serializers.ValidationError('PDFファイルのみ許可されています')
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('ファイルサイズが不正です')
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError('ファイルサイズが上限を超えています')
+        return value
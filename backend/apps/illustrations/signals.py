@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Illustration, Manufacturer, EngineModel, CarModel, PartCategory, PartSubCategory
+from .models import (
+    Illustration, IllustrationFile, Manufacturer, EngineModel, CarModel, PartCategory, PartSubCategory
+)
+from . import blobs, catalog, counters, renditions, response_cache, search, suggest
+from apps.jobs.queue import enqueue
 from apps.accounts.utils.activity_logger import log_activity
 
 @receiver(post_save, sender=Illustration)
@@ -52,3 +57,320 @@ def log_engine_save(sender, instance, created, **kwargs):
         object_repr=instance.name,
         description=f"Engine model '{instance.name}' {'created' if created else 'updated'}"
     )
+
+
+# ------------------------------
+# Denormalized catalog counters
+# ------------------------------
+@receiver(pre_save, sender=Illustration)
+def remember_illustration_counter_keys(sender, instance, **kwargs):
+    """Keep the pre-save engine/category/subcategory so moved rows decrement the old parents"""
+    instance._counter_origin = None
+    if instance.pk:
+        instance._counter_origin = sender.objects.filter(pk=instance.pk).values_list(
+            'engine_model_id', 'part_category_id', 'part_subcategory_id'
+        ).first()
+
+
+@receiver(post_save, sender=Illustration)
+@receiver(post_delete, sender=Illustration)
+def refresh_illustration_counters(sender, instance, created=None, **kwargs):
+    # created is None on delete; edits that keep engine/category/subcategory change no count
+    if created is not None and not counters.counter_keys_changed(instance, created):
+        return
+    keys = {counters.illustration_matrix_key(instance)}
+    if getattr(instance, '_counter_origin', None):
+        keys.add(instance._counter_origin)
+    counters.refresh_for_illustrations(
+        engine_ids={k[0] for k in keys},
+        category_ids={k[1] for k in keys},
+        subcategory_ids={k[2] for k in keys},
+    )
+    counters.refresh_matrix(keys)
+
+
+@receiver(m2m_changed, sender=Illustration.applicable_car_models.through)
+def refresh_applicable_car_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    # Linking/unlinking cars can flip an illustration between "generic" and
+    # "car specific", which changes the count of every car sharing its engine.
+    if action == 'pre_clear' and reverse:
+        instance._counter_illustrations = set(instance.illustrations.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        illustration_ids = pk_set if pk_set is not None else getattr(instance, '_counter_illustrations', set())
+        keys = set(Illustration.objects.filter(pk__in=illustration_ids).values_list(*counters.MATRIX_KEY))
+    else:
+        keys = {counters.illustration_matrix_key(instance)}
+    car_ids = CarModel.objects.filter(engines__in={key[0] for key in keys}).values_list('pk', flat=True)
+    counters.refresh(CarModel, list(car_ids), ['illustration_count'])
+    counters.refresh_matrix(keys)
+
+
+@receiver(m2m_changed, sender=CarModel.engines.through)
+def refresh_car_engine_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    related = CarModel.engines.rel.related_name if reverse else 'engines'
+    if action == 'pre_clear':
+        instance._counter_related = set(getattr(instance, related).values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    others = pk_set if pk_set is not None else getattr(instance, '_counter_related', set())
+    if reverse:
+        counters.refresh_for_car_engine_links(car_ids=others, engine_ids=[instance.pk])
+    else:
+        counters.refresh_for_car_engine_links(car_ids=[instance.pk], engine_ids=others)
+
+
+@receiver(pre_save, sender=EngineModel)
+@receiver(pre_save, sender=CarModel)
+def remember_manufacturer(sender, instance, **kwargs):
+    instance._counter_manufacturer = None
+    if instance.pk:
+        instance._counter_manufacturer = sender.objects.filter(pk=instance.pk).values_list(
+            'manufacturer_id', flat=True
+        ).first()
+
+
+@receiver(pre_delete, sender=EngineModel)
+def remember_engine_cars(sender, instance, **kwargs):
+    # The M2M rows go with the engine without an m2m_changed signal
+    instance._counter_related = list(instance.car_models.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=CarModel)
+def remember_car_engines(sender, instance, **kwargs):
+    instance._counter_related = list(instance.engines.values_list('pk', flat=True))
+    # Its illustrations may turn generic: the M2M rows go without an m2m_changed signal
+    instance._counter_matrix_keys = set(instance.illustrations.values_list(*counters.MATRIX_KEY))
+
+
+@receiver(post_save, sender=EngineModel)
+@receiver(post_delete, sender=EngineModel)
+def refresh_engine_parent_counters(sender, instance, **kwargs):
+    manufacturer_ids = {instance.manufacturer_id, getattr(instance, '_counter_manufacturer', None)}
+    counters.refresh(Manufacturer, manufacturer_ids, ['engine_count', 'illustration_count'])
+    counters.refresh(CarModel, getattr(instance, '_counter_related', []))
+
+
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+def refresh_car_parent_counters(sender, instance, **kwargs):
+    manufacturer_ids = {instance.manufacturer_id, getattr(instance, '_counter_manufacturer', None)}
+    counters.refresh(Manufacturer, manufacturer_ids, ['car_model_count'])
+    counters.refresh(EngineModel, getattr(instance, '_counter_related', []), ['car_model_count'])
+
+
+@receiver(post_delete, sender=CarModel)
+def refresh_car_illustration_counters(sender, instance, **kwargs):
+    keys = getattr(instance, '_counter_matrix_keys', set())
+    if not keys:
+        return
+    # Illustrations that just became generic now count for every car of their engine
+    car_ids = CarModel.objects.filter(engines__in={key[0] for key in keys}).values_list('pk', flat=True)
+    counters.refresh(CarModel, list(car_ids), ['illustration_count'])
+    counters.refresh_matrix(keys)
+
+
+@receiver(pre_save, sender=PartSubCategory)
+def remember_subcategory_category(sender, instance, **kwargs):
+    instance._counter_category = None
+    if instance.pk:
+        instance._counter_category = sender.objects.filter(pk=instance.pk).values_list(
+            'part_category_id', flat=True
+        ).first()
+
+
+@receiver(pre_delete, sender=PartSubCategory)
+def remember_subcategory_matrix_keys(sender, instance, **kwargs):
+    # Illustrations fall back to "no subcategory" (SET_NULL) without save signals
+    instance._counter_matrix_keys = {
+        (engine_id, category_id, None)
+        for engine_id, category_id in instance.illustrations.values_list('engine_model_id', 'part_category_id')
+    }
+
+
+@receiver(post_save, sender=PartSubCategory)
+@receiver(post_delete, sender=PartSubCategory)
+def refresh_subcategory_parent_counters(sender, instance, **kwargs):
+    category_ids = {instance.part_category_id, getattr(instance, '_counter_category', None)}
+    counters.refresh(PartCategory, category_ids, ['subcategory_count'])
+    counters.refresh_matrix(getattr(instance, '_counter_matrix_keys', ()))
+
+
+# ------------------------------
+# Catalog tree version
+# ------------------------------
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_delete, sender=Manufacturer)
+@receiver(post_save, sender=EngineModel)
+@receiver(post_delete, sender=EngineModel)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_save, sender=PartCategory)
+@receiver(post_delete, sender=PartCategory)
+@receiver(post_save, sender=PartSubCategory)
+@receiver(post_delete, sender=PartSubCategory)
+@receiver(post_save, sender=Illustration)
+@receiver(post_delete, sender=Illustration)
+@receiver(m2m_changed, sender=CarModel.engines.through)
+@receiver(m2m_changed, sender=Illustration.applicable_car_models.through)
+def bump_catalog_version(sender, instance, action=None, created=None, **kwargs):
+    if action is not None and not action.startswith('post_'):
+        return
+    # The tree only carries counts of illustrations: edits that keep their counter keys change nothing
+    if sender is Illustration and created is not None and not counters.counter_keys_changed(instance, created):
+        return
+    # After commit, so a concurrent reader never caches pre-commit data under the new version
+    transaction.on_commit(catalog.bump_catalog_version)
+
+
+# ------------------------------
+# Catalog API response cache
+# ------------------------------
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_delete, sender=Manufacturer)
+@receiver(post_save, sender=EngineModel)
+@receiver(post_delete, sender=EngineModel)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_save, sender=PartCategory)
+@receiver(post_delete, sender=PartCategory)
+@receiver(post_save, sender=PartSubCategory)
+@receiver(post_delete, sender=PartSubCategory)
+@receiver(post_save, sender=Illustration)
+@receiver(post_delete, sender=Illustration)
+@receiver(m2m_changed, sender=CarModel.engines.through)
+@receiver(m2m_changed, sender=Illustration.applicable_car_models.through)
+def evict_catalog_responses(sender, instance, action=None, created=None, **kwargs):
+    if action is not None and not action.startswith('post_'):
+        return
+    # Illustrations only show up as counts: edits that keep their counter keys evict nothing
+    if sender is Illustration and created is not None and not counters.counter_keys_changed(instance, created):
+        return
+    response_cache.evict(sender)
+
+
+# ------------------------------
+# Catalog suggestions
+# ------------------------------
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_save, sender=EngineModel)
+@receiver(post_save, sender=CarModel)
+@receiver(post_save, sender=PartCategory)
+@receiver(post_save, sender=PartSubCategory)
+def update_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(lambda: suggest.index.apply(sender, instance.pk, instance))
+
+
+@receiver(post_delete, sender=Manufacturer)
+@receiver(post_delete, sender=EngineModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_delete, sender=PartCategory)
+@receiver(post_delete, sender=PartSubCategory)
+def remove_suggestion(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest.index.apply(sender, pk))
+
+
+# ------------------------------
+# Search index
+# ------------------------------
+@receiver(post_save, sender=Illustration)
+def index_illustration(sender, instance, **kwargs):
+    # In the same transaction, like the counters: a rolled back save leaves no document
+    search.index_illustrations([instance.pk])
+
+
+@receiver(m2m_changed, sender=Illustration.applicable_car_models.through)
+def index_illustration_car_models(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Clearing a car's illustrations has no pk_set: remember them before the rows go
+        instance._search_illustrations = set(instance.illustrations.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ids = {instance.pk}
+    elif pk_set is not None:
+        ids = set(pk_set)
+    else:
+        ids = getattr(instance, '_search_illustrations', set())
+    search.index_illustrations(ids)
+
+
+@receiver(pre_delete, sender=CarModel)
+def remember_car_search_illustrations(sender, instance, **kwargs):
+    # The M2M rows go with the car without an m2m_changed signal
+    instance._search_illustrations = list(instance.illustrations.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=CarModel)
+def index_deleted_car_illustrations(sender, instance, **kwargs):
+    search.index_illustrations(getattr(instance, '_search_illustrations', []))
+
+
+# Illustrations carry the names of their catalog entries; a rename reindexes them in the background
+SEARCH_CATALOG_FILTERS = {
+    Manufacturer: 'engine_model__manufacturer',
+    EngineModel: 'engine_model',
+    CarModel: 'applicable_car_models',
+    PartCategory: 'part_category',
+    PartSubCategory: 'part_subcategory',
+}
+# Catalog fields that end up in the search documents (search.document_text)
+SEARCH_CATALOG_FIELDS = {
+    Manufacturer: ['name'],
+    EngineModel: ['name', 'engine_code'],
+    CarModel: ['name', 'model_code', 'chassis_code'],
+    PartCategory: ['name'],
+    PartSubCategory: ['name'],
+}
+
+
+@receiver(pre_save, sender=Manufacturer)
+@receiver(pre_save, sender=EngineModel)
+@receiver(pre_save, sender=CarModel)
+@receiver(pre_save, sender=PartCategory)
+@receiver(pre_save, sender=PartSubCategory)
+def remember_search_fields(sender, instance, **kwargs):
+    instance._search_origin = None
+    if instance.pk:
+        instance._search_origin = sender.objects.filter(pk=instance.pk).values_list(
+            *SEARCH_CATALOG_FIELDS[sender]
+        ).first()
+
+
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_save, sender=EngineModel)
+@receiver(post_save, sender=CarModel)
+@receiver(post_save, sender=PartCategory)
+@receiver(post_save, sender=PartSubCategory)
+def reindex_catalog_illustrations(sender, instance, created, **kwargs):
+    if created:
+        return
+    current = tuple(getattr(instance, field) for field in SEARCH_CATALOG_FIELDS[sender])
+    if getattr(instance, '_search_origin', None) == current:
+        return
+    enqueue('illustrations.reindex_search', **{SEARCH_CATALOG_FILTERS[sender]: instance.pk})
+
+
+# ------------------------------
+# File post-processing
+# ------------------------------
+@receiver(post_save, sender=IllustrationFile)
+def enqueue_file_processing(sender, instance, created, update_fields=None, **kwargs):
+    # Saves from the job itself (update_fields without 'file') must not enqueue again
+    if update_fields is not None and 'file' not in update_fields:
+        return
+    enqueue('illustrations.process_file', file_id=instance.pk)
+
+
+@receiver(post_delete, sender=IllustrationFile)
+def delete_file_renditions(sender, instance, **kwargs):
+    # Blob-backed renditions are shared; they go with the last reference
+    if instance.blob_id:
+        blobs.release(instance.blob_id)
+        return
+    transaction.on_commit(lambda: renditions.delete_renditions(instance))
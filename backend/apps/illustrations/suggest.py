@@ -0,0 +1,204 @@
+"""
+Catalog typeahead (/api/catalog/suggest/?q=).
+
+One in-process index over the names and codes of manufacturers, engines
+(name, engine code), car models (name, model code, chassis code), part
+categories and subcategories. Keys are folded (NFKC, case-folded,
+hiragana -> katakana) so "ﾌﾟﾛﾌｨｱ", "ぷろふぃあ" and "プロフィア" are the same
+key, and stored in one sorted list: a lookup is a bisect to the first
+key >= the query plus a scan over the keys starting with it. Besides the
+whole name, every word start is a key ("profia" finds "Hino Profia").
+
+Catalog signals apply each change to the index of the process that made
+it (on commit) and bump a shared version (versions.py); other processes
+see the version move and rebuild on their next lookup. Bulk writes that
+skip signals call invalidate().
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from . import versions
+from .models import Manufacturer, EngineModel, CarModel, PartCategory, PartSubCategory
+
+SUGGEST_VERSION_KEY = 'catalog:suggest:version'
+
+# Type name, model, key fields, order in results
+SOURCES = [
+    ('manufacturer', Manufacturer, ['name']),
+    ('engine_model', EngineModel, ['name', 'engine_code']),
+    ('car_model', CarModel, ['name', 'model_code', 'chassis_code']),
+    ('part_category', PartCategory, ['name']),
+    ('part_subcategory', PartSubCategory, ['name']),
+]
+TYPE_ORDER = {name: i for i, (name, _, _) in enumerate(SOURCES)}
+TYPE_BY_MODEL = {model: name for name, model, _ in SOURCES}
+
+SEPARATOR_RE = re.compile(r'[\s\-_/・.,()（）「」]+')
+# Scanning stops after this many matching keys (keeps 1-character queries fast)
+MAX_SCAN = 500
+
+
+def fold(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold().strip()
+    # Hiragana -> katakana (U+3041..U+3096 are U+30A1..U+30F6 minus 0x60)
+    return ''.join(chr(ord(c) + 0x60) if 'ぁ' <= c <= 'ゖ' else c for c in text)
+
+
+def keys_for(values):
+    """(key, is_full) pairs: each folded value, then each of its word starts."""
+    keys = {}
+    for value in values:
+        folded = fold(value)
+        if not folded:
+            continue
+        keys[folded] = True
+        for match in SEPARATOR_RE.finditer(folded):
+            rest = folded[match.end():]
+            if rest:
+                keys.setdefault(rest, False)
+    return keys
+
+
+# --------------------------------------------------------------------------
+# Shared version
+# --------------------------------------------------------------------------
+def get_version():
+    return versions.get(SUGGEST_VERSION_KEY)
+
+
+def bump_version():
+    return versions.bump(SUGGEST_VERSION_KEY)
+
+
+def invalidate():
+    """Make every process rebuild its index (after writes that skip signals)."""
+    bump_version()
+
+
+# --------------------------------------------------------------------------
+# Index
+# --------------------------------------------------------------------------
+def entry_for(type_name, obj):
+    """Entry dict from a model instance or a values() row."""
+    get = obj.get if isinstance(obj, dict) else lambda field: getattr(obj, field, None)
+    entry = {'type': type_name, 'id': get('id'), 'name': get('name'), 'slug': get('slug')}
+    if type_name in ('engine_model', 'car_model'):
+        entry['manufacturer_id'] = get('manufacturer_id')
+    if type_name == 'engine_model':
+        entry['code'] = get('engine_code') or ''
+    if type_name == 'car_model':
+        entry['code'] = get('model_code') or get('chassis_code') or ''
+    if type_name == 'part_subcategory':
+        entry['part_category_id'] = get('part_category_id')
+    return entry
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.keys = []
+        self.entries = {}
+
+    def build(self):
+        keys, entries = [], {}
+        for type_name, model, fields in SOURCES:
+            columns = {'id', 'name', 'slug', *fields}
+            if type_name in ('engine_model', 'car_model'):
+                columns.add('manufacturer_id')
+            if type_name == 'part_subcategory':
+                columns.add('part_category_id')
+            for row in model.objects.values(*columns):
+                entry = entry_for(type_name, row)
+                entry['keys'] = keys_for(row[field] for field in fields)
+                entries[(type_name, entry['id'])] = entry
+                keys.extend((key, type_name, entry['id']) for key in entry['keys'])
+        keys.sort()
+        return keys, entries
+
+    def ensure_current(self):
+        version = get_version()
+        if self.version == version:
+            return
+        keys, entries = self.build()
+        with self.lock:
+            self.keys, self.entries, self.version = keys, entries, version
+
+    def remove(self, type_name, pk):
+        entry = self.entries.pop((type_name, pk), None)
+        if entry is None:
+            return
+        for key in entry['keys']:
+            item = (key, type_name, pk)
+            i = bisect_left(self.keys, item)
+            if i < len(self.keys) and self.keys[i] == item:
+                del self.keys[i]
+
+    def add(self, type_name, obj, fields):
+        entry = entry_for(type_name, obj)
+        entry['keys'] = keys_for(getattr(obj, field) for field in fields)
+        self.entries[(type_name, entry['id'])] = entry
+        for key in entry['keys']:
+            insort(self.keys, (key, type_name, entry['id']))
+
+    def apply(self, model, pk, obj=None):
+        """Apply one saved (obj) or deleted (obj=None) catalog row, then bump the shared version."""
+        type_name = TYPE_BY_MODEL[model]
+        fields = next(fields for name, _, fields in SOURCES if name == type_name)
+        version = bump_version()
+        with self.lock:
+            if self.version is None or self.version != version - 1:
+                # Not built yet, or another process changed the catalog meanwhile
+                self.version = None
+                return
+            self.remove(type_name, pk)
+            if obj is not None:
+                self.add(type_name, obj, fields)
+            self.version = version
+
+    def lookup(self, query, limit=10, types=None):
+        folded = fold(query)
+        if not folded:
+            return []
+        self.ensure_current()
+        with self.lock:
+            found = {}
+            i = bisect_left(self.keys, (folded,))
+            scanned = 0
+            while i < len(self.keys) and scanned < MAX_SCAN:
+                key, type_name, pk = self.keys[i]
+                if not key.startswith(folded):
+                    break
+                i += 1
+                scanned += 1
+                if types and type_name not in types:
+                    continue
+                entry = self.entries[(type_name, pk)]
+                # 0: exact name/code, 1: name/code starts with the query, 2: a later word does
+                rank = 0 if key == folded and entry['keys'][key] else (1 if entry['keys'][key] else 2)
+                if (type_name, pk) not in found or rank < found[(type_name, pk)][0]:
+                    found[(type_name, pk)] = (rank, key, entry)
+
+            ordered = sorted(
+                found.values(),
+                key=lambda item: (item[0], TYPE_ORDER[item[2]['type']], len(item[2]['name'] or ''), item[2]['name'] or '')
+            )
+            results = []
+            for rank, key, entry in ordered[:limit]:
+                result = {k: v for k, v in entry.items() if k != 'keys'}
+                if 'manufacturer_id' in result:
+                    # Looked up here, so a manufacturer rename needs no update of its engines/cars
+                    manufacturer = self.entries.get(('manufacturer', result['manufacturer_id']))
+                    result['manufacturer_name'] = manufacturer['name'] if manufacturer else ''
+                result['matched'] = key
+                results.append(result)
+            return results
+
+
+index = SuggestIndex()
+
+
+def suggest(query, limit=10, types=None):
+    return index.lookup(query, limit=limit, types=types)
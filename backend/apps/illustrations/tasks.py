@@ -0,0 +1,75 @@
+"""
+Background tasks for illustrations (run by `manage.py run_jobs`, see apps.jobs).
+"""
+import logging
+
+from apps.jobs.queue import task
+
+from . import search
+from .metadata import METADATA_FIELDS, extract_metadata
+from .models import IllustrationFile
+from .renditions import RenditionError, generate_renditions, shared_renditions
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes -> file_type
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image'),
+    (b'\xff\xd8\xff', 'image'),
+    (b'GIF87a', 'image'),
+    (b'GIF89a', 'image'),
+    (b'BM', 'image'),
+]
+
+
+def sniff_file_type(head):
+    """file_type from the first bytes of a file (not from its name)."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image'
+    for magic, file_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return file_type
+    return 'other'
+
+
+@task('illustrations.process_file')
+def process_file(file_id):
+    """
+    Post-upload processing of one IllustrationFile: confirm the type from
+    magic bytes, record the metadata, then build the thumbnail renditions
+    (or reuse those of another file with the same content).
+    """
+    file_obj = IllustrationFile.objects.filter(pk=file_id).select_related('illustration').first()
+    if file_obj is None or not file_obj.file:
+        return
+
+    IllustrationFile.objects.filter(pk=file_id).update(processing_status=IllustrationFile.PROCESSING_RUNNING)
+    try:
+        with file_obj.file.open('rb') as handle:
+            file_obj.file_type = sniff_file_type(handle.read(16))
+        extract_metadata(file_obj)
+        file_obj.save(update_fields=['file_type', *METADATA_FIELDS])
+
+        try:
+            existing = shared_renditions(file_obj)
+            if existing:
+                file_obj.renditions = existing
+                file_obj.save(update_fields=['renditions'])
+            else:
+                generate_renditions(file_obj)
+        except RenditionError as e:
+            # Not fatal: the file is usable, it just has no thumbnail
+            logger.warning('No renditions for IllustrationFile %s: %s', file_id, e)
+    except Exception:
+        IllustrationFile.objects.filter(pk=file_id).update(processing_status=IllustrationFile.PROCESSING_FAILED)
+        raise
+
+    file_obj.processing_status = IllustrationFile.PROCESSING_READY
+    file_obj.save(update_fields=['processing_status'])
+
+
+@task('illustrations.reindex_search')
+def reindex_search(**catalog_filter):
+    """Rebuild the search documents of every illustration under a renamed catalog entry."""
+    search.index_for_catalog(**catalog_filter)
@@ -0,0 +1,99 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from apps.illustrations.models import FileBlob, IllustrationFile
+from .test_renditions import make_png
+from .utils import make_user, make_catalog, make_illustrations
+
+MANUAL = b'%PDF-1.4\n' + bytes(range(256)) * 20
+
+
+@override_settings(JOBS_RUN_EAGERLY=True, FILE_STORAGE_MODE='content')
+class ContentAddressedStorageTests(APITestCase):
+    """Identical uploads share one reference-counted blob."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        self.first, self.second = make_illustrations(2, self.user, make_catalog())
+        self.storage = IllustrationFile._meta.get_field('file').storage
+
+    def add_file(self, illustration, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj = IllustrationFile.objects.create(illustration=illustration, file=upload)
+        file_obj.refresh_from_db()
+        return file_obj
+
+    def delete(self, file_obj):
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj.delete()
+
+    def test_same_content_stored_once(self):
+        a = self.add_file(self.first, SimpleUploadedFile('a.pdf', MANUAL))
+        b = self.add_file(self.second, SimpleUploadedFile('copy.pdf', MANUAL))
+        self.assertEqual(a.blob_id, b.blob_id)
+        self.assertEqual(a.file.name, b.file.name)
+        self.assertTrue(a.file.name.startswith(f'blobs/{a.checksum[:2]}/'))
+        self.assertEqual(FileBlob.objects.get().ref_count, 2)
+
+        self.delete(a)
+        self.assertTrue(self.storage.exists(b.file.name))
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+
+        self.delete(b)
+        self.assertFalse(self.storage.exists(b.file.name))
+        self.assertFalse(FileBlob.objects.exists())
+
+    def test_renditions_shared_and_removed_with_last_reference(self):
+        a = self.add_file(self.first, make_png())
+        b = self.add_file(self.second, make_png())
+        self.assertEqual(a.renditions, b.renditions)
+        thumb = a.renditions['320']['webp']
+
+        self.delete(a)
+        self.assertTrue(self.storage.exists(thumb))
+        self.delete(b)
+        self.assertFalse(self.storage.exists(thumb))
+
+    def test_dedup_command(self):
+        with self.settings(FILE_STORAGE_MODE='path'):
+            legacy = [
+                self.add_file(self.first, SimpleUploadedFile('a.pdf', MANUAL)),
+                self.add_file(self.second, SimpleUploadedFile('b.pdf', MANUAL)),
+                self.add_file(self.second, SimpleUploadedFile('c.pdf', b'%PDF-1.4\nother')),
+            ]
+        old_names = [f.file.name for f in legacy]
+
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedup_illustration_files', stdout=out)
+        self.assertIn('1 duplicates removed', out.getvalue())
+        self.assertIn(f'Space saved: {len(MANUAL) / 1024:.1f} KB', out.getvalue())
+
+        for name in old_names:
+            self.assertFalse(self.storage.exists(name))
+        self.assertEqual(
+            sorted(FileBlob.objects.values_list('ref_count', flat=True)), [1, 2]
+        )
+        for file_obj in legacy:
+            file_obj.refresh_from_db()
+            with file_obj.file.open('rb') as handle:
+                self.assertTrue(handle.read().startswith(b'%PDF-1.4'))
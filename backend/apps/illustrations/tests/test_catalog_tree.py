@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.illustrations.models import Illustration, PartSubCategory
+from .utils import make_user, make_catalog, make_illustrations
+
+
+class CatalogTreeTests(APITestCase):
+    """/api/catalog/tree/ is cached per catalog version and answers 304 on a matching ETag."""
+
+    def setUp(self):
+        cache.clear()
+        user = make_user('viewer@example.com')
+        self.client.force_authenticate(user)
+        self.catalog = make_catalog()
+        make_illustrations(2, user, self.catalog)
+
+    def get_tree(self, **headers):
+        return self.client.get('/api/catalog/tree/', headers=headers)
+
+    def test_tree_contents(self):
+        response = self.get_tree()
+        self.assertEqual(response.status_code, 200)
+        manufacturer, = response.data['manufacturers']
+        self.assertEqual(manufacturer['illustration_count'], 2)
+        engine, = manufacturer['engines']
+        self.assertEqual(engine['car_models'], [self.catalog['car'].pk])
+        self.assertEqual(engine['category_counts'], {self.catalog['category'].pk: 2})
+        category, = response.data['part_categories']
+        self.assertEqual(category['subcategories'][0]['illustration_count'], 2)
+
+    def test_cached_until_catalog_changes(self):
+        first = self.get_tree()
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.get_tree()
+        # Only the authentication and version lookups, no catalog queries
+        self.assertFalse([
+            q for q in ctx.captured_queries
+            if 'illustrations_' in q['sql'] and 'illustrations_catalogversion' not in q['sql']
+        ])
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PartSubCategory.objects.create(part_category=self.catalog['category'], name='Rings', slug='rings')
+        third = self.get_tree()
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(len(third.data['part_categories'][0]['subcategories']), 2)
+
+    def test_illustration_edits_keep_the_version(self):
+        etag = self.get_tree()['ETag']
+        illustration = Illustration.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            illustration.title = 'Cylinder head torque'
+            illustration.save()
+        self.assertEqual(self.get_tree()['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            illustration.delete()
+        response = self.get_tree()
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['manufacturers'][0]['illustration_count'], 1)
+
+    def test_not_modified(self):
+        etag = self.get_tree()['ETag']
+        response = self.get_tree(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
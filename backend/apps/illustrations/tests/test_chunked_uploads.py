@@ -0,0 +1,199 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.illustrations import chunked_uploads
+from apps.illustrations.models import IllustrationFile, UploadSession
+from .utils import make_user, make_catalog, make_illustrations
+
+CONTENT = b'%PDF-1.4\n' + os.urandom(100 * 1024)
+
+
+@override_settings(JOBS_RUN_EAGERLY=True, CHUNKED_UPLOAD_MAX_CHUNK_SIZE=64 * 1024)
+class ChunkedUploadTests(APITestCase):
+    """initiate -> PUT chunks -> complete; resumable after a failed chunk."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com', is_superuser=True)
+        self.illustration, = make_illustrations(1, self.user, make_catalog())
+        self.client.force_authenticate(self.user)
+
+    def initiate(self, **extra):
+        data = {'illustration': self.illustration.pk, 'filename': 'manual.pdf', 'size': len(CONTENT), **extra}
+        response = self.client.post('/api/uploads/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def put_chunk(self, session_id, start, end):
+        return self.client.put(
+            f'/api/uploads/{session_id}/', CONTENT[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(CONTENT)}'
+        )
+
+    def upload_all(self, session_id, start=0, chunk=50 * 1024):
+        while start < len(CONTENT):
+            end = min(start + chunk, len(CONTENT)) - 1
+            response = self.put_chunk(session_id, start, end)
+            self.assertEqual(response.status_code, 200, response.content)
+            start = response.json()['offset']
+
+    def complete(self, session_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/uploads/{session_id}/complete/')
+
+    def test_upload_in_chunks(self):
+        session = self.initiate(title='Service manual')
+        self.upload_all(session['id'])
+
+        response = self.complete(session['id'])
+        self.assertEqual(response.status_code, 201, response.content)
+        file_obj = IllustrationFile.objects.get(pk=response.json()['id'])
+        self.assertEqual(file_obj.illustration, self.illustration)
+        self.assertEqual(file_obj.title, 'Service manual')
+        self.assertEqual(file_obj.file_size, len(CONTENT))
+        self.assertEqual(file_obj.checksum, hashlib.sha256(CONTENT).hexdigest())
+        with file_obj.file.open('rb') as handle:
+            self.assertEqual(handle.read(), CONTENT)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads', f"{session['id']}.part")))
+
+    def test_path_storage_mode(self):
+        session = self.initiate()
+        self.upload_all(session['id'])
+        with self.settings(FILE_STORAGE_MODE='path'):
+            response = self.complete(session['id'])
+        file_obj = IllustrationFile.objects.get(pk=response.json()['id'])
+        self.assertIsNone(file_obj.blob)
+        self.assertTrue(file_obj.file.name.startswith('illustrations/'))
+        self.assertTrue(file_obj.file.name.endswith('.pdf'))
+
+    def test_checksum_without_in_process_hasher(self):
+        session = self.initiate()
+        self.upload_all(session['id'])
+        chunked_uploads._hashers.clear()
+
+        response = self.complete(session['id'])
+        self.assertEqual(response.json()['checksum'], hashlib.sha256(CONTENT).hexdigest())
+
+    def test_repeated_chunk_leaves_the_file_alone(self):
+        session = self.initiate()
+        self.assertEqual(self.put_chunk(session['id'], 0, 1023).status_code, 200)
+        response = self.client.put(
+            f"/api/uploads/{session['id']}/", b'x' * 1024,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-1023/{len(CONTENT)}'
+        )
+        self.assertEqual(response.status_code, 409)
+        with open(os.path.join(self.media_root, 'uploads', f"{session['id']}.part"), 'rb') as handle:
+            self.assertEqual(handle.read(), CONTENT[:1024])
+
+    def test_stale_hasher_is_not_trusted(self):
+        session = self.initiate()
+        self.upload_all(session['id'])
+        # A hash that stopped short of the end (another process wrote the rest)
+        chunked_uploads._keep_hasher(uuid.UUID(session['id']), 1024, hashlib.sha256(b'bogus'))
+
+        response = self.complete(session['id'])
+        self.assertEqual(response.json()['checksum'], hashlib.sha256(CONTENT).hexdigest())
+
+    def test_rollback_keeps_the_part_file(self):
+        session = self.initiate()
+        self.upload_all(session['id'])
+        part = os.path.join(self.media_root, 'uploads', f"{session['id']}.part")
+
+        for mode in ('content', 'path'):
+            with self.settings(FILE_STORAGE_MODE=mode), self.captureOnCommitCallbacks(execute=True), \
+                    mock.patch.object(UploadSession, 'save', side_effect=DatabaseError):
+                with self.assertRaises(DatabaseError):
+                    chunked_uploads.complete(UploadSession.objects.get(pk=session['id']))
+            self.assertTrue(os.path.exists(part))
+            self.assertFalse(IllustrationFile.objects.exists())
+
+        self.assertEqual(self.complete(session['id']).status_code, 201)
+        self.assertFalse(os.path.exists(part))
+
+    def test_resume_after_wrong_offset(self):
+        session = self.initiate()
+        self.assertEqual(self.put_chunk(session['id'], 0, 1023).status_code, 200)
+
+        response = self.put_chunk(session['id'], 4096, 5119)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 1024)
+
+        self.assertEqual(self.client.get(f"/api/uploads/{session['id']}/").json()['offset'], 1024)
+        self.upload_all(session['id'], start=1024)
+        self.assertEqual(self.complete(session['id']).status_code, 201)
+
+    def test_incomplete_upload_cannot_complete(self):
+        session = self.initiate()
+        self.put_chunk(session['id'], 0, 1023)
+        self.assertEqual(self.complete(session['id']).status_code, 409)
+        self.assertFalse(IllustrationFile.objects.exists())
+
+    def test_rejects_oversized_chunk_and_bad_range(self):
+        session = self.initiate()
+        self.assertEqual(self.put_chunk(session['id'], 0, 64 * 1024).status_code, 400)
+        response = self.client.put(
+            f"/api/uploads/{session['id']}/", b'x', content_type='application/octet-stream'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_pdf(self):
+        response = self.client.post('/api/uploads/', {
+            'illustration': self.illustration.pk, 'filename': 'tool.exe', 'size': 10
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_cannot_upload(self):
+        other = make_user('other@example.com')
+        self.client.force_authenticate(other)
+        response = self.client.post('/api/uploads/', {
+            'illustration': self.illustration.pk, 'filename': 'manual.pdf', 'size': 10
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.user)
+        session = self.initiate()
+        self.client.force_authenticate(other)
+        self.assertEqual(self.put_chunk(session['id'], 0, 1023).status_code, 404)
+
+    def test_abort_and_expire(self):
+        session = self.initiate()
+        self.put_chunk(session['id'], 0, 1023)
+        part = os.path.join(self.media_root, 'uploads', f"{session['id']}.part")
+        self.assertTrue(os.path.exists(part))
+        self.assertEqual(self.client.delete(f"/api/uploads/{session['id']}/").status_code, 204)
+        self.assertFalse(os.path.exists(part))
+        self.assertEqual(UploadSession.objects.get().status, UploadSession.ABORTED)
+
+        stale = self.initiate()
+        self.put_chunk(stale['id'], 0, 1023)
+        UploadSession.objects.filter(pk=stale['id']).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        call_command('expire_upload_sessions', stdout=io.StringIO())
+        self.assertEqual(UploadSession.objects.get(pk=stale['id']).status, UploadSession.ABORTED)
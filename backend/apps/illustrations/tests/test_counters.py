@@ -0,0 +1,182 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.illustrations import counters
+from apps.illustrations.models import (
+    Manufacturer, EngineModel, CarModel, PartCategory, PartSubCategory
+)
+from .utils import make_user, make_catalog, make_illustrations
+
+
+class CatalogCounterTests(TestCase):
+    """Counter columns follow illustration, engine and M2M link changes."""
+
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        self.catalog = make_catalog()
+        self.other_car = CarModel.objects.create(
+            manufacturer=self.catalog['manufacturer'], name='Hino Ranger'
+        )
+        self.other_car.engines.add(self.catalog['engine'])
+
+    def reload(self, obj):
+        return type(obj).objects.get(pk=obj.pk)
+
+    def test_illustration_create_and_delete(self):
+        illustrations = make_illustrations(3, self.user, self.catalog)
+        self.assertEqual(self.reload(self.catalog['manufacturer']).illustration_count, 3)
+        self.assertEqual(self.reload(self.catalog['engine']).illustration_count, 3)
+        self.assertEqual(self.reload(self.catalog['car']).illustration_count, 3)
+        self.assertEqual(self.reload(self.catalog['category']).illustration_count, 3)
+        self.assertEqual(self.reload(self.catalog['subcategory']).illustration_count, 3)
+
+        illustrations[0].delete()
+        self.assertEqual(self.reload(self.catalog['engine']).illustration_count, 2)
+        self.assertEqual(self.reload(self.catalog['subcategory']).illustration_count, 2)
+
+    def test_car_specific_illustrations(self):
+        generic, specific = make_illustrations(2, self.user, self.catalog)
+        specific.applicable_car_models.add(self.catalog['car'])
+        self.assertEqual(self.reload(self.catalog['car']).illustration_count, 2)
+        self.assertEqual(self.reload(self.other_car).illustration_count, 1)
+
+        specific.applicable_car_models.clear()
+        self.assertEqual(self.reload(self.other_car).illustration_count, 2)
+
+    def test_edit_without_move_skips_recount(self):
+        illustration, = make_illustrations(1, self.user, self.catalog)
+        illustration.title = 'Renamed'
+        with CaptureQueriesContext(connection) as ctx:
+            illustration.save()
+        counter_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE') and 'illustration_count' in q['sql']]
+        self.assertEqual(counter_updates, [])
+
+    def test_car_delete_recounts_sibling_cars(self):
+        generic, specific = make_illustrations(2, self.user, self.catalog)
+        specific.applicable_car_models.add(self.catalog['car'])
+        self.assertEqual(self.reload(self.other_car).illustration_count, 1)
+
+        # `specific` loses its only car and applies to every car of the engine again
+        self.catalog['car'].delete()
+        self.assertEqual(self.reload(self.other_car).illustration_count, 2)
+
+    def test_moving_illustration_updates_old_parent(self):
+        illustration, = make_illustrations(1, self.user, self.catalog)
+        other = make_catalog('isuzu')
+        illustration.engine_model = other['engine']
+        illustration.part_subcategory = other['subcategory']
+        illustration.save()
+        self.assertEqual(self.reload(self.catalog['engine']).illustration_count, 0)
+        self.assertEqual(self.reload(self.catalog['subcategory']).illustration_count, 0)
+        self.assertEqual(self.reload(other['manufacturer']).illustration_count, 1)
+
+    def test_engine_links_and_catalog_counts(self):
+        make_illustrations(2, self.user, self.catalog)
+        second_engine = EngineModel.objects.create(
+            manufacturer=self.catalog['manufacturer'], name='HINO-E13C', slug='hino-e13c'
+        )
+        self.assertEqual(self.reload(self.catalog['manufacturer']).engine_count, 2)
+        self.assertEqual(self.reload(self.catalog['manufacturer']).car_model_count, 2)
+        self.assertEqual(self.reload(self.catalog['engine']).car_model_count, 2)
+
+        second_engine.car_models.add(self.other_car)
+        self.assertEqual(self.reload(self.other_car).engine_count, 2)
+
+        self.catalog['engine'].car_models.remove(self.other_car)
+        self.assertEqual(self.reload(self.other_car).illustration_count, 0)
+        self.assertEqual(self.reload(self.catalog['engine']).car_model_count, 1)
+
+        self.catalog['car'].delete()
+        self.assertEqual(self.reload(self.catalog['engine']).car_model_count, 0)
+        self.assertEqual(self.reload(self.catalog['manufacturer']).car_model_count, 1)
+
+    def test_subcategory_count(self):
+        PartSubCategory.objects.create(part_category=self.catalog['category'], name='Rings', slug='rings')
+        self.assertEqual(self.reload(self.catalog['category']).subcategory_count, 2)
+
+    def test_refresh_all_repairs_drift(self):
+        make_illustrations(2, self.user, self.catalog)
+        Manufacturer.objects.update(illustration_count=0)
+        PartCategory.objects.update(subcategory_count=7)
+
+        drift = counters.refresh_all()
+        self.assertEqual(drift['Manufacturer'], 1)
+        self.assertEqual(drift['PartCategory'], 1)
+        self.assertEqual(drift['CarModel'], 0)
+        self.assertEqual(self.reload(self.catalog['manufacturer']).illustration_count, 2)
+        self.assertEqual(self.reload(self.catalog['category']).subcategory_count, 1)
+
+
+class CatalogCounterListTests(APITestCase):
+    """List endpoints read the counters, or a context count when filtered."""
+
+    def setUp(self):
+        user = make_user('owner@example.com')
+        self.client.force_authenticate(user)
+        self.catalog = make_catalog()
+        self.other_car = CarModel.objects.create(
+            manufacturer=self.catalog['manufacturer'], name='Hino Ranger'
+        )
+        self.other_car.engines.add(self.catalog['engine'])
+        generic, specific = make_illustrations(2, user, self.catalog)
+        specific.applicable_car_models.add(self.catalog['car'])
+
+    def test_subcategory_context_count(self):
+        response = self.client.get('/api/part-subcategories/')
+        self.assertEqual(response.json()[0]['illustration_count'], 2)
+        response = self.client.get('/api/part-subcategories/', {'car_model': self.other_car.pk})
+        self.assertEqual(response.json()[0]['illustration_count'], 1)
+
+    def test_car_model_context_count(self):
+        response = self.client.get('/api/car-models/', {'engine_model': self.catalog['engine'].pk})
+        counts = {row['id']: row['illustration_count'] for row in response.json()['results']}
+        self.assertEqual(counts, {self.catalog['car'].pk: 2, self.other_car.pk: 1})
+
+
+class IllustrationCountMatrixTests(APITestCase):
+    """Navigation counts read from the matrix match the illustration filters."""
+
+    def setUp(self):
+        user = make_user('owner@example.com')
+        self.client.force_authenticate(user)
+        self.catalog = make_catalog()
+        self.other = make_catalog('isuzu')
+        self.car = self.catalog['car']
+        generic, self.specific = make_illustrations(2, user, self.catalog)
+        self.specific.applicable_car_models.add(self.car)
+        # Generic illustration of another engine: applies to every car
+        make_illustrations(1, user, {**self.other, 'category': self.catalog['category']})
+
+    def category_count(self, **params):
+        response = self.client.get('/api/part-categories/', params)
+        counts = {row['id']: row['illustration_count'] for row in response.json()}
+        return counts[self.catalog['category'].pk]
+
+    def test_contexts(self):
+        self.assertEqual(self.category_count(), 3)
+        self.assertEqual(self.category_count(engine_model=self.catalog['engine'].pk), 2)
+        self.assertEqual(self.category_count(car_model=self.car.pk), 3)
+        self.assertEqual(self.category_count(car_model=self.other['car'].pk), 2)
+        self.assertEqual(
+            self.category_count(engine_model=self.catalog['engine'].pk, car_model=self.other['car'].pk), 1
+        )
+
+    def test_follows_car_links(self):
+        self.specific.applicable_car_models.set([self.other['car']])
+        self.assertEqual(self.category_count(car_model=self.car.pk), 2)
+        self.assertEqual(self.category_count(car_model=self.other['car'].pk), 3)
+        # Incremental maintenance matches a full rebuild
+        self.assertEqual(counters.rebuild_matrix(), 0)
+
+    def test_car_delete_makes_illustrations_generic(self):
+        self.car.delete()
+        # `specific` now applies to every car of its engine
+        self.assertEqual(self.category_count(car_model=self.other['car'].pk), 3)
+        self.assertEqual(counters.rebuild_matrix(), 0)
+
+    def test_subcategory_delete_keeps_category_count(self):
+        self.catalog['subcategory'].delete()
+        self.assertEqual(self.category_count(engine_model=self.catalog['engine'].pk), 2)
+        self.assertEqual(counters.rebuild_matrix(), 0)
@@ -0,0 +1,89 @@
+import io
+import shutil
+import tempfile
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import ActivityLog
+from apps.illustrations.models import IllustrationFile
+from .utils import make_user, make_catalog, make_illustrations
+
+
+@override_settings(ACTIVITY_LOG_BUFFER_SIZE=0)
+class ExportZipTests(APITestCase):
+    """/api/illustrations/export.zip streams every visible file of the filtered list."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com', is_superuser=True)
+        self.catalog = make_catalog()
+        self.pump, self.piston = make_illustrations(2, self.user, self.catalog)
+        self.pump.title = 'Fuel pump'
+        self.pump.save()
+        self.contents = {}
+        for illustration, name, content in [
+            (self.pump, 'a.pdf', b'%PDF-1.4 pump sheet 1'),
+            (self.pump, 'b.pdf', b'%PDF-1.4 pump sheet 2'),
+            (self.piston, 'c.pdf', b'%PDF-1.4 piston'),
+        ]:
+            IllustrationFile.objects.create(illustration=illustration, file=SimpleUploadedFile(name, content))
+            self.contents.setdefault(illustration.pk, []).append(content)
+        self.client.force_authenticate(self.user)
+
+    def get_zip(self, url='/api/illustrations/export.zip', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_exports_all_files(self):
+        archive = self.get_zip()
+        self.assertIsNone(archive.testzip())
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        pump_names = sorted(n for n in names if f'/{self.pump.pk}_Fuel_pump/' in n)
+        self.assertEqual(len(pump_names), 2)
+        self.assertTrue(pump_names[0].startswith('hino/hino-a09c/hino-engine/'))
+        self.assertEqual(
+            sorted(archive.read(n) for n in pump_names), sorted(self.contents[self.pump.pk])
+        )
+
+    def test_uses_list_filters(self):
+        archive = self.get_zip(search='pump')
+        self.assertEqual(len(archive.namelist()), 2)
+
+    def test_trailing_slash_route(self):
+        archive = self.get_zip(url='/api/illustrations/export.zip/')
+        self.assertEqual(len(archive.namelist()), 3)
+
+    def test_single_activity_entry(self):
+        self.get_zip()
+        log = ActivityLog.objects.get(action='EXPORT')
+        self.assertEqual(log.changes['files'], 3)
+
+    def test_visibility(self):
+        self.client.force_authenticate(make_user('other@example.com', is_verified=False))
+        response = self.client.get('/api/illustrations/export.zip')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(EXPORT_MAX_FILES=2)
+    def test_limit(self):
+        response = self.client.get('/api/illustrations/export.zip')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ActivityLog.objects.filter(action='EXPORT').exists())
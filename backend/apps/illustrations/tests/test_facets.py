@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import Factory, Role
+from apps.illustrations.models import PartCategory
+from .utils import make_role, make_user, make_catalog, make_illustrations
+
+ALL_FACETS = 'manufacturer,engine_model,part_category,part_subcategory,factory'
+
+
+class IllustrationFacetTests(APITestCase):
+    """`?facets=` returns counts over the filtered, visible list together with the page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.factory = Factory.objects.create(name='Tokyo', address='Ota-ku')
+        cls.other_factory = Factory.objects.create(name='Osaka', address='Kita-ku')
+        contributor = make_role(Role.ILLUSTRATION_CONTRIBUTOR, can_create_illustration=True)
+        cls.admin = make_user('admin@example.com', is_superuser=True)
+        cls.contributor = make_user('contributor@example.com', cls.factory, contributor)
+        cls.hino = make_catalog()
+        cls.isuzu = make_catalog('isuzu')
+        cls.isuzu_other = PartCategory.objects.create(name='isuzu Brakes', slug='isuzu-brakes')
+        make_illustrations(3, cls.admin, cls.hino, factory=cls.factory, prefix='Hino')
+        make_illustrations(2, cls.admin, cls.isuzu, factory=cls.other_factory, prefix='Isuzu')
+        brake = make_illustrations(1, cls.admin, cls.isuzu, factory=cls.other_factory, prefix='Brake')[0]
+        brake.part_category = cls.isuzu_other
+        brake.part_subcategory = None
+        brake.save()
+
+    def get(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/illustrations/', params)
+
+    def counts(self, response, facet):
+        return {item['name']: item['count'] for item in response.data['facets'][facet]}
+
+    def test_all_facets_in_one_query(self):
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as with_facets:
+            response = self.client.get('/api/illustrations/', {'facets': ALL_FACETS})
+        with CaptureQueriesContext(connection) as without:
+            self.client.get('/api/illustrations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(with_facets.captured_queries), len(without.captured_queries) + 1)
+
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(self.counts(response, 'manufacturer'), {'Isuzu': 3, 'Hino': 3})
+        self.assertEqual(self.counts(response, 'engine_model'), {'ISUZU-A09C': 3, 'HINO-A09C': 3})
+        self.assertEqual(
+            self.counts(response, 'part_category'), {'hino Engine': 3, 'isuzu Engine': 2, 'isuzu Brakes': 1}
+        )
+        self.assertEqual(
+            self.counts(response, 'part_subcategory'), {'hino Pistons': 3, 'isuzu Pistons': 2, None: 1}
+        )
+        self.assertEqual(self.counts(response, 'factory'), {'Osaka': 3, 'Tokyo': 3})
+        # Ordered by count
+        self.assertEqual(response.data['facets']['part_category'][0]['name'], 'hino Engine')
+        self.assertEqual(response.data['facets']['part_category'][0]['id'], self.hino['category'].id)
+
+    def test_facets_follow_filters(self):
+        response = self.get(self.admin, facets='part_category,factory', manufacturer=self.isuzu['manufacturer'].id)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(set(response.data['facets']), {'part_category', 'factory'})
+        self.assertEqual(self.counts(response, 'part_category'), {'isuzu Engine': 2, 'isuzu Brakes': 1})
+
+        response = self.get(self.admin, facets='part_category', search='brake', page_size=1)
+        self.assertEqual(self.counts(response, 'part_category'), {'isuzu Brakes': 1})
+
+    def test_facets_count_the_whole_list_not_the_page(self):
+        response = self.get(self.admin, facets='manufacturer', page_size=2)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(sum(self.counts(response, 'manufacturer').values()), 6)
+
+        response = self.get(self.admin, facets='manufacturer', cursor='', page_size=2)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(sum(self.counts(response, 'manufacturer').values()), 6)
+
+    def test_facets_respect_visibility(self):
+        response = self.get(self.contributor, facets='manufacturer,factory')
+        self.assertEqual(self.counts(response, 'manufacturer'), {'Hino': 3})
+        self.assertEqual(self.counts(response, 'factory'), {'Tokyo': 3})
+
+    def test_no_facets_by_default(self):
+        self.assertNotIn('facets', self.get(self.admin).data)
+
+    def test_unknown_facet(self):
+        response = self.get(self.admin, facets='manufacturer,colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', response.data['error'])
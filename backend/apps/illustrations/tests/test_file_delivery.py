@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.illustrations import signed_urls
+from apps.illustrations.models import IllustrationFile
+from .utils import make_user, make_catalog, make_illustrations
+
+CONTENT = bytes(range(256)) * 40  # 10 KiB
+
+
+class FileDeliveryTestCase(APITestCase):
+    """One PDF-like file under a temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        illustration, = make_illustrations(1, self.user, make_catalog())
+        self.file = IllustrationFile.objects.create(
+            illustration=illustration,
+            file=SimpleUploadedFile('manual.pdf', CONTENT, content_type='application/pdf')
+        )
+        self.preview_url = f'/api/illustration-files/{self.file.pk}/preview/'
+        self.download_url = f'/api/illustration-files/{self.file.pk}/download/'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+
+class FileDeliveryTests(FileDeliveryTestCase):
+    """preview/download honour Range, ETag and conditional requests."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_full_response_has_validators(self):
+        response = self.client.get(self.preview_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_range_requests(self):
+        response = self.client.get(self.preview_url, headers={'range': 'bytes=100-199'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+        self.assertEqual(self.body(response), CONTENT[100:200])
+
+        response = self.client.get(self.preview_url, headers={'range': 'bytes=-16'})
+        self.assertEqual(self.body(response), CONTENT[-16:])
+
+        response = self.client.get(self.preview_url, headers={'range': f'bytes={len(CONTENT)}-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range_mismatch_sends_full_file(self):
+        response = self.client.get(self.preview_url, headers={'range': 'bytes=0-9', 'if-range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_download(self):
+        etag = self.client.get(self.download_url)['ETag']
+        response = self.client.get(self.download_url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertNotIn('no-store', response['Cache-Control'])
+
+
+class FileDeliveryOffloadTests(FileDeliveryTestCase):
+    """With FILE_DELIVERY_MODE set, Django only answers with the offload header."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_x_accel_redirect(self):
+        with self.settings(FILE_DELIVERY_MODE='x-accel-redirect'):
+            response = self.client.get(self.preview_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.file.file.name}')
+        self.assertTrue(response['X-Accel-Redirect'].endswith('.pdf'))
+        self.assertTrue(response['Content-Disposition'].startswith('inline;'))
+
+    def test_x_sendfile(self):
+        with self.settings(FILE_DELIVERY_MODE='x-sendfile'):
+            response = self.client.get(self.download_url)
+        self.assertEqual(response['X-Sendfile'], self.file.file.path)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+
+
+class SignedFileURLTests(FileDeliveryTestCase):
+    """preview_url / download_url are signed, expiring and served without auth or DB."""
+
+    def file_urls(self):
+        self.client.force_authenticate(self.user)
+        data = self.client.get(f'/api/illustration-files/{self.file.pk}/').json()
+        self.client.force_authenticate(None)
+        return data['preview_url'], data['download_url']
+
+    def test_signed_urls_served_anonymously(self):
+        preview_url, download_url = self.file_urls()
+        self.assertIn('/api/files/signed/', preview_url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(preview_url, headers={'range': 'bytes=0-9'})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), CONTENT[:10])
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        response = self.client.get(download_url)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="Illustration_0.pdf"'))
+
+    def test_tampered_and_expired_tokens(self):
+        preview_url, _ = self.file_urls()
+        self.assertEqual(self.client.get(preview_url.replace('/signed/', '/signed/x')).status_code, 403)
+
+        expired = signed_urls.get_expiry() + 1
+        with mock.patch('apps.illustrations.signed_urls.time.time', return_value=expired):
+            self.assertEqual(self.client.get(preview_url).status_code, 410)
+
+    def test_unsigned_preview_requires_authentication(self):
+        self.assertEqual(self.client.get(self.preview_url).status_code, 401)
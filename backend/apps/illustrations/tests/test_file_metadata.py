@@ -0,0 +1,76 @@
+import hashlib
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from apps.illustrations.models import IllustrationFile
+from .test_renditions import make_png
+from .utils import make_user, make_catalog, make_illustrations
+
+
+@override_settings(JOBS_RUN_EAGERLY=True)
+class FileMetadataTests(APITestCase):
+    """Size, checksum and dimensions are stored at upload and served without touching storage."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        self.illustration, = make_illustrations(1, self.user, make_catalog())
+
+    def add_file(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj = IllustrationFile.objects.create(illustration=self.illustration, file=upload)
+        file_obj.refresh_from_db()
+        return file_obj
+
+    def test_image_metadata(self):
+        upload = make_png(300, 200)
+        content = upload.read()
+        upload.seek(0)
+        file_obj = self.add_file(upload)
+        self.assertEqual(file_obj.file_size, len(content))
+        self.assertEqual(file_obj.checksum, hashlib.sha256(content).hexdigest())
+        self.assertEqual((file_obj.width, file_obj.height), (300, 200))
+        self.assertIsNone(file_obj.page_count)
+
+    def test_serializer_does_not_touch_storage(self):
+        file_obj = self.add_file(make_png(300, 200))
+        file_obj.file.storage.delete(file_obj.file.name)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f'/api/illustration-files/{file_obj.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['file_size'], file_obj.file_size)
+        self.assertEqual(response.json()['width'], 300)
+
+    def test_backfill_command(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30)).save(buffer, 'PNG')
+        file_obj = self.add_file(SimpleUploadedFile('old.png', buffer.getvalue()))
+        IllustrationFile.objects.filter(pk=file_obj.pk).update(
+            file_size=None, checksum='', width=None, height=None
+        )
+
+        call_command('backfill_file_metadata', stdout=io.StringIO())
+        file_obj.refresh_from_db()
+        self.assertEqual(file_obj.file_size, len(buffer.getvalue()))
+        self.assertEqual((file_obj.width, file_obj.height), (40, 30))
+        self.assertEqual(len(file_obj.checksum), 64)
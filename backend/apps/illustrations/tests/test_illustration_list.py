@@ -0,0 +1,130 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import Factory, Role
+from .utils import make_role, make_user, make_catalog, make_illustrations
+
+
+class IllustrationListQueryCountTests(APITestCase):
+    """The list endpoint must not issue per-row permission queries."""
+
+    # memberships snapshot, COUNT(*), page rows, applicable_car_models prefetch
+    EXPECTED_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.factory = Factory.objects.create(name='Tokyo', address='Ota-ku')
+        cls.other_factory = Factory.objects.create(name='Osaka', address='Kita-ku')
+        editor = make_role(
+            Role.ILLUSTRATION_EDITOR,
+            can_view_illustration=True,
+            can_edit_illustration=True,
+        )
+        contributor = make_role(
+            Role.ILLUSTRATION_CONTRIBUTOR,
+            can_create_illustration=True,
+        )
+        cls.editor = make_user('editor@example.com', cls.factory, editor)
+        cls.contributor = make_user('contributor@example.com', cls.factory, contributor)
+        catalog = make_catalog()
+        make_illustrations(15, cls.editor, catalog, factory=cls.factory, prefix='Own')
+        make_illustrations(15, cls.contributor, catalog, factory=cls.other_factory, prefix='Other')
+
+    def count_list_queries(self, user, page_size):
+        # Fresh instance per request, like the authentication backend would load
+        user = type(user).objects.get(pk=user.pk)
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/illustrations/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant_for_view_all_roles(self):
+        counts = {size: self.count_list_queries(self.editor, size) for size in (1, 10, 30)}
+        self.assertEqual(set(counts.values()), {self.EXPECTED_QUERIES}, counts)
+
+    def test_query_count_is_constant_for_restricted_roles(self):
+        counts = {size: self.count_list_queries(self.contributor, size) for size in (1, 5, 15)}
+        self.assertEqual(set(counts.values()), {self.EXPECTED_QUERIES}, counts)
+
+    def test_permission_flags_follow_factory_roles(self):
+        self.client.force_authenticate(self.editor)
+        response = self.client.get('/api/illustrations/', {'page_size': 30})
+        flags = {row['title']: (row['can_edit'], row['can_delete']) for row in response.data['results']}
+        self.assertEqual(len(flags), 30)
+        for title, (can_edit, can_delete) in flags.items():
+            # Editor role grants edit in its own factory only; delete only as owner
+            expected = (True, True) if title.startswith('Own') else (False, False)
+            self.assertEqual((can_edit, can_delete), expected, title)
+
+
+class IllustrationPermissionFlagTests(APITestCase):
+    """Page-wide can_edit/can_delete must match the per-object User checks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.factory = Factory.objects.create(name='Tokyo', address='Ota-ku')
+        cls.other_factory = Factory.objects.create(name='Osaka', address='Kita-ku')
+        admin = make_role(
+            Role.ILLUSTRATION_ADMIN,
+            can_view_illustration=True,
+            can_edit_illustration=True,
+            can_delete_illustration=True,
+        )
+        viewer = make_role(Role.ILLUSTRATION_VIEWER, can_view_illustration=True)
+        contributor = make_role(Role.ILLUSTRATION_CONTRIBUTOR, can_create_illustration=True)
+        cls.users = [
+            make_user('admin@example.com', cls.factory, admin),
+            make_user('viewer@example.com', cls.other_factory, viewer),
+            make_user('contributor@example.com', cls.factory, contributor, is_verified=False),
+            make_user('root@example.com', is_superuser=True),
+        ]
+        catalog = make_catalog()
+        make_illustrations(4, cls.users[0], catalog, factory=cls.factory, prefix='Admin')
+        make_illustrations(4, cls.users[1], catalog, factory=cls.other_factory, prefix='Viewer')
+        make_illustrations(4, cls.users[2], catalog, factory=None, prefix='Contributor')
+
+    def test_flags_match_per_object_checks(self):
+        from apps.illustrations.models import Illustration
+
+        for user in self.users:
+            self.client.force_authenticate(user)
+            response = self.client.get('/api/illustrations/', {'page_size': 50})
+            self.assertEqual(response.status_code, 200)
+            for row in response.data['results']:
+                illustration = Illustration.objects.get(pk=row['id'])
+                self.assertEqual(row['can_edit'], user.can_edit_illustration(illustration), (user, row['title']))
+                self.assertEqual(row['can_delete'], user.can_delete_illustration(illustration), (user, row['title']))
+
+
+class IllustrationCarModelFilterTests(APITestCase):
+    """car_model / applicable_car_models filters return each illustration once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from apps.illustrations.models import CarModel
+
+        cls.root = make_user('root@example.com', is_superuser=True)
+        catalog = make_catalog()
+        cls.car = catalog['car']
+        cls.other_car = CarModel.objects.create(manufacturer=catalog['manufacturer'], name='Ranger')
+        generic, specific, elsewhere = make_illustrations(3, cls.root, catalog)
+        specific.applicable_car_models.set([cls.car, cls.other_car])
+        elsewhere.applicable_car_models.set([cls.other_car])
+        cls.generic, cls.specific, cls.elsewhere = generic, specific, elsewhere
+
+    def ids(self, params):
+        self.client.force_authenticate(self.root)
+        response = self.client.get('/api/illustrations/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_car_model_includes_generic_and_linked(self):
+        ids = self.ids({'car_model': self.car.pk})
+        self.assertCountEqual(ids, [self.generic.pk, self.specific.pk])
+
+    def test_applicable_car_models_matches_any_and_has_no_duplicates(self):
+        ids = self.ids({'applicable_car_models': [self.car.pk, self.other_car.pk]})
+        self.assertCountEqual(ids, [self.specific.pk, self.elsewhere.pk])
@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.accounts.models import ActivityLog
+from apps.illustrations.models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, Illustration
+)
+from .utils import make_user
+
+RECORDS = [
+    {'type': 'manufacturer', 'name': 'Hino'},
+    {'type': 'engine', 'manufacturer': 'Hino', 'name': 'A09C', 'engine_code': 'A09C-TI'},
+    {'type': 'engine', 'manufacturer': 'Hino', 'name': 'E13C'},
+    {'type': 'engine', 'manufacturer': 'いすゞ', 'name': '6HK1'},
+    {'type': 'car', 'manufacturer': 'Hino', 'name': 'Profia', 'engines': ['A09C', 'E13C'], 'year_from': 2003},
+    {'type': 'car', 'manufacturer': 'Hino', 'name': 'Ranger', 'engines': ['A09C', 'X99']},
+    {'type': 'category', 'name': 'Engine', 'order': 1},
+    {'type': 'subcategory', 'category': 'Engine', 'name': 'Pistons'},
+    {'type': 'illustration', 'manufacturer': 'Hino', 'engine': 'A09C', 'category': 'Engine',
+     'subcategory': 'Pistons', 'title': 'Piston assembly', 'car_models': ['Profia']},
+    {'type': 'illustration', 'manufacturer': 'Hino', 'engine': 'A09C', 'category': 'Engine',
+     'title': 'Overview'},
+    {'type': 'engine', 'manufacturer': 'Hino', 'name': 'J08E', 'fuel_type': 'steam'},
+]
+
+
+@override_settings(ACTIVITY_LOG_BUFFER_SIZE=0)
+class ImportCatalogTests(TestCase):
+    """import_catalog upserts in batches and links M2M rows in bulk."""
+
+    def setUp(self):
+        self.user = make_user('importer@example.com')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def jsonl(self, records):
+        return self.write('catalog.jsonl', '\n'.join(json.dumps(r, ensure_ascii=False) for r in records))
+
+    def run_import(self, path, *args):
+        out = io.StringIO()
+        call_command('import_catalog', path, '--user', self.user.email, '--batch-size', '4', *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        output = self.run_import(self.jsonl(RECORDS))
+
+        self.assertEqual(Manufacturer.objects.count(), 2)
+        self.assertEqual(EngineModel.objects.count(), 3)
+        a09c = EngineModel.objects.get(name='A09C')
+        self.assertEqual(a09c.engine_code, 'A09C-TI')
+        self.assertEqual(a09c.slug, 'hino-a09c')
+        self.assertTrue(EngineModel.objects.get(name='6HK1').slug)
+
+        profia = CarModel.objects.get(name='Profia')
+        self.assertEqual(profia.year_from, 2003)
+        self.assertEqual(set(profia.engines.values_list('name', flat=True)), {'A09C', 'E13C'})
+        self.assertEqual(list(CarModel.objects.get(name='Ranger').engines.values_list('name', flat=True)), ['A09C'])
+
+        piston = Illustration.objects.get(title='Piston assembly')
+        self.assertEqual(piston.user, self.user)
+        self.assertEqual(piston.part_subcategory, PartSubCategory.objects.get(name='Pistons'))
+        self.assertEqual(list(piston.applicable_car_models.all()), [profia])
+        self.assertIsNone(Illustration.objects.get(title='Overview').part_subcategory)
+
+        # Counters are rebuilt once after the bulk writes
+        a09c.refresh_from_db()
+        self.assertEqual(a09c.car_model_count, 2)
+        self.assertEqual(a09c.illustration_count, 2)
+
+        self.assertIn("line 6: Unknown engine 'X99'", output)
+        self.assertIn('line 11: Unknown fuel_type', output)
+        self.assertEqual(list(ActivityLog.objects.values_list('action', flat=True)), ['IMPORT'])
+
+    def test_reimport_updates_in_place(self):
+        self.run_import(self.jsonl(RECORDS))
+        changed = [dict(r) for r in RECORDS]
+        changed[1]['engine_code'] = 'NEW'
+        changed[9]['description'] = 'Updated'
+        output = self.run_import(self.jsonl(changed))
+
+        self.assertEqual(EngineModel.objects.count(), 3)
+        self.assertEqual(EngineModel.objects.get(name='A09C').engine_code, 'NEW')
+        self.assertEqual(Illustration.objects.count(), 2)
+        self.assertEqual(Illustration.objects.get(title='Overview').description, 'Updated')
+        self.assertEqual(CarModel.engines.through.objects.count(), 3)
+        self.assertIn('links                0 created', output)
+
+    def test_csv_with_default_type(self):
+        path = self.write('engines.csv', 'manufacturer,name,fuel_type\nIsuzu,4HK1,diesel\nIsuzu,6WG1,\n')
+        self.run_import(path, '--type', 'engine')
+        self.assertEqual(
+            sorted(EngineModel.objects.values_list('name', 'fuel_type')),
+            [('4HK1', 'diesel'), ('6WG1', 'diesel')]
+        )
+
+    def test_dry_run(self):
+        output = self.run_import(self.jsonl(RECORDS), '--dry-run')
+        self.assertIn('[dry run] 11 records', output)
+        self.assertFalse(Manufacturer.objects.exists())
+        self.assertFalse(PartCategory.objects.exists())
+        self.assertFalse(ActivityLog.objects.exists())
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.illustrations.models import Illustration
+from .utils import make_user, make_catalog, make_illustrations
+
+
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = make_user('root@example.com', is_superuser=True)
+        illustrations = make_illustrations(12, cls.root, make_catalog())
+        # Groups of three share a timestamp so the id tie-breaker is exercised
+        base = timezone.now()
+        for i, illustration in enumerate(illustrations):
+            Illustration.objects.filter(pk=illustration.pk).update(
+                created_at=base - timedelta(minutes=i // 3)
+            )
+        cls.expected = list(
+            Illustration.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.root)
+
+    def walk(self, url, params=None, key='next'):
+        ids, pages = [], []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data[key]:
+                return ids, pages
+            response = self.client.get(response.data[key])
+
+    def test_forward_walk_visits_every_row_once(self):
+        ids, pages = self.walk('/api/illustrations/', {'cursor': '', 'page_size': 5})
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_backward_walk_returns_previous_pages(self):
+        _, pages = self.walk('/api/illustrations/', {'cursor': '', 'page_size': 5})
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[5:10])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[:5])
+        self.assertIsNone(response.data['previous'])
+
+    def test_ascending_ordering(self):
+        ids, _ = self.walk('/api/illustrations/', {'cursor': '', 'page_size': 4, 'ordering': 'created_at'})
+        self.assertEqual(ids, list(reversed(self.expected)))
+
+    def test_unindexed_ordering_is_rejected(self):
+        response = self.client.get('/api/illustrations/', {'cursor': '', 'ordering': 'title'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_number_mode_is_unchanged(self):
+        response = self.client.get('/api/illustrations/', {'page_size': 5})
+        self.assertEqual(response.data['count'], 12)
@@ -0,0 +1,103 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from apps.illustrations.models import IllustrationFile
+from .utils import make_user, make_catalog, make_illustrations
+
+
+def make_png(width=1200, height=800):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return SimpleUploadedFile('diagram.png', buffer.getvalue(), content_type='image/png')
+
+
+def make_pdf():
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 800), 'white').save(buffer, 'PDF')
+    return SimpleUploadedFile('manual.pdf', buffer.getvalue(), content_type='application/pdf')
+
+
+@override_settings(JOBS_RUN_EAGERLY=True)
+class RenditionTests(APITestCase):
+    """Renditions are generated after commit and exposed as thumbnail_url."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        self.illustration, = make_illustrations(1, self.user, make_catalog())
+
+    def add_file(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj = IllustrationFile.objects.create(illustration=self.illustration, file=upload)
+        file_obj.refresh_from_db()
+        return file_obj
+
+    def test_image_renditions(self):
+        file_obj = self.add_file(make_png())
+        self.assertEqual(set(file_obj.renditions), {'160', '320', '640'})
+        name = file_obj.renditions['320']['webp']
+        self.assertEqual(os.path.dirname(os.path.dirname(name)), os.path.dirname(file_obj.file.name))
+        with file_obj.file.storage.open(name) as handle, Image.open(handle) as thumb:
+            self.assertEqual(thumb.format, 'WEBP')
+            self.assertEqual(thumb.size, (320, 213))
+
+        self.client.force_authenticate(self.user)
+        row, = self.client.get('/api/illustrations/').json()['results']
+        self.assertTrue(row['thumbnail_url'].endswith('_320.webp'))
+
+    def test_renditions_removed_with_file(self):
+        file_obj = self.add_file(make_png())
+        path = file_obj.file.storage.path(file_obj.renditions['160']['jpeg'])
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj.delete()
+        self.assertFalse(os.path.exists(path))
+
+    @skipUnless(shutil.which('pdftoppm'), 'poppler-utils not installed')
+    def test_pdf_first_page(self):
+        file_obj = self.add_file(make_pdf())
+        self.assertIn('640', file_obj.renditions)
+
+    def test_file_type_from_content(self):
+        upload = make_png()
+        upload.name = 'scan.pdf'
+        file_obj = self.add_file(upload)
+        self.assertEqual(file_obj.file_type, 'image')
+        self.assertEqual(file_obj.processing_status, IllustrationFile.PROCESSING_READY)
+        self.assertIn('320', file_obj.renditions)
+
+    def test_backfill_command(self):
+        file_obj = self.add_file(make_png())
+        IllustrationFile.objects.filter(pk=file_obj.pk).update(renditions={})
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generate_renditions', '--missing', stdout=out)
+        self.assertIn('Queued 1 files', out.getvalue())
+        file_obj.refresh_from_db()
+        self.assertIn('320', file_obj.renditions)
+
+        with override_settings(JOBS_RUN_EAGERLY=False):
+            call_command('generate_renditions', '--missing', stdout=out)
+            call_command('generate_renditions', stdout=out)
+        self.assertIn('Queued 0 files', out.getvalue())
+        self.assertIn('Queued 1 files', out.getvalue().splitlines()[-1])
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.illustrations import response_cache
+from apps.illustrations.models import CarModel, PartCategory
+from .utils import make_user, make_catalog, make_illustrations
+
+
+class CatalogResponseCacheTests(APITestCase):
+    """Catalog viewsets answer repeated reads from the cache until a write evicts them."""
+
+    def setUp(self):
+        response_cache.get_cache().clear()
+        self.catalog = make_catalog()
+        self.user = make_user('viewer@example.com', is_superuser=True)
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_repeated_reads_hit(self):
+        first, first_queries = self.get('/api/engine-models/')
+        second, second_queries = self.get('/api/engine-models/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+        self.assertLess(second_queries, first_queries)
+
+        stats = response_cache.stats()['engine_models']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_query_params_are_normalized(self):
+        manufacturer = self.catalog['manufacturer'].pk
+        self.get('/api/car-models/', {'manufacturer': manufacturer, 'ordering': 'name'})
+        response, _ = self.get(f'/api/car-models/?ordering=name&search=&manufacturer={manufacturer}')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response, _ = self.get('/api/car-models/', {'ordering': '-name'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_retrieve_is_cached_per_object(self):
+        car = self.catalog['car']
+        self.assertEqual(self.get(f'/api/car-models/{car.slug}/')[0]['X-Cache'], 'MISS')
+        self.assertEqual(self.get(f'/api/car-models/{car.slug}/')[0]['X-Cache'], 'HIT')
+        other = CarModel.objects.create(manufacturer=self.catalog['manufacturer'], name='Hino Ranger')
+        self.assertEqual(self.get(f'/api/car-models/{other.slug}/')[0]['X-Cache'], 'MISS')
+
+    def test_writes_evict_dependent_resources_only(self):
+        for url in ('/api/manufacturers/', '/api/engine-models/', '/api/part-categories/'):
+            self.get(url)
+
+        engine = self.catalog['engine']
+        engine.name = 'A09C-UV'
+        engine.save()
+
+        response, _ = self.get('/api/engine-models/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()[0]['name'], 'A09C-UV')
+        self.assertEqual(self.get('/api/manufacturers/')[0]['X-Cache'], 'MISS')
+        # Engines do not appear in part category responses
+        self.assertEqual(self.get('/api/part-categories/')[0]['X-Cache'], 'HIT')
+
+    def test_illustration_writes_refresh_counts(self):
+        response, _ = self.get('/api/part-categories/')
+        self.assertEqual(response.json()[0]['illustration_count'], 0)
+        make_illustrations(2, self.user, self.catalog)
+        response, _ = self.get('/api/part-categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()[0]['illustration_count'], 2)
+
+    def test_illustration_edits_keep_the_cache(self):
+        illustration, = make_illustrations(1, self.user, self.catalog)
+        self.get('/api/part-categories/')
+        illustration.description = 'Torque values updated'
+        illustration.save()
+        self.assertEqual(self.get('/api/part-categories/')[0]['X-Cache'], 'HIT')
+
+        illustration.part_category = PartCategory.objects.create(name='Brakes', slug='brakes')
+        illustration.save()
+        response, _ = self.get('/api/part-categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_eviction_repeats_on_commit(self):
+        self.get('/api/part-categories/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            PartCategory.objects.create(name='Brakes', slug='brakes')
+        # A reader between the write and the commit caches pre-commit data...
+        self.get('/api/part-categories/')
+        for callback in callbacks:
+            callback()
+        # ...which the commit-time eviction drops again
+        self.assertEqual(self.get('/api/part-categories/')[0]['X-Cache'], 'MISS')
+
+    def test_permissions_still_apply(self):
+        self.get('/api/manufacturers/')
+        self.client.force_authenticate(make_user('new@example.com', is_verified=False))
+        response = self.client.get('/api/manufacturers/')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,115 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import Factory
+from apps.illustrations import search
+from apps.illustrations.models import Illustration, IllustrationSearchDocument
+from apps.jobs.models import Job
+from .utils import make_user, make_role, make_catalog
+
+
+class TokenizeTests(TestCase):
+    def test_japanese_bigrams(self):
+        self.assertEqual(search.tokenize('燃料ポンプ'), ['燃料', '料ポ', 'ポン', 'ンプ'])
+
+    def test_mixed_and_width(self):
+        # Full-width latin and half-width katakana normalize to their usual forms
+        self.assertEqual(search.tokenize('ＡＢＣ-12 ﾋﾟｽﾄﾝ'), ['abc', '12', 'ピス', 'スト', 'トン'])
+        self.assertEqual(search.tokenize('A09Cエンジン'), ['a09c', 'エン', 'ンジ', 'ジン'])
+
+
+class IllustrationSearchTests(APITestCase):
+    """?search= goes through the search index and keeps visibility and filters."""
+
+    def setUp(self):
+        self.factory = Factory.objects.create(name='Tokyo')
+        self.user = make_user('member@example.com', factory=self.factory, role=make_role('member'))
+        self.catalog = make_catalog()
+        self.catalog['car'].chassis_code = 'FR1E'
+        self.catalog['car'].save()
+
+        def create(title, description='', **extra):
+            return Illustration.objects.create(
+                user=self.user, factory=self.factory, engine_model=self.catalog['engine'],
+                part_category=self.catalog['category'], title=title, description=description, **extra
+            )
+
+        self.pump = create('燃料ポンプ 分解図')
+        self.nozzle = create('ノズル', description='燃料ポンプ側のノズル')
+        self.piston = create('Piston assembly', part_subcategory=self.catalog['subcategory'])
+        self.piston.applicable_car_models.add(self.catalog['car'])
+        other_factory = Factory.objects.create(name='Osaka')
+        owner = make_user('other@example.com', factory=other_factory, role=make_role('member'))
+        self.hidden = Illustration.objects.create(
+            user=owner, factory=other_factory, engine_model=self.catalog['engine'],
+            part_category=self.catalog['category'], title='燃料ポンプ (Osaka)'
+        )
+        self.client.force_authenticate(self.user)
+
+    def titles(self, **params):
+        response = self.client.get('/api/illustrations/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data['results']]
+
+    def test_japanese_ranked(self):
+        # Title match before description match; other factory stays invisible
+        self.assertEqual(self.titles(search='燃料ポンプ'), ['燃料ポンプ 分解図', 'ノズル'])
+
+    def test_normalized_query(self):
+        self.assertEqual(self.titles(search='ﾉｽﾞﾙ'), ['ノズル'])
+        self.assertEqual(self.titles(search='ＰＩＳＴ'), ['Piston assembly'])
+
+    def test_catalog_names(self):
+        self.assertEqual(self.titles(search='fr1e'), ['Piston assembly'])
+        self.assertEqual(self.titles(search='pistons'), ['Piston assembly'])
+        self.assertEqual(len(self.titles(search='HINO-A09C')), 3)
+
+    def test_all_words_required(self):
+        self.assertEqual(self.titles(search='ポンプ ノズル'), ['ノズル'])
+        self.assertEqual(self.titles(search='piston ポンプ'), [])
+
+    def test_with_filters_and_ordering(self):
+        self.assertEqual(
+            self.titles(search='燃料', part_subcategory=self.catalog['subcategory'].pk), []
+        )
+        self.assertEqual(self.titles(search='燃料', ordering='title'), ['ノズル', '燃料ポンプ 分解図'])
+
+    @override_settings(JOBS_RUN_EAGERLY=True)
+    def test_catalog_rename_reindexes(self):
+        engine = self.catalog['engine']
+        with self.captureOnCommitCallbacks(execute=True):
+            engine.engine_code = 'J08E-UV'
+            engine.save()
+        self.assertEqual(len(self.titles(search='j08e')), 3)
+
+    @override_settings(JOBS_RUN_EAGERLY=False)
+    def test_saves_without_rename_skip_the_reindex(self):
+        jobs = Job.objects.filter(task='illustrations.reindex_search')
+        before = jobs.count()
+        engine = self.catalog['engine']
+        engine.fuel_type = 'petrol'
+        engine.save()
+        self.assertEqual(jobs.count(), before)
+        engine.name = 'A09C-UV'
+        engine.save()
+        self.assertEqual(jobs.count(), before + 1)
+
+    def test_car_clear_and_delete_reindex(self):
+        car = self.catalog['car']
+        car.illustrations.clear()
+        self.assertEqual(self.titles(search='fr1e'), [])
+
+        self.piston.applicable_car_models.add(car)
+        self.assertEqual(self.titles(search='fr1e'), ['Piston assembly'])
+        car.delete()
+        self.assertEqual(self.titles(search='fr1e'), [])
+
+    def test_rebuild_missing(self):
+        IllustrationSearchDocument.objects.filter(illustration=self.nozzle).delete()
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--missing', stdout=out)
+        self.assertIn('Indexed 1 illustrations', out.getvalue())
+        self.assertEqual(self.titles(search='ノズル'), ['ノズル'])
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from apps.illustrations import suggest
+from apps.illustrations.models import CarModel, EngineModel
+from .utils import make_user, make_catalog
+
+
+class CatalogSuggestTests(APITestCase):
+    """/api/catalog/suggest/ answers from the in-memory index, kept current by signals."""
+
+    def setUp(self):
+        cache.clear()
+        suggest.index.version = None
+        self.catalog = make_catalog()
+        manufacturer = self.catalog['manufacturer']
+        self.profia = CarModel.objects.create(manufacturer=manufacturer, name='プロフィア', chassis_code='FR1E')
+        self.engine = EngineModel.objects.create(
+            manufacturer=manufacturer, name='E13C', engine_code='E13C-TM', slug='hino-e13c'
+        )
+        self.client.force_authenticate(make_user('viewer@example.com', is_superuser=True))
+
+    def get(self, **params):
+        response = self.client.get('/api/catalog/suggest/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def names(self, **params):
+        return [(r['type'], r['name']) for r in self.get(**params)]
+
+    def test_prefix_and_word_start(self):
+        self.assertEqual(self.names(q='hino pr'), [('car_model', 'Hino Profia')])
+        # "profia" is the second word of "Hino Profia"
+        self.assertEqual(self.names(q='profia'), [('car_model', 'Hino Profia')])
+
+    def test_kana_and_width(self):
+        self.assertEqual(self.names(q='ﾌﾟﾛﾌ'), [('car_model', 'プロフィア')])
+        self.assertEqual(self.names(q='ぷろ'), [('car_model', 'プロフィア')])
+
+    def test_codes(self):
+        results = self.get(q='e13c-t')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['matched'], 'e13c-tm')
+        self.assertEqual(results[0]['manufacturer_name'], 'Hino')
+        self.assertEqual(self.names(q='fr1'), [('car_model', 'プロフィア')])
+
+    def test_exact_match_first(self):
+        self.assertEqual(self.names(q='hino')[0], ('manufacturer', 'Hino'))
+
+    def test_type_and_limit(self):
+        self.assertEqual({t for t, _ in self.names(q='hino', type='car_model')}, {'car_model'})
+        self.assertEqual(len(self.get(q='hino', limit=1)), 1)
+        response = self.client.get('/api/catalog/suggest/', {'q': 'x', 'type': 'illustration'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_incremental_update(self):
+        self.get(q='hino')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profia.name = 'レンジャー'
+            self.profia.save()
+            self.engine.delete()
+        # One version read per lookup, no rebuild
+        with self.assertNumQueries(3):
+            self.assertEqual(suggest.suggest('れんじゃ'), [
+                {'type': 'car_model', 'id': self.profia.pk, 'name': 'レンジャー', 'slug': self.profia.slug,
+                 'manufacturer_id': self.catalog['manufacturer'].pk, 'code': 'FR1E',
+                 'manufacturer_name': 'Hino', 'matched': 'レンジャー'}
+            ])
+            self.assertEqual(suggest.suggest('プロフ'), [])
+            self.assertEqual(suggest.suggest('e13'), [])
+
+    def test_version_bumps_are_unique(self):
+        version = suggest.get_version()
+        self.assertEqual([suggest.bump_version() for _ in range(3)], [version + 1, version + 2, version + 3])
+        self.assertEqual(suggest.get_version(), version + 3)
+
+    def test_other_process_change_rebuilds(self):
+        self.get(q='hino')
+        # Another process bumped the version: this one rebuilds on the next lookup
+        suggest.invalidate()
+        EngineModel.objects.filter(pk=self.engine.pk).update(name='E13C-X')
+        self.assertEqual(self.names(q='e13c-x'), [('engine_model', 'E13C-X')])
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import Factory, FactoryMember, Role, User, VisibilityScope
+from apps.illustrations.models import FavoriteIllustration, IllustrationFile
+from .utils import make_role, make_user, make_catalog, make_illustrations
+
+
+class VisibilityScopeTests(APITestCase):
+    """One cached scope per user drives the illustration, file and favorite querysets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.factory = Factory.objects.create(name='Tokyo', address='Ota-ku')
+        cls.other_factory = Factory.objects.create(name='Osaka', address='Kita-ku')
+        cls.contributor_role = make_role(Role.ILLUSTRATION_CONTRIBUTOR, can_create_illustration=True)
+        cls.viewer_role = make_role(Role.ILLUSTRATION_VIEWER, can_view_illustration=True)
+        cls.owner = make_user('owner@example.com', cls.other_factory, cls.contributor_role)
+        catalog = make_catalog()
+        cls.tokyo = make_illustrations(2, cls.owner, catalog, factory=cls.factory, prefix='Tokyo')
+        cls.osaka = make_illustrations(2, cls.owner, catalog, factory=cls.other_factory, prefix='Osaka')
+        for illustration in cls.tokyo + cls.osaka:
+            IllustrationFile.objects.create(illustration=illustration, file='illustrations/x.pdf')
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('member@example.com', self.factory, self.contributor_role)
+        self.mine = make_illustrations(1, self.user, make_catalog('isuzu'), prefix='Mine')[0]
+        for illustration in self.tokyo + self.osaka + [self.mine]:
+            FavoriteIllustration.objects.create(user=self.user, illustration=illustration)
+
+    def fresh(self, user):
+        # New instance per request, like authentication loads it
+        return User.objects.get(pk=user.pk)
+
+    def titles(self, url, user=None):
+        self.client.force_authenticate(self.fresh(user or self.user))
+        response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        if url == '/api/illustration-files/':
+            return sorted(self.title_of_file(row['id']) for row in rows)
+        if url == '/api/favorites/':
+            return sorted(row['illustration_detail']['title'] for row in rows)
+        return sorted(row['title'] for row in rows)
+
+    def title_of_file(self, file_id):
+        return IllustrationFile.objects.get(pk=file_id).illustration.title
+
+    def test_factories_plus_own(self):
+        scope = self.fresh(self.user).visibility_scope
+        self.assertEqual(scope.kind, VisibilityScope.FACTORIES)
+        self.assertEqual(scope.factory_ids, [self.factory.pk])
+        expected = ['Mine 0', 'Tokyo 0', 'Tokyo 1']
+        self.assertEqual(self.titles('/api/illustrations/'), expected)
+        self.assertEqual(self.titles('/api/favorites/'), expected)
+        # Only Tokyo illustrations have files
+        self.assertEqual(self.titles('/api/illustration-files/'), ['Tokyo 0', 'Tokyo 1'])
+
+    def test_own_only_and_all(self):
+        loner = make_user('loner@example.com')
+        self.assertEqual(self.fresh(loner).visibility_scope.kind, VisibilityScope.OWN)
+        admin = make_user('admin@example.com', is_superuser=True)
+        self.assertEqual(self.fresh(admin).visibility_scope.kind, VisibilityScope.ALL)
+        self.assertEqual(len(self.titles('/api/illustrations/', admin)), 5)
+
+        inactive = self.fresh(self.user)
+        inactive.is_active = False
+        self.assertEqual(inactive.visibility_scope.kind, VisibilityScope.NONE)
+
+    def test_scope_is_cached_between_requests(self):
+        self.fresh(self.user).visibility_scope
+        with CaptureQueriesContext(connection) as ctx:
+            scope = self.fresh(self.user).visibility_scope
+        membership_queries = [q for q in ctx.captured_queries if 'factorymember' in q['sql']]
+        self.assertEqual(membership_queries, [])
+        self.assertEqual(scope.factory_ids, [self.factory.pk])
+
+    def test_membership_changes_evict(self):
+        self.assertEqual(len(self.titles('/api/illustrations/')), 3)
+        member = FactoryMember.objects.create(user=self.user, factory=self.other_factory, role=self.contributor_role)
+        self.assertEqual(len(self.titles('/api/illustrations/')), 5)
+
+        member.role = self.viewer_role
+        member.save()
+        self.assertEqual(self.fresh(self.user).visibility_scope.kind, VisibilityScope.ALL)
+
+        member.delete()
+        self.assertEqual(self.fresh(self.user).visibility_scope.kind, VisibilityScope.FACTORIES)
+        self.assertEqual(len(self.titles('/api/illustrations/')), 3)
+
+    def test_role_changes_evict_every_user(self):
+        self.assertEqual(self.fresh(self.user).visibility_scope.kind, VisibilityScope.FACTORIES)
+        Role.objects.filter(pk=self.viewer_role.pk).update(code='FORMER_VIEWER')
+        self.contributor_role.code = Role.ILLUSTRATION_VIEWER
+        self.contributor_role.save()
+        self.assertEqual(self.fresh(self.user).visibility_scope.kind, VisibilityScope.ALL)
+        self.assertEqual(self.fresh(self.owner).visibility_scope.kind, VisibilityScope.ALL)
@@ -0,0 +1,60 @@
+"""
+Shared fixtures for the illustrations test-suite.
+"""
+from apps.accounts.models import Role, FactoryMember, User
+from apps.illustrations.models import (
+    Manufacturer, EngineModel, CarModel,
+    PartCategory, PartSubCategory, Illustration
+)
+
+
+def make_role(code, **permissions):
+    role, _ = Role.objects.get_or_create(code=code, defaults={'name': code.title(), **permissions})
+    return role
+
+
+def make_user(email, factory=None, role=None, is_verified=True, **extra):
+    user = User.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='pass-1234-word',
+        is_verified=is_verified,
+        **extra
+    )
+    if factory and role:
+        FactoryMember.objects.create(user=user, factory=factory, role=role)
+    return user
+
+
+def make_catalog(prefix='hino'):
+    manufacturer = Manufacturer.objects.create(name=prefix.title(), slug=prefix)
+    engine = EngineModel.objects.create(
+        manufacturer=manufacturer, name=f'{prefix.upper()}-A09C', slug=f'{prefix}-a09c'
+    )
+    car = CarModel.objects.create(manufacturer=manufacturer, name=f'{prefix.title()} Profia')
+    car.engines.add(engine)
+    category = PartCategory.objects.create(name=f'{prefix} Engine', slug=f'{prefix}-engine')
+    subcategory = PartSubCategory.objects.create(
+        part_category=category, name=f'{prefix} Pistons', slug=f'{prefix}-pistons'
+    )
+    return {
+        'manufacturer': manufacturer,
+        'engine': engine,
+        'car': car,
+        'category': category,
+        'subcategory': subcategory,
+    }
+
+
+def make_illustrations(count, user, catalog, factory=None, prefix='Illustration'):
+    return [
+        Illustration.objects.create(
+            user=user,
+            factory=factory,
+            engine_model=catalog['engine'],
+            part_category=catalog['category'],
+            part_subcategory=catalog['subcategory'],
+            title=f'{prefix} {i}',
+        )
+        for i in range(count)
+    ]
@@ -10,6 +10,7 @@ router.register(r'part-subcategories', views.PartSubCategoryViewSet, basename='p
 router.register(r'illustrations', views.IllustrationViewSet, basename='illustration')
 router.register(r'illustration-files', views.IllustrationFileViewSet, basename='illustrationfile')
 router.register(r'favorites', views.FavoriteIllustrationViewSet, basename='favorite')
+router.register(r'uploads', views.UploadSessionViewSet, basename='upload-session')
 
 # ✅ Register car-models LAST or use manual URLs for custom actions
 router.register(r'car-models', views.CarModelViewSet, basename='carmodel')
@@ -22,6 +23,12 @@ urlpatterns = [
     path('car-models/fuel-types/', 
          views.CarModelViewSet.as_view({'get': 'fuel_types'}), 
          name='carmodel-fuel-types'),
+    path('catalog/tree/', views.CatalogTreeView.as_view(), name='catalog-tree'),
+    path('catalog/suggest/', views.CatalogSuggestView.as_view(), name='catalog-suggest'),
+    path('illustrations/export.zip',
+         views.IllustrationViewSet.as_view({'get': 'export'}),
+         name='illustration-export'),
+    path('files/signed/<str:token>/', views.signed_file, name='signed-file'),
     
     # Then include router URLs
     path('', include(router.urls)),
@@ -71,6 +78,13 @@ urlpatterns = [
 # PATCH  /api/part-subcategories/{id}/
 # DELETE /api/part-subcategories/{id}/
 #
+# Catalog:
+# GET    /api/catalog/tree/   ✅ Whole hierarchy with counts (cached, ETag)
+# GET    /api/catalog/suggest/?q=&type=&limit=   ✅ Typeahead over catalog names / codes
+#
+# Signed files:
+# GET    /api/files/signed/{token}/   ✅ Expiring URL, no auth / DB (preview_url, download_url)
+#
 # Illustrations:
 # GET    /api/illustrations/
 # POST   /api/illustrations/
@@ -86,4 +100,13 @@ urlpatterns = [
 # GET    /api/illustration-files/{id}/
 # PATCH  /api/illustration-files/{id}/
 # DELETE /api/illustration-files/{id}/
-# PATCH  /api/illustration-files/{id}/reorder/  ✅ Custom action
\ No newline at end of file
+# PATCH  /api/illustration-files/{id}/reorder/  ✅ Custom action#
+# Export:
+# GET    /api/illustrations/export.zip?<list filters>   streamed ZIP of all files
+#
+# Chunked Uploads (large files, resumable):
+# POST   /api/uploads/                 {illustration, filename, size, title}
+# GET    /api/uploads/{id}/            current offset
+# PUT    /api/uploads/{id}/            raw chunk, Content-Range: bytes start-end/size
+# POST   /api/uploads/{id}/complete/   -> IllustrationFile
+# DELETE /api/uploads/{id}/            abort
@@ -0,0 +1,34 @@
+"""
+Shared version numbers for caches that are rebuilt when the catalog changes.
+
+A version lives in a CatalogVersion row. bump() increments it with a
+single UPDATE and reads it back in the same transaction, so every caller
+gets a number nobody else got - a plain get/set cache counter can hand
+the same one to two processes. A new row is seeded from the clock so the
+numbers never repeat those of a deleted row.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import CatalogVersion
+
+
+def _seed(key):
+    counter, _ = CatalogVersion.objects.get_or_create(key=key, defaults={'value': int(time.time() * 1_000_000)})
+    return counter.value
+
+
+def get(key):
+    value = CatalogVersion.objects.filter(key=key).values_list('value', flat=True).first()
+    return _seed(key) if value is None else value
+
+
+def bump(key):
+    """Increment `key` and return the new value, unique to this call."""
+    with transaction.atomic():
+        if not CatalogVersion.objects.filter(key=key).update(value=F('value') + 1):
+            _seed(key)
+            CatalogVersion.objects.filter(key=key).update(value=F('value') + 1)
+        return CatalogVersion.objects.filter(key=key).values_list('value', flat=True).get()
@@ -1,18 +1,30 @@
-from django.db.models import Count, Prefetch
-from django.http import FileResponse, StreamingHttpResponse, Http404
-
-from rest_framework import viewsets, filters, status
+from django.db.models import Count, Prefetch, OuterRef, Subquery
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+
+from rest_framework import viewsets, filters, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+import io
 import os
 import mimetypes
+import time
+import uuid
+
+from apps.accounts.utils.activity_logger import log_activity
 
 from .models import (
     Manufacturer, CarModel, EngineModel,
     PartCategory, PartSubCategory,
-    Illustration, IllustrationFile, FavoriteIllustration
+    Illustration, IllustrationFile, FavoriteIllustration, UploadSession
 )
 
 from .serializers import (
@@ -21,7 +33,8 @@ from .serializers import (
     EngineModelSerializer, EngineModelDetailSerializer,
     PartCategorySerializer, PartSubCategorySerializer,
     IllustrationSerializer, IllustrationDetailSerializer,
-    IllustrationFileSerializer, FavoriteIllustrationSerializer
+    IllustrationFileSerializer, FavoriteIllustrationSerializer,
+    UploadSessionSerializer
 )
 
 from .permissions import (
@@ -31,14 +44,41 @@ from .permissions import (
     IllustrationPermission,
 )
 
-from .pagination import DefaultPagination
+from .pagination import DefaultPagination, KeysetPagination
+from .filters import (
+    IllustrationFilter, IllustrationSearchFilter, IllustrationOrderingFilter, applicable_to_car_model_q
+)
+from .counters import count_subquery, car_model_illustrations, matrix_count_subquery
+from .catalog import get_catalog_tree
+from . import chunked_uploads, exports, facets, suggest
+from .response_cache import CachedResponseMixin
+from .file_delivery import attachment_filename, serve_file
+from .signed_urls import DISPOSITION_ATTACHMENT, SignedURLError, SignedURLExpired, read_token
+
+FILE_EXPOSE_HEADERS = 'Content-Disposition, Content-Length, Content-Range, Accept-Ranges, ETag, Last-Modified'
+
+
+def annotate_navigation_count(qs, params, outer_field):
+    """
+    Add `context_illustration_count` for the `engine_model` / `car_model`
+    drill-down context, read from the illustration count matrix.
+    Without a context the stored illustration_count counter applies.
+    """
+    engine_id = params.get('engine_model')
+    car_id = params.get('car_model')
+    if not engine_id and not car_id:
+        return qs
+    return qs.annotate(
+        context_illustration_count=matrix_count_subquery(outer_field, engine_id, car_id)
+    )
 
 
 # ========================================
 # Manufacturer
 # ========================================
 
-class ManufacturerViewSet(viewsets.ModelViewSet):
+class ManufacturerViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_resource = 'manufacturers'
     permission_classes = [AdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['slug', 'name']
@@ -46,14 +86,8 @@ class ManufacturerViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
     def get_queryset(self):
-        qs = Manufacturer.objects.all()
-        if self.action == 'list':
-            qs = qs.annotate(
-                engine_count=Count('engines', distinct=True),
-                car_model_count=Count('car_models', distinct=True),
-                illustration_count=Count('engines__illustrations', distinct=True)
-            )
-        return qs
+        # engine_count / car_model_count / illustration_count are counter columns
+        return Manufacturer.objects.all()
 
     def get_serializer_class(self):
         return ManufacturerDetailSerializer if self.action == 'retrieve' else ManufacturerSerializer
@@ -63,7 +97,8 @@ class ManufacturerViewSet(viewsets.ModelViewSet):
 # Engine Models
 # ========================================
 
-class EngineModelViewSet(viewsets.ModelViewSet):
+class EngineModelViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_resource = 'engine_models'
     permission_classes = [AdminOrReadOnly]
     pagination_class = None
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -79,12 +114,6 @@ class EngineModelViewSet(viewsets.ModelViewSet):
         car_model_id = self.request.query_params.get('car_model')
         if car_model_id:
             qs = qs.filter(car_models__id=car_model_id)
-        
-        if self.action == 'list':
-            qs = qs.annotate(
-                car_model_count=Count('car_models', distinct=True),
-                illustration_count=Count('illustrations', distinct=True)
-            )
         return qs
 
     def get_serializer_class(self):
@@ -102,7 +131,8 @@ class EngineModelViewSet(viewsets.ModelViewSet):
 # Car Models
 # ========================================
 
-class CarModelViewSet(viewsets.ModelViewSet):
+class CarModelViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_resource = 'car_models'
     permission_classes = [AdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['manufacturer', 'vehicle_type']
@@ -114,30 +144,14 @@ class CarModelViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         qs = CarModel.objects.select_related('manufacturer').prefetch_related('engines')
         if self.action == 'list':
-            # Illustration count - Correctly recursive
-            from django.db.models import Q, F
-            
-            # Context-aware filtering
+            # Context-aware filtering: only count illustrations of the given engine
             engine_model_id = self.request.query_params.get('engine_model')
-            
-            # Base filter for illustrations
-            illustration_filter = Q(engines__illustrations__applicable_car_models__isnull=True) | \
-                                  Q(engines__illustrations__applicable_car_models=F('id'))
-            
-            # If engine context provided, only count illustrations from that engine
             if engine_model_id:
-                illustration_filter &= Q(engines__illustrations__engine_model_id=engine_model_id)
-                # Also filter the cars themselves to only those having this engine (optional but clean)
-                qs = qs.filter(engines__id=engine_model_id)
-            
-            qs = qs.annotate(
-                engine_count=Count('engines', distinct=True),
-                illustration_count=Count(
-                    'engines__illustrations',
-                    filter=illustration_filter,
-                    distinct=True
+                qs = qs.filter(engines__id=engine_model_id).annotate(
+                    context_illustration_count=count_subquery(
+                        car_model_illustrations().filter(engine_model_id=engine_model_id)
+                    )
                 )
-            )
         return qs
 
     def get_serializer_class(self):
@@ -155,7 +169,8 @@ class CarModelViewSet(viewsets.ModelViewSet):
 # Part Categories
 # ========================================
 
-class PartCategoryViewSet(viewsets.ModelViewSet):
+class PartCategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_resource = 'part_categories'
     serializer_class = PartCategorySerializer
     permission_classes = [AdminOrReadOnly]
     pagination_class = None
@@ -167,38 +182,12 @@ class PartCategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         qs = PartCategory.objects.all()
         if self.action == 'list':
-            # Subcategory count
-            qs = qs.annotate(subcategory_count=Count('subcategories', distinct=True))
-            
-            # Illustration count - Context Aware
-            from django.db.models import Q
-            
-            engine_id = self.request.query_params.get('engine_model')
-            car_id = self.request.query_params.get('car_model')
-            
-            filter_query = Q()
-            
-            if engine_id:
-                filter_query &= Q(illustrations__engine_model_id=engine_id)
-                
-            if car_id:
-                # Logic: Illustration applies if it has NO specific cars OR includes this car
-                filter_query &= (
-                    Q(illustrations__applicable_car_models__id=car_id) | 
-                    Q(illustrations__applicable_car_models__isnull=True)
-                )
-
-            qs = qs.annotate(
-                 illustration_count=Count(
-                     'illustrations', 
-                     filter=filter_query, 
-                     distinct=True
-                 )
-            )
+            qs = annotate_navigation_count(qs, self.request.query_params, 'part_category')
         return qs
 
 
-class PartSubCategoryViewSet(viewsets.ModelViewSet):
+class PartSubCategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_resource = 'part_subcategories'
     serializer_class = PartSubCategorySerializer
     permission_classes = [AdminOrReadOnly]
     pagination_class = None
@@ -211,32 +200,64 @@ class PartSubCategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         qs = PartSubCategory.objects.select_related('part_category')
         if self.action == 'list':
-            # Illustration count - Context Aware
-            from django.db.models import Q
-            
-            engine_id = self.request.query_params.get('engine_model')
-            car_id = self.request.query_params.get('car_model')
-            
-            filter_query = Q()
-            
-            if engine_id:
-                filter_query &= Q(illustrations__engine_model_id=engine_id)
-                
-            if car_id:
-                # Logic: Illustration applies if it has NO specific cars OR includes this car
-                filter_query &= (
-                    Q(illustrations__applicable_car_models__id=car_id) | 
-                    Q(illustrations__applicable_car_models__isnull=True)
-                )
+            qs = annotate_navigation_count(qs, self.request.query_params, 'part_subcategory')
+        return qs
 
-            qs = qs.annotate(
-                 illustration_count=Count(
-                     'illustrations', 
-                     filter=filter_query, 
-                     distinct=True
-                 )
+
+# ========================================
+# Catalog Tree
+# ========================================
+
+class CatalogTreeView(APIView):
+    """
+    Whole manufacturer / engine / car model / part category hierarchy with
+    counts in one response, served from the versioned catalog cache.
+    The catalog version is the ETag: unchanged catalogs answer 304.
+    """
+    permission_classes = [AdminOrReadOnly]
+
+    def get(self, request):
+        version, tree = get_catalog_tree()
+        etag = f'"catalog-{version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response({'version': version, **tree}, headers=headers)
+
+
+class CatalogSuggestView(APIView):
+    """
+    Typeahead over every catalog name and code (manufacturers, engines,
+    car models, part categories/subcategories) from an in-memory index.
+
+    ?q=      query (width / case / hiragana-katakana insensitive)
+    ?type=   optional, comma separated: manufacturer, engine_model, car_model,
+             part_category, part_subcategory
+    ?limit=  1-50, default 10
+    """
+    permission_classes = [AdminOrReadOnly]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        types = {t.strip() for t in request.query_params.get('type', '').split(',') if t.strip()}
+        unknown = types - set(suggest.TYPE_ORDER)
+        if unknown:
+            return Response(
+                {'error': f"不明な種類です: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        return qs
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.max_limit)
+        except ValueError:
+            limit = 10
+        return Response({
+            'query': query,
+            'results': suggest.suggest(query, limit=limit, types=types or None),
+        })
 
 
 # ========================================
@@ -245,20 +266,22 @@ class PartSubCategoryViewSet(viewsets.ModelViewSet):
 class IllustrationViewSet(viewsets.ModelViewSet):
     permission_classes = [AuthenticatedAndActive, IllustrationPermission]
     pagination_class = DefaultPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = [
-        'user',
-        'factory',
-        'engine_model',
-        'engine_model__manufacturer',
-        'part_category',
-        'part_subcategory',
-        'applicable_car_models'
-    ]
-    search_fields = ['title', 'description']
+    filter_backends = [DjangoFilterBackend, IllustrationSearchFilter, IllustrationOrderingFilter]
+    filterset_class = IllustrationFilter
     ordering_fields = ['created_at', 'updated_at', 'title', 'factory__name', 'user__username', 'is_own_factory']
     ordering = ['-created_at']
 
+    @property
+    def paginator(self):
+        """`?cursor=` switches the list to keyset pagination (no OFFSET, no COUNT)"""
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            if request is not None and KeysetPagination.cursor_query_param in request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Illustration.objects.none()
@@ -280,12 +303,28 @@ class IllustrationViewSet(viewsets.ModelViewSet):
             'applicable_car_models',
             'applicable_car_models__manufacturer'
         ).annotate(
-            file_count=Count('files', distinct=True)
+            # Correlated COUNT instead of JOIN + GROUP BY over every selected column
+            file_count=Coalesce(
+                Subquery(
+                    IllustrationFile.objects.filter(illustration=OuterRef('pk'))
+                    .order_by()
+                    .values('illustration')
+                    .annotate(count=Count('id'))
+                    .values('count')
+                ),
+                0
+            ),
+            # Thumbnail of the first file, without loading the files
+            first_file_renditions=Subquery(
+                IllustrationFile.objects.filter(illustration=OuterRef('pk'))
+                .order_by('uploaded_at', 'pk')
+                .values('renditions')[:1]
+            )
         )
         
         # Annotate with own factory status for sorting
         if user and user.is_authenticated:
-            user_factories = user.get_active_memberships().values_list('factory_id', flat=True)
+            user_factories = user.visibility_scope.factory_ids
             from django.db.models import Case, When, Value, IntegerField
             qs = qs.annotate(
                 is_own_factory=Case(
@@ -300,8 +339,6 @@ class IllustrationViewSet(viewsets.ModelViewSet):
 
         # Only prefetch files if explicitly requested or on detail view
         if self.action == 'retrieve' or include_files:
-            from django.db.models import Prefetch
-            from .models import IllustrationFile
             qs = qs.prefetch_related(
                 Prefetch(
                     'files',
@@ -309,20 +346,12 @@ class IllustrationViewSet(viewsets.ModelViewSet):
                 )
             )
 
-        if not user.is_authenticated or not user.is_active:
+        if not user.is_authenticated:
             return qs.none()
-            
-        if user.is_superuser:
-            pass # Superuser sees all
-        elif user.is_verified and user.can_view_all_illustrations():
-            pass # High-tier verified users (Manager, Admin, Viewer, etc.) see all
-        else:
-            # Restricted visibility (Contributor or Unverified)
-            # 1. Users can always see their own illustrations
-            # 2. They can also see any illustration within factories they are members of
-            user_factories = user.get_active_memberships().values_list('factory_id', flat=True)
-            from django.db.models import Q
-            qs = qs.filter(Q(factory_id__in=user_factories) | Q(user=user))
+
+        # Superusers and verified high-tier roles see all; Contributors and
+        # unverified users see their own plus their factories' illustrations
+        qs = user.visibility_scope.filter(qs)
 
         # Apply filtering from query params for navigation hierarchy
         manufacturer_id = self.request.query_params.get('manufacturer')
@@ -337,11 +366,7 @@ class IllustrationViewSet(viewsets.ModelViewSet):
         if engine_id:
             qs = qs.filter(engine_model_id=engine_id)
         if car_model_id:
-            from django.db.models import Q
-            qs = qs.filter(
-                Q(applicable_car_models__id=car_model_id) |
-                Q(applicable_car_models__isnull=True)
-            )
+            qs = qs.filter(applicable_to_car_model_q(car_model_id))
         if category_id:
             qs = qs.filter(part_category_id=category_id)
         if subcategory_id:
@@ -349,9 +374,27 @@ class IllustrationViewSet(viewsets.ModelViewSet):
         if factory_id:
             qs = qs.filter(factory_id=factory_id)
 
-        return qs.distinct()  # Use distinct() when filtering by many-to-many fields
+        # No distinct() needed: M2M filters are EXISTS subqueries, so rows are never duplicated
+        return qs
 
 
+    def list(self, request, *args, **kwargs):
+        """`?facets=manufacturer,part_category,...` adds facet counts of the whole filtered list to the page"""
+        try:
+            facet_names = facets.parse_facets(request.query_params.get('facets'))
+        except ValueError as e:
+            return Response({'error': f'不明なファセットです: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response({'results': self.get_serializer(queryset, many=True).data})
+        if facet_names:
+            response.data['facets'] = facets.facet_counts(queryset, facet_names)
+        return response
+
     def get_serializer_class(self):
         return IllustrationDetailSerializer if self.action == 'retrieve' else IllustrationSerializer
 
@@ -368,8 +411,8 @@ class IllustrationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         # Ensure user has at least one active factory
-        active_memberships = user.get_active_memberships()
-        if not active_memberships.exists() and not user.is_superuser:
+        snapshot = user.permission_snapshot
+        if not snapshot.memberships and not user.is_superuser:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'factory': 'あなたはどの工場にも割り当てられていません'})
         
@@ -389,7 +432,7 @@ class IllustrationViewSet(viewsets.ModelViewSet):
                 from rest_framework.exceptions import ValidationError
                 raise ValidationError({'factory': '指定された工場でイラストを作成する権限がありません'})
         else:
-            first_membership = active_memberships.first()
+            first_membership = snapshot.first_membership
             if first_membership:
                 factory = first_membership.factory
         
@@ -410,8 +453,7 @@ class IllustrationViewSet(viewsets.ModelViewSet):
         total_count = qs.count()
         
         # Get user's active factories
-        active_memberships = user.get_active_memberships()
-        user_factories = active_memberships.values_list('factory_id', flat=True)
+        user_factories = user.visibility_scope.factory_ids
         own_factory_count = qs.filter(factory_id__in=user_factories).count()
         
         # Total Factories (All factories in the system)
@@ -436,6 +478,39 @@ class IllustrationViewSet(viewsets.ModelViewSet):
         print(f"DEBUG STATS for user {user.email}: {res_data}")
         return Response(res_data)
 
+    @action(detail=False, methods=['get'], url_path='export.zip')
+    def export(self, request):
+        """ZIP of every file of the illustrations the list returns (same filters), streamed"""
+        illustrations = self.filter_queryset(self.get_queryset())
+        limit = settings.EXPORT_MAX_FILES
+        files = list(
+            IllustrationFile.objects.filter(illustration__in=illustrations.order_by().values('pk'))
+            .select_related('illustration__engine_model__manufacturer', 'illustration__part_category')
+            .order_by('illustration_id', 'uploaded_at', 'pk')[:limit + 1]
+        )
+        if not files:
+            return Response({'error': 'エクスポートするファイルがありません'}, status=status.HTTP_404_NOT_FOUND)
+        if len(files) > limit:
+            return Response(
+                {'error': f'ファイルが多すぎます（最大{limit}件）。条件を絞り込んでください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entries = exports.export_entries(files)
+        illustration_count = len({file_obj.illustration_id for file_obj in files})
+        log_activity(
+            request, request.user, 'EXPORT', 'Illustration',
+            object_repr='export.zip',
+            description=f'Exported {len(entries)} files from {illustration_count} illustrations',
+            changes={'filters': request.query_params.dict(), 'files': len(entries)}
+        )
+
+        response = StreamingHttpResponse(exports.iter_zip(entries), content_type='application/zip')
+        filename = f"illustrations_{timezone.now():%Y%m%d_%H%M%S}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
     @action(detail=True, methods=['post'])
     def add_files(self, request, pk=None):
         illustration = self.get_object()
@@ -455,11 +530,13 @@ class IllustrationViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            obj = IllustrationFile.objects.create(
-                illustration=illustration,
-                file=file
-            )
-            created.append(IllustrationFileSerializer(obj).data)
+            # The processing job is enqueued in the same transaction as the row
+            with transaction.atomic():
+                obj = IllustrationFile.objects.create(
+                    illustration=illustration,
+                    file=file
+                )
+            created.append(IllustrationFileSerializer(obj, context={'request': request}).data)
 
         return Response(
             {'message': f'{len(created)}個のファイルがアップロードされました', 'files': created},
@@ -499,10 +576,9 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """
-        Permissions for IllustrationFile actions
+        Permissions for IllustrationFile actions.
+        Anonymous access goes through signed URLs (see signed_file).
         """
-        if self.action == 'preview':
-            return [AllowAny()]
         return [AuthenticatedAndActive(), IllustrationPermission()]
 
     def get_queryset(self):
@@ -515,29 +591,21 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
             'illustration__engine_model__manufacturer'
         )
         
-        # Allow access to preview for everyone
-        if self.action == 'preview':
-            return qs
-
         user = self.request.user
         
         # Base requirements: Must be authenticated and active
-        if not user.is_authenticated or not user.is_active:
+        if not user.is_authenticated:
             return qs.none()
-            
-        if user.is_verified and (user.is_system_admin() or user.can_view_all_illustrations()):
-            return qs
-        else:
-            # ROLE-BASED FILTERING (Strict ownership for Contributors/Unverified)
-            return qs.filter(illustration__user=user)
 
-    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+        # Same scope as the illustration list; preview/download still check the object
+        return user.visibility_scope.filter(qs, prefix='illustration__')
+
+    @action(detail=True, methods=['get'])
     def preview(self, request, pk=None):
         """Preview file inline in browser"""
+        # get_object() applies queryset filtering and object permissions (404/403)
+        file_obj = self.get_object()
         try:
-            # We use the full queryset for preview to bypass restrictions
-            file_obj = IllustrationFile.objects.get(pk=pk)
-            
             if not file_obj.file:
                 return Response(
                     {'error': 'ファイルが関連付けられていません'},
@@ -574,12 +642,12 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
             if not content_type:
                 content_type = 'application/pdf'
             
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Open file
+            # Inline response with Range / ETag / conditional GET support
             try:
-                file_handle = open(file_path, 'rb')
+                response = serve_file(
+                    request, file_path, content_type,
+                    disposition=f'inline; filename="{original_name}"'
+                )
             except PermissionError as e:
                 print(f"❌ Preview error: Permission denied for {file_path}: {str(e)}")
                 return Response(
@@ -587,31 +655,14 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # Create response for inline viewing
-            response = FileResponse(
-                file_handle,
-                content_type=content_type
-            )
-            
-            # Set inline disposition
-            response['Content-Disposition'] = f'inline; filename="{original_name}"'
-            response['Content-Length'] = file_size
-            response['X-Content-Type-Options'] = 'nosniff'
-            
             # CORS headers
             origin = request.META.get('HTTP_ORIGIN', '')
             response['Access-Control-Allow-Origin'] = origin if origin else '*'
             response['Access-Control-Allow-Credentials'] = 'true'
-            response['Access-Control-Expose-Headers'] = 'Content-Disposition, Content-Length'
+            response['Access-Control-Expose-Headers'] = FILE_EXPOSE_HEADERS
             
             return response
             
-        except IllustrationFile.DoesNotExist:
-            print(f"❌ Preview error: IllustrationFile with PK {pk} does not exist")
-            return Response(
-                {'error': 'ファイルレコードが見つかりません', 'pk': pk},
-                status=status.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
@@ -626,10 +677,9 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], permission_classes=[AuthenticatedAndActive])
     def download(self, request, pk=None):
         """Download file"""
+        # get_object() applies queryset filtering and object permissions (404/403)
+        file_obj = self.get_object()
         try:
-            # get_object() will automatically apply queryset filtering
-            file_obj = self.get_object()
-            
             if not file_obj.file:
                 return Response(
                     {'error': 'ファイルが関連付けられていません'},
@@ -659,56 +709,26 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
                 )
             
             # Create safe filename
-            safe_title = "".join(
-                c for c in file_obj.illustration.title 
-                if c.isalnum() or c in (' ', '-', '_', '.')
-            ).strip()
-            safe_title = safe_title.replace(' ', '_')[:50]
-            
-            # Get extension
-            _, ext = os.path.splitext(file_obj.file.name)
-            if not ext:
-                ext = '.pdf'
-            
-            download_filename = f"{safe_title}{ext}"
+            download_filename = attachment_filename(file_obj.illustration.title, file_obj.file.name)
             
             # Detect MIME type
             content_type, _ = mimetypes.guess_type(download_filename)
             if not content_type:
                 content_type = 'application/pdf'
             
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Open file
+            # Attachment response with Range / ETag / conditional GET support.
+            # "private, no-cache": browsers keep the file but revalidate (304) each time.
             try:
-                file_handle = open(file_path, 'rb')
+                response = serve_file(
+                    request, file_path, content_type,
+                    disposition=f'attachment; filename="{download_filename}"'
+                )
             except PermissionError:
                 return Response(
                     {'error': 'ファイルの読み取り権限がありません'},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # Use StreamingHttpResponse for large files
-            if file_size > 10 * 1024 * 1024:  # 10MB
-                response = StreamingHttpResponse(
-                    file_handle,
-                    content_type=content_type
-                )
-            else:
-                response = FileResponse(
-                    file_handle,
-                    content_type=content_type
-                )
-            
-            # Set download headers
-            response['Content-Disposition'] = f'attachment; filename="{download_filename}"'
-            response['Content-Length'] = file_size
-            response['X-Content-Type-Options'] = 'nosniff'
-            response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response['Pragma'] = 'no-cache'
-            response['Expires'] = '0'
-            
             # CORS headers
             origin = request.META.get('HTTP_ORIGIN', '')
             from django.conf import settings
@@ -716,15 +736,10 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
             if origin in settings.CORS_ALLOWED_ORIGINS:
                 response['Access-Control-Allow-Origin'] = origin
                 response['Access-Control-Allow-Credentials'] = 'true'
-                response['Access-Control-Expose-Headers'] = 'Content-Disposition, Content-Length'
+                response['Access-Control-Expose-Headers'] = FILE_EXPOSE_HEADERS
             
             return response
             
-        except IllustrationFile.DoesNotExist:
-            return Response(
-                {'error': 'ファイルが見つかりません（アクセス権がないか存在しません）'},
-                status=status.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
@@ -737,6 +752,126 @@ class IllustrationFileViewSet(viewsets.ModelViewSet):
             )
 
 
+# ========================================
+# Signed file URLs
+# ========================================
+@require_safe
+def signed_file(request, token):
+    """
+    Serve a file from a signed, expiring URL (see signed_urls.py).
+    No authentication and no DB query: the token carries the storage name.
+    """
+    try:
+        payload = read_token(token)
+    except SignedURLExpired:
+        return JsonResponse({'error': 'リンクの有効期限が切れています'}, status=status.HTTP_410_GONE)
+    except SignedURLError:
+        return JsonResponse({'error': '無効なリンクです'}, status=status.HTTP_403_FORBIDDEN)
+
+    storage_name = payload['p']
+    try:
+        file_path = IllustrationFile._meta.get_field('file').storage.path(storage_name)
+    except NotImplementedError:
+        return JsonResponse({'error': 'このストレージは署名付きURLに対応していません'}, status=status.HTTP_404_NOT_FOUND)
+
+    if payload['d'] == DISPOSITION_ATTACHMENT:
+        filename = payload.get('n') or os.path.basename(storage_name)
+        disposition = f'attachment; filename="{filename}"'
+    else:
+        filename = os.path.basename(storage_name)
+        disposition = f'inline; filename="{filename}"'
+
+    content_type, _ = mimetypes.guess_type(filename)
+    max_age = max(int(payload['e'] - time.time()), 0)
+    try:
+        return serve_file(
+            request, file_path, content_type or 'application/octet-stream',
+            disposition=disposition,
+            cache_control=f'private, max-age={max_age}'
+        )
+    except FileNotFoundError:
+        return JsonResponse({'error': 'ファイルがサーバー上に見つかりません'}, status=status.HTTP_404_NOT_FOUND)
+    except PermissionError:
+        return JsonResponse({'error': 'ファイルの読み取り権限がありません'}, status=status.HTTP_403_FORBIDDEN)
+
+
+# ========================================
+# Chunked Uploads
+# ========================================
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable uploads of large files (see chunked_uploads.py).
+    PUT sends one chunk as the raw request body with a Content-Range header.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [AuthenticatedAndActive]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        return UploadSession.objects.filter(
+            user=self.request.user, status=UploadSession.UPLOADING
+        ).select_related('illustration')
+
+    def perform_create(self, serializer):
+        illustration = serializer.validated_data['illustration']
+        if not self.request.user.can_edit_illustration(illustration):
+            raise PermissionDenied('このイラストを編集する権限がありません')
+        session_id = uuid.uuid4()
+        serializer.save(
+            id=session_id,
+            user=self.request.user,
+            part_name=chunked_uploads.part_name(session_id)
+        )
+
+    def update(self, request, pk=None):
+        """Append one chunk"""
+        session = self.get_object()
+        content_range = chunked_uploads.parse_content_range(request.headers.get('Content-Range'))
+        if content_range is None:
+            return Response(
+                {'error': 'Content-Range ヘッダーが不正です (bytes start-end/size)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = content_range
+        if total != session.size:
+            return Response({'error': 'ファイルサイズが一致しません'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            chunked_uploads.write_chunk(session, request.stream or io.BytesIO(), start, end - start + 1)
+        except chunked_uploads.OffsetMismatch as e:
+            return Response(
+                {'error': 'オフセットが一致しません', 'offset': e.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except chunked_uploads.UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'offset': session.offset, 'size': session.size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Attach the received file to the illustration"""
+        session = self.get_object()
+        try:
+            file_obj = chunked_uploads.complete(session)
+        except chunked_uploads.UploadError as e:
+            return Response(
+                {'error': str(e), 'offset': session.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            IllustrationFileSerializer(file_obj, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def perform_destroy(self, instance):
+        chunked_uploads.abort(instance)
+
+
 # ========================================
 # Favorite Illustrations
 # ========================================
@@ -758,18 +893,11 @@ class FavoriteIllustrationViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated or not user.is_verified:
             return FavoriteIllustration.objects.none()
         
-        from django.db.models import Q
         qs = FavoriteIllustration.objects.filter(user=user)
         
         # Unified Visibility Logic for favorites:
         # Only show favorites where the user still has permission to view the illustration
-        if not (user.is_verified and user.can_view_all_illustrations()):
-            user_factories = user.get_active_memberships().values_list('factory_id', flat=True)
-            qs = qs.filter(
-                Q(illustration__user=user) |
-                Q(illustration__factory_id__in=user_factories) |
-                Q(illustration__factory__isnull=True)
-            )
+        qs = user.visibility_scope.filter(qs, prefix='illustration__')
 
         return qs.select_related(
             'illustration__engine_model__manufacturer',
@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'queue', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'last_error']
+    readonly_fields = ['created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error']
+    ordering = ['-created_at']
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
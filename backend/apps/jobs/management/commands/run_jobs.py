@@ -0,0 +1,44 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='default', help='Queue to consume (default: default)')
+        parser.add_argument('--batch', type=int, default=10, help='Jobs claimed per poll (default: 10)')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Run the due jobs once and exit')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker = queue.worker_name()
+        self.stdout.write(f'Worker {worker} consuming "{options["queue"]}"')
+
+        while not self.stopping:
+            close_old_connections()
+            queue.requeue_stale()
+            count = queue.run_pending(worker, queue=options['queue'], limit=options['batch'])
+            if count:
+                self.stdout.write(f'Ran {count} job(s)')
+            if options['once']:
+                if not count:
+                    break
+                continue
+            if not count:
+                time.sleep(options['sleep'])
+
+        self.stdout.write('Worker stopped')
+
+    def stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self.stopping = True
@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+
+# ------------------------------
+# Job
+# ------------------------------
+class Job(models.Model):
+    """
+    Background job stored in the database (no external broker).
+
+    Jobs are inserted inside the caller's transaction, so a worker only sees
+    them once the work that enqueued them has committed. `manage.py run_jobs`
+    claims QUEUED jobs whose run_after has passed and executes the registered
+    task with `payload` as keyword arguments.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            # Worker poll: WHERE queue = ? AND status = 'queued' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['queue', 'status', 'run_after'], name='job_poll_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,188 @@
+"""
+Database job queue.
+
+    from apps.jobs.queue import task, enqueue
+
+    @task('illustrations.process_file')          # in <app>/tasks.py
+    def process_file(file_id): ...
+
+    enqueue('illustrations.process_file', file_id=file.pk)
+
+Claiming is an UPDATE ... WHERE status = 'queued' per candidate row, so
+several workers can poll the same table safely (SKIP LOCKED is used where
+the backend supports it to avoid contention).
+
+While a worker runs a batch, a heartbeat thread refreshes `locked_at` of
+its RUNNING jobs. Jobs whose heartbeat stopped belong to a dead worker:
+requeue_stale() queues them again, or fails them once they used up their
+attempts (a task that kills its worker must not loop forever).
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Running workers refresh locked_at this often; jobs not refreshed for
+# STALE_AFTER belong to a dead worker
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=2)
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name):
+    """Register a function as the job task `name`."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, queue='default', delay=None, max_attempts=3, **payload):
+    """
+    Insert a job in the current transaction (visible to workers on commit).
+    With settings.JOBS_RUN_EAGERLY the task instead runs in-process on commit.
+    """
+    if task_name not in TASKS:
+        raise UnknownTask(task_name)
+    if getattr(settings, 'JOBS_RUN_EAGERLY', False):
+        transaction.on_commit(lambda: TASKS[task_name](**payload))
+        return None
+    return Job.objects.create(
+        queue=queue,
+        task=task_name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + (delay or timedelta()),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_stale(now=None):
+    """Requeue jobs of dead workers; fail those that used up their attempts. Returns the number requeued."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - STALE_AFTER)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, finished_at=now,
+        last_error='Worker stopped responding while running this job'
+    )
+    if failed:
+        logger.warning('%s job(s) failed: their worker died on the last attempt', failed)
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def beat(worker, now=None):
+    """Refresh locked_at of the jobs `worker` is running."""
+    return Job.objects.filter(status=Job.RUNNING, locked_by=worker).update(locked_at=now or timezone.now())
+
+
+class Heartbeat:
+    """Context manager running beat() every HEARTBEAT_INTERVAL in a thread."""
+
+    def __init__(self, worker, interval=HEARTBEAT_INTERVAL):
+        self.worker = worker
+        self.interval = interval.total_seconds()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name=f'job-heartbeat-{worker}', daemon=True)
+
+    def loop(self):
+        used_db = False
+        try:
+            while not self.stopped.wait(self.interval):
+                used_db = True
+                try:
+                    beat(self.worker)
+                except Exception:
+                    logger.exception('Job heartbeat failed')
+        finally:
+            if used_db:
+                # The thread has its own connection
+                connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def claim(worker, queue='default', limit=10):
+    """Atomically mark up to `limit` due jobs as RUNNING for `worker` and return them."""
+    now = timezone.now()
+    candidates = Job.objects.filter(queue=queue, status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+    claimed = []
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:limit])
+        for pk in ids:
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1
+            ):
+                claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_after', 'pk'))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(10 * 2 ** attempts, 3600))
+
+
+def run(job):
+    """Execute one claimed job and record its outcome. Returns True on success."""
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        func(**job.payload)
+    except Exception as e:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts and not isinstance(e, UnknownTask):
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        logger.warning('Job %s (%s) failed, attempt %s/%s', job.pk, job.task, job.attempts, job.max_attempts)
+        job.locked_by = ''
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_after', 'last_error', 'finished_at', 'locked_by', 'locked_at'])
+        return False
+
+    job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'finished_at', 'locked_by', 'locked_at'])
+    return True
+
+
+def run_pending(worker=None, queue='default', limit=10):
+    """Claim and run one batch. Returns the number of jobs run."""
+    worker = worker or worker_name()
+    jobs = claim(worker, queue=queue, limit=limit)
+    if not jobs:
+        return 0
+    with Heartbeat(worker):
+        for job in jobs:
+            run(job)
+    return len(jobs)
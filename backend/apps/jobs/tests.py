@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import TASKS, beat, claim, enqueue, requeue_stale, run_pending, task
+
+CALLS = []
+
+
+@task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@task('tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_RUN_EAGERLY=False)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run(self):
+        job = enqueue('tests.record', value=7)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(run_pending('w1'), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(CALLS, [7])
+
+    def test_claim_is_exclusive(self):
+        enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+        first = claim('w1', limit=1)
+        second = claim('w2', limit=10)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0].pk, second[0].pk)
+        self.assertEqual(claim('w3'), [])
+
+    def test_delayed_job_waits(self):
+        enqueue('tests.record', delay=timedelta(minutes=5), value=1)
+        self.assertEqual(run_pending('w1'), 0)
+
+    def test_failure_is_retried_then_failed(self):
+        job = enqueue('tests.explode', max_attempts=2)
+        run_pending('w1')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending('w1')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue('tests.record', value=1)
+        claim('w1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending('w2'), 1)
+        self.assertEqual(CALLS, [1])
+
+    def test_stale_job_on_its_last_attempt_fails(self):
+        job = enqueue('tests.record', max_attempts=1, value=1)
+        claim('w1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(run_pending('w2'), 0)
+
+    def test_heartbeat_keeps_long_jobs_claimed(self):
+        job = enqueue('tests.record', value=1)
+        claim('w1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(beat('w1'), 1)
+        self.assertEqual(requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+    @override_settings(JOBS_RUN_EAGERLY=True)
+    def test_eager_mode_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue('tests.record', value=3))
+        self.assertEqual(CALLS, [3])
+        self.assertFalse(Job.objects.exists())
+
+    def test_tasks_autodiscovered(self):
+        self.assertIn('illustrations.process_file', TASKS)
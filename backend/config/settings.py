@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     # Local apps
     'apps.accounts',
     'apps.illustrations',
+    'apps.jobs',
 ]
 
 # ============================================
@@ -171,6 +172,37 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ============================================
+# CACHE
+# ============================================
+# Catalog tree cache + version counter. Gunicorn runs several workers, so
+# production needs a cache shared between processes (file based by default,
+# or memcached/redis via CACHE_BACKEND / CACHE_LOCATION).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            "CACHE_BACKEND",
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else 'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv("CACHE_LOCATION", str(BASE_DIR / 'cache') if not DEBUG else 'yaw-backend'),
+    },
+    # Catalog API responses (apps/illustrations/response_cache.py). For Redis:
+    # CATALOG_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+    # CATALOG_CACHE_LOCATION=redis://127.0.0.1:6379/1
+    'catalog': {
+        'BACKEND': os.getenv(
+            "CATALOG_CACHE_BACKEND",
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else 'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            "CATALOG_CACHE_LOCATION", str(BASE_DIR / 'cache' / 'catalog') if not DEBUG else 'yaw-catalog'
+        ),
+    },
+}
+CATALOG_RESPONSE_CACHE_TIMEOUT = int(os.getenv("CATALOG_RESPONSE_CACHE_TIMEOUT", 60 * 60))
+
 # ============================================
 # REST FRAMEWORK
 # ============================================
@@ -272,12 +304,24 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    # Ranged / conditional file requests (PDF.js)
+    'range',
+    'if-range',
+    # Chunked uploads
+    'content-range',
+    'if-none-match',
+    'if-modified-since',
 ]
 
 # Headers exposed to the browser
 CORS_EXPOSE_HEADERS = [
     'content-disposition',
     'content-length',
+    'content-range',
+    'accept-ranges',
+    'etag',
+    'last-modified',
+    'x-cache',
 ]
 
 CSRF_TRUSTED_ORIGINS = [
@@ -317,6 +361,51 @@ SUPPORT_EMAIL = os.getenv("SUPPORT_EMAIL", "")
 FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", 52428800))
 DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("DATA_UPLOAD_MAX_MEMORY_SIZE", 52428800))
 
+# File delivery for illustration preview/download:
+#   django           - Django streams the file (Range / ETag handled in-process)
+#   x-accel-redirect - nginx sends it from an `internal` location (see nginx/file-delivery.conf)
+#   x-sendfile       - Apache mod_xsendfile / lighttpd send it by absolute path
+FILE_DELIVERY_MODE = os.getenv("FILE_DELIVERY_MODE", "django")
+FILE_DELIVERY_ACCEL_PREFIX = os.getenv("FILE_DELIVERY_ACCEL_PREFIX", "/protected-media/")
+
+# Resumable chunked uploads (/api/uploads/) for files too large for one request
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_SIZE", 2 * 1024 ** 3))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_CHUNK_SIZE", 16 * 1024 ** 2))
+CHUNKED_UPLOAD_EXPIRE_HOURS = int(os.getenv("CHUNKED_UPLOAD_EXPIRE_HOURS", 24))
+
+# Upper bound on files in one /api/illustrations/export.zip
+EXPORT_MAX_FILES = int(os.getenv("EXPORT_MAX_FILES", 5000))
+
+# Where new illustration files are stored:
+#   content - once per distinct content under blobs/, keyed by SHA-256 and
+#             reference-counted (see apps/illustrations/blobs.py)
+#   path    - one copy per upload under illustrations/<mfr>/<engine>/...
+# Existing files are moved with `manage.py dedup_illustration_files`.
+FILE_STORAGE_MODE = os.getenv("FILE_STORAGE_MODE", "content")
+
+# Signed preview/download URLs: lifetime, rounded up to BUCKET seconds so
+# URLs (and browser caches) stay stable for a while
+SIGNED_FILE_URL_TTL = int(os.getenv("SIGNED_FILE_URL_TTL", 900))
+SIGNED_FILE_URL_BUCKET = int(os.getenv("SIGNED_FILE_URL_BUCKET", 300))
+
+# Background jobs (apps.jobs): run by `manage.py run_jobs`. Eager mode runs
+# tasks in-process on commit instead (tests / setups without a worker).
+JOBS_RUN_EAGERLY = os.getenv("JOBS_RUN_EAGERLY", "False") == "True"
+
+# Activity log entries are buffered in-process and bulk-inserted by a
+# background thread every FLUSH_INTERVAL seconds or BUFFER_SIZE entries
+# (see apps/accounts/utils/activity_logger.py). 0 writes synchronously;
+# the test runner (config.test_runner) sets it so no flush thread starts.
+ACTIVITY_LOG_BUFFER_SIZE = int(os.getenv("ACTIVITY_LOG_BUFFER_SIZE", 100))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", 2.0))
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+# Activity log retention: months kept besides the current one (0 = forever).
+# `manage.py archive_activity_logs` exports older monthly partitions to
+# gzipped JSONL under ACTIVITY_LOG_ARCHIVE_DIR, then drops them.
+ACTIVITY_LOG_RETENTION_MONTHS = int(os.getenv("ACTIVITY_LOG_RETENTION_MONTHS", 12))
+ACTIVITY_LOG_ARCHIVE_DIR = os.getenv("ACTIVITY_LOG_ARCHIVE_DIR", os.path.join(BASE_DIR, 'archive', 'activity_logs'))
+
 # Allowed file extensions
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif']
 
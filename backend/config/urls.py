@@ -37,11 +37,16 @@ urlpatterns = [
 
 # Serve media and static files
 if not settings.DEBUG:
-    # Production: Serve files directly through Django
+    # Production: Serve files directly through Django, unless file delivery
+    # is offloaded to the front server, which then serves the public media
+    # (renditions, profile images) itself
+    if settings.FILE_DELIVERY_MODE == 'django':
+        urlpatterns += [
+            re_path(r'^media/(?P<path>.*)$', serve, {
+                'document_root': settings.MEDIA_ROOT,
+            }),
+        ]
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-        }),
         re_path(r'^static/(?P<path>.*)$', serve, {
             'document_root': settings.STATIC_ROOT,
         }),
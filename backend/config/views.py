@@ -22,6 +22,7 @@ def api_root(request):
             'engine_models': '/api/engine-models/',
             'car_models': '/api/car-models/',
             'part_categories': '/api/part-categories/',
+            'catalog_tree': '/api/catalog/tree/',
         },
         'frontend_url': settings.FRONTEND_URL if hasattr(settings, 'FRONTEND_URL') else 'http://localhost:3000',
         'note': 'This is an API-only backend. Please access the frontend application for the web interface.'
@@ -23,10 +23,23 @@ echo "✔ MySQL is ready!"
 echo "➡ Verifying MySQL connection..."
 sleep 3
 
+# Background job worker (see docker-compose `yaw-worker`); the web container
+# owns migrations and startup tasks
+if [ "$1" = "worker" ]; then
+  echo "➡ Starting job worker..."
+  exec python manage.py run_jobs
+fi
+
 echo "➡ Running migrations..."
 python manage.py makemigrations --noinput || true
 python manage.py migrate --noinput
 
+echo "➡ Indexing illustrations for search..."
+python manage.py rebuild_search_index --missing
+
+echo "➡ Queueing missing thumbnail renditions..."
+python manage.py generate_renditions --missing
+
 echo "➡ Collecting static files..."
 python manage.py collectstatic --noinput --clear
 